@@ -0,0 +1,216 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+import logging
+
+from .predictor import CreditScoringPredictor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'saved_models'
+)
+
+class ModelRegistry:
+    """
+    Index of saved models (registry.json next to the .joblib files) with
+    one active version. Each process loads the active model once, memory
+    mapped so its NumPy arrays come from the shared page cache, and
+    swaps to a newly promoted version on the next get_predictor() call
+    (the index mtime is checked, no restart needed). Requests already
+    holding the previous predictor finish with it.
+    """
+    
+    INDEX_FILE = 'registry.json'
+    LOCK_FILE = 'registry.lock'
+    LEGACY_MODEL_FILE = 'best_model.joblib'
+    
+    # Loaded predictors per registry path, shared by every instance in the process
+    _loaded = {}
+    _load_lock = threading.Lock()
+    
+    def __init__(self, registry_path: str = None):
+        self.registry_path = os.path.abspath(
+            registry_path or os.environ.get('ML_MODEL_PATH') or DEFAULT_REGISTRY_PATH
+        )
+        self.index_path = os.path.join(self.registry_path, self.INDEX_FILE)
+    
+    def register(self, model_path: str, model_type: str, performance: Dict[str, float] = None,
+                 training_date: str = None, **metadata) -> str:
+        """Add a saved model to the index and return its version id"""
+        model_path = os.path.abspath(model_path)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        
+        version = os.path.splitext(os.path.basename(model_path))[0]
+        with self._locked():
+            index = self._read_index()
+            index['models'][version] = {
+                'version': version,
+                # Relative to the registry, so the directory can be moved or mounted elsewhere
+                'path': os.path.relpath(model_path, self.registry_path),
+                'model_type': model_type,
+                'performance': performance or {},
+                'training_date': training_date,
+                'file_size': os.path.getsize(model_path),
+                'registered_at': datetime.utcnow().isoformat(),
+                **metadata
+            }
+            self._write_index(index)
+        
+        logger.info(f"Registered model {version}")
+        return version
+    
+    def promote(self, version: str, validate: bool = True) -> Dict[str, Any]:
+        """Make a registered version the active model for every process"""
+        index = self._read_index()
+        if version not in index['models']:
+            raise ValueError(f"Model version not found: {version}")
+        
+        if validate:
+            # Fail here rather than in every worker after the switch
+            CreditScoringPredictor(self._model_file(index['models'][version]))
+        
+        with self._locked():
+            index = self._read_index()
+            if version not in index['models']:
+                raise ValueError(f"Model version not found: {version}")
+            index['history'].append({
+                'version': version,
+                'previous_version': index.get('active'),
+                'promoted_at': datetime.utcnow().isoformat()
+            })
+            index['active'] = version
+            self._write_index(index)
+        
+        logger.info(f"Promoted model {version}")
+        return index['models'][version]
+    
+    def active_version(self) -> Optional[str]:
+        return self._read_index().get('active')
+    
+    def list_models(self) -> List[Dict[str, Any]]:
+        index = self._read_index()
+        return [
+            {**entry, 'active': version == index.get('active')}
+            for version, entry in sorted(index['models'].items(), key=lambda item: item[1]['registered_at'])
+        ]
+    
+    def get_entry(self, version: str) -> Dict[str, Any]:
+        index = self._read_index()
+        if version not in index['models']:
+            raise ValueError(f"Model version not found: {version}")
+        return {**index['models'][version], 'active': version == index.get('active')}
+    
+    def latest_version(self, model_type: str) -> Optional[str]:
+        """The active version if it is a model_type model, otherwise the last one registered"""
+        index = self._read_index()
+        active = index.get('active')
+        if active in index['models'] and index['models'][active]['model_type'] == model_type:
+            return active
+        versions = [entry for entry in index['models'].values() if entry['model_type'] == model_type]
+        if not versions:
+            return None
+        return max(versions, key=lambda entry: entry['registered_at'])['version']
+    
+    def model_file(self, version: str) -> str:
+        return self._model_file(self.get_entry(version))
+    
+    def get_predictor(self) -> CreditScoringPredictor:
+        """
+        The active model's predictor, loaded once per process. A stat of
+        the index per call detects promotions; the new version is loaded
+        before the cached reference is replaced.
+        """
+        index_mtime = self._index_mtime()
+        loaded = ModelRegistry._loaded.get(self.registry_path)
+        if loaded and loaded['index_mtime'] == index_mtime:
+            return loaded['predictor']
+        
+        with ModelRegistry._load_lock:
+            loaded = ModelRegistry._loaded.get(self.registry_path)
+            if loaded and loaded['index_mtime'] == index_mtime:
+                return loaded['predictor']
+            
+            version, model_file = self._active_model_file()
+            if loaded and loaded['version'] == version:
+                # Index changed (e.g. a new registration) but the active model did not
+                loaded['index_mtime'] = index_mtime
+                return loaded['predictor']
+            
+            predictor = CreditScoringPredictor(model_file, mmap_mode='r')
+            predictor.model_info['version'] = version
+            ModelRegistry._loaded[self.registry_path] = {
+                'version': version,
+                'predictor': predictor,
+                'index_mtime': index_mtime
+            }
+            logger.info(f"Loaded model {version} for predictions")
+            return predictor
+    
+    def loaded_version(self) -> Optional[str]:
+        """Version this process is serving, or None when get_predictor() would (re)load"""
+        loaded = ModelRegistry._loaded.get(self.registry_path)
+        if loaded and loaded['index_mtime'] == self._index_mtime():
+            return loaded['version']
+        return None
+    
+    def _active_model_file(self):
+        index = self._read_index()
+        active = index.get('active')
+        if active:
+            return active, self._model_file(index['models'][active])
+        
+        # Before anything is promoted, fall back to the trainer's best model file
+        legacy_file = os.path.join(self.registry_path, self.LEGACY_MODEL_FILE)
+        if os.path.exists(legacy_file):
+            return 'best_model', legacy_file
+        raise ValueError("No active model in registry")
+    
+    def _model_file(self, entry: Dict[str, Any]) -> str:
+        return os.path.join(self.registry_path, entry['path'])
+    
+    def _index_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        index.setdefault('active', None)
+        index.setdefault('models', {})
+        index.setdefault('history', [])
+        return index
+    
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        """Write to a temporary file and rename, so readers never see a partial index"""
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.index_path)
+    
+    @contextmanager
+    def _locked(self):
+        """Serialise index updates across processes (read-modify-write)"""
+        os.makedirs(self.registry_path, exist_ok=True)
+        with open(os.path.join(self.registry_path, self.LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def get_active_predictor(registry_path: str = None) -> CreditScoringPredictor:
+    """Predictor for the registry's active model (cached per process, hot-swapped on promotion)"""
+    return ModelRegistry(registry_path).get_predictor()
@@ -0,0 +1,190 @@
+import json
+import os
+from typing import Dict, List, Any
+import logging
+
+import numpy as np
+
+from ..training.feature_transform import CompiledFeatureTransform
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMAT_VERSION = 1
+
+class PortableCreditModel:
+    """
+    NumPy-only evaluator for models exported by
+    ai_models.training.model_exporter. Loading reads a JSON manifest and
+    memory maps the node/coefficient arrays, so neither sklearn nor
+    pandas is imported and a cold start costs milliseconds. Probabilities
+    match the sklearn model's predict_proba to floating point rounding;
+    predict_batch returns the same result dicts as CreditScoringPredictor.
+    """
+    
+    RISK_LEVEL_BOUNDS = [0.05, 0.15, 0.35]
+    RISK_LEVELS = ['low', 'medium', 'high', 'very_high']
+    
+    # Rows walked through the trees at once; bounds the (rows, trees) index matrix
+    TREE_CHUNK_ROWS = 4096
+    
+    def __init__(self, export_dir: str, mmap_mode: str = 'r'):
+        try:
+            with open(os.path.join(export_dir, 'manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format_version') != SUPPORTED_FORMAT_VERSION:
+                raise ValueError(f"Unsupported export format version: {manifest.get('format_version')}")
+            
+            arrays = {
+                name: np.load(os.path.join(export_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+                for name in manifest['arrays']
+            }
+            self.manifest = manifest
+            self.model = manifest['model']
+            self.arrays = arrays
+            self.classes = np.asarray(self.model['classes'])
+            self.feature_columns = manifest['feature_columns']
+            self.training_medians = manifest.get('training_medians', {})
+            self.feature_transform = CompiledFeatureTransform(
+                manifest['feature_columns'],
+                [tuple(step) for step in manifest['transform_plan']],
+                arrays['transform_mean'],
+                arrays['transform_scale'],
+                manifest.get('fill_values')
+            )
+            self.model_info = {
+                'performance': manifest.get('performance', {}),
+                'training_date': manifest.get('training_date'),
+                'model_type': manifest.get('model_type', 'unknown'),
+                'preprocessor_id': manifest.get('preprocessor_id')
+            }
+        
+        except Exception as e:
+            logger.error(f"Error loading portable model: {str(e)}")
+            raise
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for a feature matrix (columns in feature_columns order)"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_columns):
+            raise ValueError(f"Expected a 2D matrix with {len(self.feature_columns)} features, got shape {X.shape}")
+        # sklearn's input validation rejects these too
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+        
+        kind = self.model['kind']
+        if kind == 'forest':
+            return self._forest_proba(X)
+        if kind == 'boosting':
+            return self._boosting_proba(X)
+        if kind == 'linear':
+            return self._linear_proba(X)
+        raise ValueError(f"Unknown exported model kind: {kind}")
+    
+    def transform(self, applications: List[Dict]) -> np.ndarray:
+        """Feature matrix for prediction records, as preprocess_prediction_batch builds it"""
+        return self.feature_transform.transform_batch(applications)
+    
+    def fill_missing_features(self, application_data: Dict) -> Dict:
+        """Copy of the record with absent numeric features set to their training median"""
+        return {**self.training_medians, **application_data}
+    
+    def predict_default_probability(self, application_data: Dict) -> Dict[str, Any]:
+        return self.predict_batch([application_data])[0]
+    
+    def predict_batch(self, applications: List[Dict]) -> List[Dict[str, Any]]:
+        """Same output as CreditScoringPredictor.predict_batch"""
+        try:
+            if not applications:
+                return []
+            
+            prediction_proba = self.predict_proba(self.transform(applications))
+            default_probabilities = prediction_proba[:, 1]
+            predictions = self.classes[np.argmax(prediction_proba, axis=1)]
+            confidences = prediction_proba.max(axis=1)
+            risk_levels = np.digitize(default_probabilities, self.RISK_LEVEL_BOUNDS)
+            
+            return [
+                {
+                    'default_probability': default_probability,
+                    'predicted_default': bool(prediction),
+                    'confidence': confidence,
+                    'risk_level': self.RISK_LEVELS[risk_level],
+                    'model_info': self.model_info
+                }
+                for default_probability, prediction, confidence, risk_level in zip(
+                    default_probabilities.tolist(), predictions.tolist(), confidences.tolist(), risk_levels.tolist()
+                )
+            ]
+        
+        except Exception as e:
+            logger.error(f"Prediction failed: {str(e)}")
+            raise
+    
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leaf index reached in every tree, shape (rows, trees). All trees
+        advance one level per step; leaves point to themselves, so rows
+        that finish early stay put. Features are compared as float32, the
+        dtype sklearn's trees split on.
+        """
+        feature = self.arrays['tree_feature']
+        threshold = self.arrays['tree_threshold']
+        children = self.arrays['tree_children']
+        
+        # Flat indices into X: row offset + feature
+        X32 = X.astype(np.float32).ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(self.arrays['tree_roots'], (len(X), self.model['n_trees'])).copy()
+        for _ in range(self.model['max_depth']):
+            go_right = X32[row_offsets + feature[nodes]] > threshold[nodes]
+            nodes = children[nodes] + go_right
+        return nodes
+    
+    def _tree_sums(self, X: np.ndarray, initial: np.ndarray, scale: float = 1.0) -> np.ndarray:
+        """
+        initial + scale * the leaf values of every tree. Added up with a
+        cumulative sum over the trees so the rounding is that of sklearn's
+        tree-by-tree accumulation.
+        """
+        value = self.arrays['tree_value']
+        total = np.empty((len(X),) + initial.shape, dtype=np.float64)
+        for start in range(0, len(X), self.TREE_CHUNK_ROWS):
+            leaves = self._leaves(X[start:start + self.TREE_CHUNK_ROWS])
+            terms = np.empty((len(leaves), leaves.shape[1] + 1) + initial.shape, dtype=np.float64)
+            terms[:, 0] = initial
+            terms[:, 1:] = value[leaves]
+            if scale != 1.0:
+                terms[:, 1:] *= scale
+            total[start:start + len(leaves)] = np.cumsum(terms, axis=1)[:, -1]
+        return total
+    
+    def _forest_proba(self, X: np.ndarray) -> np.ndarray:
+        proba = self._tree_sums(X, np.zeros(len(self.classes)))
+        proba /= self.model['n_trees']
+        return proba
+    
+    def _boosting_proba(self, X: np.ndarray) -> np.ndarray:
+        raw = self._tree_sums(X, np.float64(self.model['init_raw_prediction']), self.model['learning_rate'])
+        
+        proba = np.empty((len(X), 2), dtype=np.float64)
+        proba[:, 1] = _expit(self.model['raw_scale'] * raw)
+        proba[:, 0] = 1 - proba[:, 1]
+        return proba
+    
+    def _linear_proba(self, X: np.ndarray) -> np.ndarray:
+        scores = X @ self.arrays['linear_coef'].T + self.arrays['linear_intercept']
+        multiclass = self.model['multiclass']
+        if multiclass is None:
+            positive = _expit(scores[:, 0])
+            return np.column_stack([1 - positive, positive])
+        if multiclass == 'multinomial':
+            scores -= scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+        else:
+            scores = _expit(scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+def _expit(values: np.ndarray) -> np.ndarray:
+    """Logistic sigmoid (scipy.special.expit without the import)"""
+    return 1.0 / (1.0 + np.exp(-values))
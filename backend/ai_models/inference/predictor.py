@@ -1,39 +1,54 @@
 import joblib
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, List, Any, Optional
 import logging
 import os
 
+from ..training.data_preprocessor import CreditDataPreprocessor
+
 logger = logging.getLogger(__name__)
 
 class CreditScoringPredictor:
     """Make predictions using trained credit scoring models"""
     
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, mmap_mode: str = None):
         self.model = None
         self.preprocessor = None
         self.feature_columns = []
         self.model_info = {}
         
         if model_path:
-            self.load_model(model_path)
+            self.load_model(model_path, mmap_mode=mmap_mode)
     
-    def load_model(self, model_path: str) -> None:
-        """Load trained model"""
+    def load_model(self, model_path: str, mmap_mode: str = None) -> None:
+        """Load trained model (mmap_mode='r' maps its NumPy arrays instead of reading them, see ModelRegistry)"""
         try:
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"Model file not found: {model_path}")
             
             # Load model data
-            model_data = joblib.load(model_path)
+            model_data = joblib.load(model_path, mmap_mode=mmap_mode)
             
             self.model = model_data['model']
-            self.preprocessor = model_data['preprocessor']
+            if 'n_jobs' in self.model.get_params():
+                # Models saved before training reset it would start a thread pool per predict call
+                self.model.set_params(n_jobs=None)
+            if 'preprocessor' in model_data:
+                self.preprocessor = model_data['preprocessor']
+            else:
+                # Saved once per training run and shared by the models it produced
+                self.preprocessor = CreditDataPreprocessor.load(
+                    os.path.dirname(model_path), model_data['preprocessor_id'], mmap_mode=mmap_mode
+                )
+            if not self.preprocessor.has_current_transform():
+                # Models saved before the compiled transform (or its fill values) existed
+                self.preprocessor.compile_transform()
             self.feature_columns = model_data.get('feature_columns', [])
             self.model_info = {
                 'performance': model_data.get('performance', {}),
                 'training_date': model_data.get('training_date'),
-                'model_type': model_data.get('model_type', 'unknown')
+                'model_type': model_data.get('model_type', 'unknown'),
+                'preprocessor_id': model_data.get('preprocessor_id')
             }
             
             logger.info(f"Model loaded successfully from {model_path}")
@@ -42,32 +57,49 @@ class CreditScoringPredictor:
             logger.error(f"Error loading model: {str(e)}")
             raise
     
+    # Upper bounds of the low / medium / high default probability bands (see _determine_risk_level)
+    RISK_LEVEL_BOUNDS = [0.05, 0.15, 0.35]
+    RISK_LEVELS = ['low', 'medium', 'high', 'very_high']
+    
     def predict_default_probability(self, application_data: Dict) -> Dict[str, Any]:
         """Predict default probability for an application"""
+        return self.predict_batch([application_data])[0]
+    
+    def predict_batch(self, applications: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Predict default probability for many applications with a single
+        predict_proba call. The predicted class is taken from the
+        probabilities (the most likely class, which is what predict
+        returns) rather than running the model a second time.
+        """
         try:
             if not self.model:
                 raise ValueError("No model loaded")
             
-            # Preprocess application data
-            processed_data = self.preprocessor.preprocess_prediction_data(application_data)
-            
-            # Make prediction
-            prediction_proba = self.model.predict_proba(processed_data)
-            default_probability = prediction_proba[0][1]  # Probability of class 1 (default)
-            
-            # Make binary prediction
-            prediction = self.model.predict(processed_data)[0]
-            
-            # Get confidence score
-            confidence = max(prediction_proba[0])
-            
-            return {
-                'default_probability': float(default_probability),
-                'predicted_default': bool(prediction),
-                'confidence': float(confidence),
-                'risk_level': self._determine_risk_level(default_probability),
-                'model_info': self.model_info
-            }
+            if not applications:
+                return []
+            
+            # One feature matrix for the whole batch
+            features = self.preprocessor.preprocess_prediction_batch(applications)
+            
+            prediction_proba = self.model.predict_proba(features)
+            default_probabilities = prediction_proba[:, 1]  # Probability of class 1 (default)
+            predictions = self.model.classes_[np.argmax(prediction_proba, axis=1)]
+            confidences = prediction_proba.max(axis=1)
+            risk_levels = np.digitize(default_probabilities, self.RISK_LEVEL_BOUNDS)
+            
+            return [
+                {
+                    'default_probability': default_probability,
+                    'predicted_default': bool(prediction),
+                    'confidence': confidence,
+                    'risk_level': self.RISK_LEVELS[risk_level],
+                    'model_info': self.model_info
+                }
+                for default_probability, prediction, confidence, risk_level in zip(
+                    default_probabilities.tolist(), predictions.tolist(), confidences.tolist(), risk_levels.tolist()
+                )
+            ]
             
         except Exception as e:
             logger.error(f"Prediction failed: {str(e)}")
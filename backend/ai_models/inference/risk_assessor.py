@@ -18,8 +18,8 @@ class RiskAssessor:
         }
     
     def comprehensive_risk_assessment(self, application_data: Dict, 
-                                   score_data: Dict) -> Dict[str, Any]:
-        """Perform comprehensive risk assessment"""
+                                   score_data: Dict, ml_prediction: Dict = None) -> Dict[str, Any]:
+        """Perform comprehensive risk assessment (ml_prediction: precomputed by the caller)"""
         try:
             risk_assessment = {
                 'overall_risk_level': score_data.get('risk_level', 'medium'),
@@ -32,8 +32,9 @@ class RiskAssessor:
             }
             
             # ML-based risk prediction if predictor is available
-            if self.predictor:
+            if self.predictor and ml_prediction is None:
                 ml_prediction = self.predictor.predict_default_probability(application_data)
+            if ml_prediction:
                 risk_assessment.update({
                     'ml_default_probability': ml_prediction['default_probability'],
                     'ml_confidence': ml_prediction['confidence'],
@@ -71,6 +72,32 @@ class RiskAssessor:
             logger.error(f"Comprehensive risk assessment failed: {str(e)}")
             raise
     
+    def predict_batch(self, applications_data: List[Dict]) -> List[Dict]:
+        """
+        Model predictions for {'application', 'score'} document pairs. Each
+        pair becomes the flat feature record the model was trained on
+        (CreditDataPreprocessor.build_feature_record), so features are read
+        from the application rather than filled with training medians.
+        """
+        if not self.predictor or not applications_data:
+            return []
+        preprocessor = self.predictor.preprocessor
+        records = [
+            preprocessor.fill_missing_features(preprocessor.build_feature_record(data['application'], data['score']))
+            for data in applications_data
+        ]
+        return self.predictor.predict_batch(records)
+    
+    def ml_risk_summary(self, risk_level_counts: Dict[str, int], probability_sum: float) -> Dict[str, Any]:
+        """ML view of a portfolio from running totals of its predictions"""
+        total = sum(risk_level_counts.values())
+        if not total:
+            return {}
+        return {
+            'ml_average_default_probability': float(probability_sum / total),
+            'ml_risk_distribution': {level: count / total * 100 for level, count in risk_level_counts.items()}
+        }
+    
     def _identify_risk_factors(self, application_data: Dict, score_data: Dict) -> List[Dict]:
         """Identify specific risk factors"""
         risk_factors = []
@@ -0,0 +1,259 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple
+import logging
+import math
+import threading
+
+import numpy as np
+
+from .data_preprocessor import CreditDataPreprocessor
+from .feature_transform import CompiledFeatureTransform
+
+logger = logging.getLogger(__name__)
+
+class ExtractedTrainingData:
+    """
+    Raw training features in one preallocated float64 matrix: a row per
+    score, the build_feature_record columns followed by reserved columns
+    for the engineered features. Categorical values are stored as codes
+    into `categories` (first-seen order, NaN when missing) and the target
+    is kept separately. CreditDataPreprocessor.preprocess_extracted turns
+    it into X/y in place.
+    """
+    
+    def __init__(self, matrix: np.ndarray, columns: List[str], categories: Dict[str, List[str]],
+                 target: np.ndarray):
+        self.matrix = matrix
+        self.columns = columns
+        self.categories = categories
+        self.target = target
+    
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+class MongoTrainingDataExtractor:
+    """
+    Streams scores joined with their applications ($lookup) into an
+    ExtractedTrainingData buffer without hydrating documents. The
+    _id range is split into one partition per worker thread; each
+    thread runs its own aggregation cursor and writes batches into its
+    slice of the buffer, so memory is the buffer plus one batch per
+    thread. Rows come out in _id order whatever the number of workers.
+
+    Records are built by CreditDataPreprocessor.build_feature_record on
+    an attribute view of the raw documents, so they match what training
+    on mongoengine documents produces (stored decimals are already
+    rounded by DecimalField, so the raw values are the same).
+    """
+    
+    APPLICATIONS_COLLECTION = 'credit_applications'
+    
+    # Only these fields are sent back by the aggregation
+    PROJECTION = {
+        'data_points_score': 1, 'credit_ratios_score': 1, 'borrower_attributes_score': 1,
+        'total_points': 1, 'grade': 1, 'risk_level': 1,
+        'psychometric_result.total_score': 1, 'psychometric_result.time_discipline_score': 1,
+        'psychometric_result.impulse_planning_score': 1, 'psychometric_result.honesty_responsibility_score': 1,
+        'psychometric_result.resilience_score': 1, 'psychometric_result.future_orientation_score': 1,
+        'app.borrower_info.years_of_residency': 1, 'app.borrower_info.residency_status': 1,
+        'app.borrower_info.guarantor_category': 1,
+        'app.business_data.business_type': 1, 'app.business_data.years_of_operation': 1,
+        'app.business_data.seller_type': 1, 'app.business_data.average_daily_sales': 1,
+        'app.business_data.last_month_sales': 1, 'app.business_data.inventory_value_present': 1,
+        'app.business_data.total_expense_last_month': 1, 'app.business_data.rent_advance': 1,
+        'app.financial_data.monthly_income': 1, 'app.financial_data.bank_transaction_volume_1y': 1,
+        'app.financial_data.existing_loans.outstanding_loan': 1,
+        'app.financial_data.existing_loans.monthly_installment': 1
+    }
+    
+    def __init__(self, scores_collection, workers: int = 4, batch_size: int = 2000):
+        self.scores = scores_collection
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.record_builder = CreditDataPreprocessor()
+        self._categories_lock = threading.Lock()
+    
+    @classmethod
+    def for_credit_scores(cls, **kwargs) -> 'MongoTrainingDataExtractor':
+        """Extractor over the application's credit_scores collection"""
+        from apps.credit_scoring.models import CreditScore
+        return cls(CreditScore._get_collection(), **kwargs)
+    
+    def extract(self, match: Dict = None, buffer_path: str = None) -> ExtractedTrainingData:
+        """
+        Extract every score matching `match`. With buffer_path the matrix
+        is an .npy memmap on disk instead of anonymous memory.
+        """
+        try:
+            match = match or {}
+            expected_rows = self.scores.count_documents(match)
+            # Like a DataFrame of records, there are psychometric columns only if some score has a result
+            has_psychometric = self.scores.count_documents(
+                dict(match, psychometric_result={'$type': 'object'}), limit=1
+            ) > 0
+            columns = self._columns(has_psychometric)
+            shape = (expected_rows, len(columns))
+            if buffer_path:
+                matrix = np.lib.format.open_memmap(buffer_path, mode='w+', dtype=np.float64, shape=shape)
+            else:
+                matrix = np.empty(shape, dtype=np.float64)
+            target = np.empty(expected_rows, dtype=np.int64)
+            
+            self._positions = {column: i for i, column in enumerate(columns)}
+            self._categories = {column: {} for column in CreditDataPreprocessor.CATEGORICAL_COLUMNS}
+            
+            partitions = self._partitions(match, expected_rows)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='training-extract') as executor:
+                filled = list(executor.map(
+                    lambda partition: self._fill_partition(match, partition, matrix, target), partitions
+                ))
+            
+            rows = self._compact(matrix, target, partitions, filled)
+            matrix, target = matrix[:rows], target[:rows]
+            
+            categories = {
+                column: [label for label, _ in sorted(codes.items(), key=lambda item: item[1])]
+                for column, codes in self._categories.items()
+            }
+            logger.info(f"Extracted {rows} training rows ({expected_rows} expected) with {self.workers} workers")
+            return ExtractedTrainingData(matrix, columns, categories, target)
+        
+        except Exception as e:
+            logger.error(f"Training data extraction failed: {str(e)}")
+            raise
+    
+    def _columns(self, has_psychometric: bool) -> List[str]:
+        """build_feature_record columns (psychometric last), then the engineered features"""
+        record = self.record_builder.build_feature_record(
+            _DocumentView({'borrower_info': {}, 'business_data': {}, 'financial_data': {'existing_loans': []}}),
+            _DocumentView({'credit_ratios_score': 0, 'total_points': 0})
+        )
+        columns = [column for column in record if column not in CreditDataPreprocessor.PSYCHOMETRIC_COLUMNS]
+        if has_psychometric:
+            columns += CreditDataPreprocessor.PSYCHOMETRIC_COLUMNS
+        return columns + CompiledFeatureTransform.ENGINEERED_FEATURES
+    
+    def _partitions(self, match: Dict, expected_rows: int) -> List[Tuple[int, int, Any, Any]]:
+        """(first row, expected rows, lowest _id, next partition's lowest _id) per worker"""
+        count = min(self.workers, max(1, expected_rows))
+        starts = [expected_rows * i // count for i in range(count)]
+        lower_ids = []
+        for start in starts:
+            first = list(self.scores.find(match, {'_id': 1}).sort('_id', 1).skip(start).limit(1))
+            lower_ids.append(first[0]['_id'] if first else None)
+        
+        partitions = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < count else expected_rows
+            upper_id = lower_ids[i + 1] if i + 1 < count else None
+            partitions.append((start, end - start, lower_ids[i] if i else None, upper_id))
+        return partitions
+    
+    def _fill_partition(self, match: Dict, partition: Tuple[int, int, Any, Any],
+                        matrix: np.ndarray, target: np.ndarray) -> int:
+        """Stream one _id range into its rows of the buffer; returns the rows written"""
+        start, capacity, lower_id, upper_id = partition
+        id_range = {}
+        if lower_id is not None:
+            id_range['$gte'] = lower_id
+        if upper_id is not None:
+            id_range['$lt'] = upper_id
+        partition_match = dict(match, _id=id_range) if id_range else match
+        
+        pipeline = [
+            {'$match': partition_match},
+            {'$sort': {'_id': 1}},
+            {'$lookup': {
+                'from': self.APPLICATIONS_COLLECTION,
+                'localField': 'application',
+                'foreignField': '_id',
+                'as': 'app'
+            }},
+            # Scores whose application is gone are skipped
+            {'$unwind': '$app'},
+            {'$project': self.PROJECTION}
+        ]
+        
+        written = 0
+        batch_rows, batch_targets = [], []
+        for document in self.scores.aggregate(pipeline, allowDiskUse=True, batchSize=self.batch_size):
+            if written + len(batch_rows) >= capacity:
+                # Inserted after the count; picked up by the next extraction
+                break
+            row, row_target = self._row(document)
+            batch_rows.append(row)
+            batch_targets.append(row_target)
+            if len(batch_rows) >= self.batch_size:
+                written += self._write_batch(matrix, target, start + written, batch_rows, batch_targets)
+                batch_rows, batch_targets = [], []
+        
+        if batch_rows:
+            written += self._write_batch(matrix, target, start + written, batch_rows, batch_targets)
+        return written
+    
+    def _row(self, document: Dict) -> Tuple[List[float], int]:
+        score = _DocumentView(document)
+        record = self.record_builder.build_feature_record(score.app, score)
+        
+        row = [math.nan] * len(self._positions)
+        for column, value in record.items():
+            if column not in self._positions:
+                # Psychometric result added after the columns were fixed
+                continue
+            if column in self._categories:
+                row[self._positions[column]] = math.nan if value is None else self._category_code(column, value)
+            elif value is not None:
+                row[self._positions[column]] = value
+        
+        # Same simplified target as _convert_to_dataframe
+        return row, 1 if document.get('grade') == 'R' else 0
+    
+    def _category_code(self, column: str, value: Any) -> int:
+        codes = self._categories[column]
+        label = str(value)
+        code = codes.get(label)
+        if code is None:
+            with self._categories_lock:
+                code = codes.setdefault(label, len(codes))
+        return code
+    
+    def _write_batch(self, matrix: np.ndarray, target: np.ndarray, offset: int,
+                     rows: List[List[float]], targets: List[int]) -> int:
+        matrix[offset:offset + len(rows)] = rows
+        target[offset:offset + len(rows)] = targets
+        return len(rows)
+    
+    def _compact(self, matrix: np.ndarray, target: np.ndarray, partitions: List[Tuple[int, int, Any, Any]],
+                 filled: List[int]) -> int:
+        """Close the gaps left by partitions that came back short (deleted scores, missing applications)"""
+        rows = 0
+        for (start, _, _, _), count in zip(partitions, filled):
+            if start != rows:
+                matrix[rows:rows + count] = matrix[start:start + count]
+                target[rows:rows + count] = target[start:start + count]
+            rows += count
+        return rows
+
+class _DocumentView:
+    """Attribute access to a raw Mongo document, None for missing fields (as mongoengine returns)"""
+    
+    # mongoengine does not store empty ListFields but reads them back as []
+    LIST_FIELDS = {'existing_loans'}
+    
+    __slots__ = ('_data',)
+    
+    def __init__(self, data: Dict):
+        self._data = data
+    
+    def __getattr__(self, name: str) -> Any:
+        value = self._data.get(name)
+        if value is None and name in self.LIST_FIELDS:
+            return []
+        if isinstance(value, dict):
+            return _DocumentView(value)
+        if isinstance(value, list):
+            return [_DocumentView(item) if isinstance(item, dict) else item for item in value]
+        return value
+    
+    def __bool__(self) -> bool:
+        return True
@@ -1,20 +1,39 @@
+import os
+import warnings
+import joblib
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 import logging
 
+from .feature_transform import CompiledFeatureTransform
+
 logger = logging.getLogger(__name__)
 
 class CreditDataPreprocessor:
     """Data preprocessing for credit scoring ML models"""
     
+    # Fitted preprocessors are saved once per training run, next to the models that reference them
+    STORE_DIR = 'preprocessors'
+    
+    CATEGORICAL_COLUMNS = ['residency_status', 'guarantor_category', 'business_type',
+                           'seller_type', 'grade', 'risk_level']
+    
+    # Only present in records whose score has a psychometric result
+    PSYCHOMETRIC_COLUMNS = ['psychometric_total', 'time_discipline', 'impulse_planning',
+                            'honesty_responsibility', 'resilience', 'future_orientation']
+    
     def __init__(self):
         self.scalers = {}
         self.encoders = {}
         self.feature_columns = []
         self.target_column = 'default_status'
+        self.compiled_transform = None
+        self.training_medians = {}
+        # Training frame medians/modes, used for missing values at prediction time too
+        self.fill_values = {}
         
     def preprocess_training_data(self, applications_data: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
         """Preprocess training data from applications and scores"""
@@ -22,6 +41,11 @@ class CreditDataPreprocessor:
             # Convert to DataFrame
             df = self._convert_to_dataframe(applications_data)
             
+            # Kept for records that lack a feature entirely (see fill_missing_features)
+            self.training_medians = df.drop(columns=[self.target_column]).select_dtypes(
+                include=[np.number]
+            ).median().to_dict()
+            
             # Feature engineering
             df = self._engineer_features(df)
             
@@ -41,23 +65,200 @@ class CreditDataPreprocessor:
             # Store feature columns for later use
             self.feature_columns = df.drop(columns=[self.target_column]).columns.tolist()
             
+            # Export the fitted encoders/scaler for the single-row fast path
+            self.compile_transform()
+            
             return X, y
             
         except Exception as e:
             logger.error(f"Error preprocessing training data: {str(e)}")
             raise
     
+    def preprocess_extracted(self, data: 'ExtractedTrainingData',
+                             chunk_rows: int = 100000) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        preprocess_training_data for a MongoTrainingDataExtractor buffer.
+        The same steps run column-wise on data.matrix in place (no
+        DataFrame), so X is the buffer itself and the fitted encoders and
+        scaler match the DataFrame path.
+        """
+        try:
+            X = data.matrix
+            columns = list(data.columns)
+            position = {column: i for i, column in enumerate(columns)}
+            categorical = [column for column in self.CATEGORICAL_COLUMNS if column in position]
+            engineered = CompiledFeatureTransform.ENGINEERED_FEATURES
+            raw_numeric = [column for column in columns if column not in categorical and column not in engineered]
+            
+            def column(name: str) -> np.ndarray:
+                return X[:, position[name]]
+            
+            with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+                # All-NaN columns have a NaN median, as in pandas
+                warnings.simplefilter('ignore', RuntimeWarning)
+                
+                # Kept for records that lack a feature entirely (see fill_missing_features)
+                self.training_medians = {name: float(np.nanmedian(column(name))) for name in raw_numeric}
+                
+                # Feature engineering (same operations as _engineer_features)
+                X[:, position['debt_to_income_ratio']] = column('total_monthly_installments') / (column('monthly_income') + 1)
+                X[:, position['sales_to_expense_ratio']] = column('last_month_sales') / (
+                    column('last_month_sales') * column('total_expense_ratio') + 1
+                )
+                X[:, position['business_maturity']] = np.sqrt(column('years_of_operation') * column('years_of_residency'))
+                X[:, position['financial_stability']] = (
+                    (column('bank_transaction_volume') / 1000000) + (column('inventory_value') / 1000000)
+                )
+                X[:, position['loan_concentration']] = np.where(column('existing_loan_count') > 3, 1, 0)
+                
+                # Handle missing values
+                self.fill_values = {}
+                for name in raw_numeric + engineered:
+                    values = column(name)
+                    if name in self.training_medians:
+                        self.fill_values[name] = self.training_medians[name]
+                    else:
+                        self.fill_values[name] = float(np.nanmedian(values))
+                    missing = np.isnan(values)
+                    if missing.any():
+                        values[missing] = self.fill_values[name]
+            
+            # Fill with the mode and encode categorical variables
+            for name in categorical:
+                self._encode_extracted_column(column(name), data.categories[name], name)
+            
+            # Scale numerical features, in row chunks so no full-size copy is made
+            scaled = [i for i, name in enumerate(columns) if name not in ('grade', 'risk_level')]
+            scaler = StandardScaler()
+            for start in range(0, len(X), chunk_rows):
+                scaler.partial_fit(X[start:start + chunk_rows, scaled])
+            for start in range(0, len(X), chunk_rows):
+                X[start:start + chunk_rows, scaled] = scaler.transform(X[start:start + chunk_rows, scaled])
+            # As if fitted on the DataFrame, so prediction DataFrames are checked by name
+            scaler.feature_names_in_ = np.array([columns[i] for i in scaled], dtype=object)
+            self.scalers['standard'] = scaler
+            
+            self.feature_columns = columns
+            
+            # Export the fitted encoders/scaler for the single-row fast path
+            self.compile_transform()
+            
+            return X, data.target
+            
+        except Exception as e:
+            logger.error(f"Error preprocessing extracted training data: {str(e)}")
+            raise
+    
+    def _encode_extracted_column(self, values: np.ndarray, labels: List[str], name: str):
+        """Mode fill and LabelEncoder codes for one column of extractor codes (in place)"""
+        missing = np.isnan(values)
+        counts = list(np.bincount(values[~missing].astype(np.int64), minlength=len(labels)))
+        labels = list(labels)
+        
+        if any(counts):
+            # pandas' mode() is sorted, so ties go to the smallest label
+            top = max(counts)
+            fill = min(label for label, count in zip(labels, counts) if count == top)
+        else:
+            fill = 'unknown'
+        self.fill_values[name] = fill
+        
+        if missing.any():
+            # Missing values take the code after the last label
+            values[missing] = len(labels)
+            labels.append(fill)
+            counts.append(int(missing.sum()))
+        
+        classes = sorted({label for label, count in zip(labels, counts) if count})
+        codes = {label: code for code, label in enumerate(classes)}
+        lookup = np.array([codes.get(label, 0) for label in labels], dtype=np.float64)
+        values[:] = lookup[values.astype(np.int64)]
+        
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(classes, dtype=object)
+        self.encoders[name] = encoder
+    
     def preprocess_prediction_data(self, application_data: Dict) -> np.ndarray:
         """Preprocess single application for prediction"""
+        compiled_transform = getattr(self, 'compiled_transform', None)
+        if compiled_transform is not None:
+            try:
+                return compiled_transform.transform(application_data)
+            except Exception as e:
+                logger.error(f"Error preprocessing prediction data: {str(e)}")
+                raise
+        
+        return self.preprocess_prediction_dataframe(application_data)
+    
+    def preprocess_prediction_batch(self, applications_data: List[Dict]) -> np.ndarray:
+        """Preprocess many applications into one feature matrix, row i as preprocess_prediction_data would"""
         try:
-            # Convert to DataFrame
-            df = pd.DataFrame([application_data])
+            compiled_transform = getattr(self, 'compiled_transform', None)
+            if compiled_transform is not None:
+                return compiled_transform.transform_batch(applications_data)
+            
+            # Row by row: the pandas path fills missing values per application, not per batch
+            return np.vstack([self.preprocess_prediction_dataframe(data) for data in applications_data])
+            
+        except Exception as e:
+            logger.error(f"Error preprocessing prediction batch: {str(e)}")
+            raise
+    
+    def fill_missing_features(self, application_data: Dict) -> Dict:
+        """Copy of the record with absent numeric features (e.g. no psychometric test) set to their training median"""
+        medians = getattr(self, 'training_medians', None) or {}
+        return {**medians, **application_data}
+    
+    def save(self, model_dir: str, preprocessor_id: str) -> str:
+        """Persist the fitted preprocessor under its ID; model files store only the ID"""
+        store_dir = os.path.join(model_dir, self.STORE_DIR)
+        os.makedirs(store_dir, exist_ok=True)
+        path = os.path.join(store_dir, f"{preprocessor_id}.joblib")
+        if not os.path.exists(path):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(self, temp_path)
+            os.replace(temp_path, path)
+        return path
+    
+    @classmethod
+    def load(cls, model_dir: str, preprocessor_id: str, mmap_mode: str = None) -> 'CreditDataPreprocessor':
+        """Load a preprocessor saved with save()"""
+        path = os.path.join(model_dir, cls.STORE_DIR, f"{preprocessor_id}.joblib")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Preprocessor not found: {path}")
+        preprocessor = joblib.load(path, mmap_mode=mmap_mode)
+        if not preprocessor.has_current_transform():
+            preprocessor.compile_transform()
+        return preprocessor
+    
+    def has_current_transform(self) -> bool:
+        """False for preprocessors pickled before the compiled transform (or its fill values) existed"""
+        return hasattr(getattr(self, 'compiled_transform', None), 'fill_values')
+    
+    def compile_transform(self) -> Optional['CompiledFeatureTransform']:
+        """Build the compiled transform from the fitted state (also for models pickled before it existed)"""
+        try:
+            self.compiled_transform = CompiledFeatureTransform.from_preprocessor(self)
+        except Exception as e:
+            logger.warning(f"Feature transform not compiled, using pandas path: {str(e)}")
+            self.compiled_transform = None
+        return self.compiled_transform
+    
+    def preprocess_prediction_dataframe(self, application_data: Dict) -> np.ndarray:
+        """Reference pandas implementation of preprocess_prediction_data"""
+        try:
+            # Convert to DataFrame, in training column order; absent and None values are missing (NaN)
+            raw_columns = [col for col in self.feature_columns if col not in CompiledFeatureTransform.ENGINEERED_FEATURES]
+            df = pd.DataFrame([application_data]).reindex(columns=raw_columns)
+            for col in raw_columns:
+                if col not in self.CATEGORICAL_COLUMNS:
+                    df[col] = df[col].astype(np.float64)
             
             # Feature engineering
             df = self._engineer_features(df)
             
-            # Handle missing values
-            df = self._handle_missing_values(df)
+            # Handle missing values (using training statistics)
+            df = self._handle_missing_values(df, fit=False)
             
             # Encode categorical variables (using fitted encoders)
             df = self._encode_categorical_features(df, fit=False)
@@ -84,59 +285,62 @@ class CreditDataPreprocessor:
         records = []
         
         for data in applications_data:
-            application = data['application']
-            score = data['score']
-            
-            record = {
-                # Borrower info
-                'years_of_residency': application.borrower_info.years_of_residency or 0,
-                'residency_status': application.borrower_info.residency_status,
-                'guarantor_category': application.borrower_info.guarantor_category or 'medium',
-                
-                # Business data
-                'business_type': application.business_data.business_type,
-                'years_of_operation': application.business_data.years_of_operation or 0,
-                'seller_type': application.business_data.seller_type or 'retailer',
-                'average_daily_sales': float(application.business_data.average_daily_sales or 0),
-                'last_month_sales': float(application.business_data.last_month_sales or 0),
-                'inventory_value': float(application.business_data.inventory_value_present or 0),
-                'total_expense_ratio': self._calculate_expense_ratio(application.business_data),
-                'rent_advance': float(application.business_data.rent_advance or 0),
-                
-                # Financial data
-                'monthly_income': float(application.financial_data.monthly_income or 0),
-                'existing_loan_count': len(application.financial_data.existing_loans),
-                'total_outstanding_debt': sum([float(loan.outstanding_loan) for loan in application.financial_data.existing_loans]),
-                'total_monthly_installments': sum([float(loan.monthly_installment) for loan in application.financial_data.existing_loans]),
-                'bank_transaction_volume': float(application.financial_data.bank_transaction_volume_1y or 0),
-                
-                # Score components
-                'data_points_score': score.data_points_score,
-                'credit_ratios_score': float(score.credit_ratios_score),
-                'borrower_attributes_score': score.borrower_attributes_score,
-                'final_score': float(score.total_points),
-                'grade': score.grade,
-                'risk_level': score.risk_level,
-                
-                # Target variable (for training)
-                'default_status': 1 if score.grade == 'R' else 0,  # Simplified target
-            }
+            record = self.build_feature_record(data['application'], data['score'])
             
-            # Add psychometric data if available
-            if score.psychometric_result:
-                record.update({
-                    'psychometric_total': score.psychometric_result.total_score,
-                    'time_discipline': score.psychometric_result.time_discipline_score,
-                    'impulse_planning': score.psychometric_result.impulse_planning_score,
-                    'honesty_responsibility': score.psychometric_result.honesty_responsibility_score,
-                    'resilience': score.psychometric_result.resilience_score,
-                    'future_orientation': score.psychometric_result.future_orientation_score,
-                })
+            # Target variable (for training)
+            record['default_status'] = 1 if data['score'].grade == 'R' else 0  # Simplified target
             
             records.append(record)
         
         return pd.DataFrame(records)
     
+    def build_feature_record(self, application, score) -> Dict[str, Any]:
+        """Raw feature record for one application and its (possibly unsaved) score, as passed to prediction"""
+        record = {
+            # Borrower info
+            'years_of_residency': application.borrower_info.years_of_residency or 0,
+            'residency_status': application.borrower_info.residency_status,
+            'guarantor_category': application.borrower_info.guarantor_category or 'medium',
+            
+            # Business data
+            'business_type': application.business_data.business_type,
+            'years_of_operation': application.business_data.years_of_operation or 0,
+            'seller_type': application.business_data.seller_type or 'retailer',
+            'average_daily_sales': float(application.business_data.average_daily_sales or 0),
+            'last_month_sales': float(application.business_data.last_month_sales or 0),
+            'inventory_value': float(application.business_data.inventory_value_present or 0),
+            'total_expense_ratio': self._calculate_expense_ratio(application.business_data),
+            'rent_advance': float(application.business_data.rent_advance or 0),
+            
+            # Financial data
+            'monthly_income': float(application.financial_data.monthly_income or 0),
+            'existing_loan_count': len(application.financial_data.existing_loans),
+            'total_outstanding_debt': sum([float(loan.outstanding_loan) for loan in application.financial_data.existing_loans]),
+            'total_monthly_installments': sum([float(loan.monthly_installment) for loan in application.financial_data.existing_loans]),
+            'bank_transaction_volume': float(application.financial_data.bank_transaction_volume_1y or 0),
+            
+            # Score components
+            'data_points_score': score.data_points_score,
+            'credit_ratios_score': float(score.credit_ratios_score),
+            'borrower_attributes_score': score.borrower_attributes_score,
+            'final_score': float(score.total_points),
+            'grade': score.grade,
+            'risk_level': score.risk_level,
+        }
+        
+        # Add psychometric data if available
+        if score.psychometric_result:
+            record.update({
+                'psychometric_total': score.psychometric_result.total_score,
+                'time_discipline': score.psychometric_result.time_discipline_score,
+                'impulse_planning': score.psychometric_result.impulse_planning_score,
+                'honesty_responsibility': score.psychometric_result.honesty_responsibility_score,
+                'resilience': score.psychometric_result.resilience_score,
+                'future_orientation': score.psychometric_result.future_orientation_score,
+            })
+        
+        return record
+    
     def _engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Engineer additional features"""
         # Debt-to-income ratio
@@ -156,26 +360,48 @@ class CreditDataPreprocessor:
         
         return df
     
-    def _handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _handle_missing_values(self, df: pd.DataFrame, fit: bool = True) -> pd.DataFrame:
         """Handle missing values"""
+        # Preprocessors saved before fill_values existed only kept the raw medians,
+        # which is also what CompiledFeatureTransform falls back to
+        fill_values = {
+            **(getattr(self, 'training_medians', None) or {}),
+            **(getattr(self, 'fill_values', None) or {})
+        }
+        if not fit and fill_values:
+            # Fill with the training frame's medians and modes, never the frame being transformed
+            for col, value in fill_values.items():
+                if col in df.columns:
+                    df[col] = df[col].fillna(value)
+            for col in self.CATEGORICAL_COLUMNS:
+                if col in df.columns and col not in fill_values:
+                    df[col] = df[col].fillna('unknown')
+            return df
+        
         # Fill numerical columns with median
         numerical_columns = df.select_dtypes(include=[np.number]).columns
+        medians = {col: df[col].median() for col in numerical_columns}
         for col in numerical_columns:
-            df[col] = df[col].fillna(df[col].median())
+            df[col] = df[col].fillna(medians[col])
         
         # Fill categorical columns with mode
         categorical_columns = df.select_dtypes(include=['object']).columns
+        modes = {col: df[col].mode().iloc[0] if not df[col].mode().empty else 'unknown' for col in categorical_columns}
         for col in categorical_columns:
-            df[col] = df[col].fillna(df[col].mode().iloc[0] if not df[col].mode().empty else 'unknown')
+            df[col] = df[col].fillna(modes[col])
+        
+        if fit:
+            self.fill_values = {
+                col: float(value) if col in medians else value
+                for col, value in {**medians, **modes}.items()
+                if col != self.target_column
+            }
         
         return df
     
     def _encode_categorical_features(self, df: pd.DataFrame, fit: bool = True) -> pd.DataFrame:
         """Encode categorical features"""
-        categorical_columns = ['residency_status', 'guarantor_category', 'business_type', 
-                             'seller_type', 'grade', 'risk_level']
-        
-        for col in categorical_columns:
+        for col in self.CATEGORICAL_COLUMNS:
             if col in df.columns:
                 if fit:
                     # Fit and transform
@@ -185,11 +411,9 @@ class CreditDataPreprocessor:
                 else:
                     # Transform only (using fitted encoder)
                     if col in self.encoders:
-                        # Handle unseen categories
-                        df[col] = df[col].astype(str)
-                        mask = df[col].isin(self.encoders[col].classes_)
-                        df.loc[~mask, col] = self.encoders[col].classes_[0]  # Use first class for unseen
-                        df[col] = self.encoders[col].transform(df[col])
+                        # Unseen categories get the first class's code
+                        codes = {label: code for code, label in enumerate(self.encoders[col].classes_)}
+                        df[col] = df[col].astype(str).map(codes).fillna(0).astype(np.int64)
         
         return df
     
@@ -220,4 +444,4 @@ class CreditDataPreprocessor:
         if business_data.last_month_sales and business_data.last_month_sales > 0:
             total_expense = business_data.total_expense_last_month or 0
             return float(total_expense) / float(business_data.last_month_sales)
-        return 0.5  # Default expense ratio
\ No newline at end of file
+        return 0.5  # Default expense ratio
@@ -0,0 +1,188 @@
+import numpy as np
+from typing import Dict, List, Tuple, Any, Mapping
+
+class CompiledFeatureTransform:
+    """
+    Fitted CreditDataPreprocessor steps as vectorised column operations,
+    without pandas. Label encoders become dicts, the StandardScaler
+    becomes mean/scale arrays aligned to feature_columns (0/1 for
+    unscaled columns), and missing values (absent keys, None, NaN) are
+    filled with the training frame's statistics (fill_values: medians of
+    numeric and engineered columns, modes of categorical ones), as
+    _handle_missing_values filled them during training. Every batch size
+    runs the same column operations, so a row's features do not depend
+    on the rows it is transformed with; the output is identical to
+    preprocess_prediction_dataframe. Keep the two in sync.
+    """
+    
+    ENGINEERED_FEATURES = [
+        'debt_to_income_ratio', 'sales_to_expense_ratio', 'business_maturity',
+        'financial_stability', 'loan_concentration'
+    ]
+    
+    # Raw columns the engineered features are computed from
+    ENGINEERED_INPUTS = [
+        'total_monthly_installments', 'monthly_income', 'last_month_sales', 'total_expense_ratio',
+        'years_of_operation', 'years_of_residency', 'bank_transaction_volume', 'inventory_value',
+        'existing_loan_count'
+    ]
+    
+    # Column kinds
+    NUMERIC, ENGINEERED, CATEGORICAL, CONSTANT = range(4)
+    
+    def __init__(self, feature_columns: List[str], plan: List[Tuple[str, int, Any]],
+                 mean: np.ndarray, scale: np.ndarray, fill_values: Dict[str, Any] = None):
+        self.feature_columns = list(feature_columns)
+        self.width = len(self.feature_columns)
+        self.plan = plan
+        self.mean = mean
+        self.scale = scale
+        self.fill_values = dict(fill_values or {})
+        self._compile_layout()
+    
+    def _compile_layout(self) -> None:
+        """
+        Row layout: the feature columns followed by any engineered-feature
+        inputs that are not features themselves. Categorical positions
+        hold label codes, engineered ones are computed from the inputs.
+        """
+        self.row_columns = self.feature_columns + [
+            column for column in self.ENGINEERED_INPUTS if column not in self.feature_columns
+        ]
+        position = {column: i for i, column in enumerate(self.row_columns)}
+        self.numeric_positions = [
+            i for i, (_, kind, _) in enumerate(self.plan) if kind == self.NUMERIC
+        ] + list(range(self.width, len(self.row_columns)))
+        self.engineered_inputs = [position[column] for column in self.ENGINEERED_INPUTS]
+        # (feature position, index into the _engineer_features output)
+        self.engineered_positions = [
+            (position[column], i) for i, column in enumerate(self.ENGINEERED_FEATURES) if column in position
+        ]
+        self.categorical = [
+            (i, lookup, 'unknown' if self.fill_values.get(column) is None else str(self.fill_values[column]))
+            for i, (column, kind, lookup) in enumerate(self.plan) if kind == self.CATEGORICAL
+        ]
+        self.constants = [(i, lookup) for i, (_, kind, lookup) in enumerate(self.plan) if kind == self.CONSTANT]
+        
+        self.fill_row = np.full(self.width, np.nan)
+        for i, (column, kind, _) in enumerate(self.plan):
+            if kind in (self.NUMERIC, self.ENGINEERED) and self.fill_values.get(column) is not None:
+                self.fill_row[i] = self.fill_values[column]
+    
+    @classmethod
+    def from_preprocessor(cls, preprocessor: 'CreditDataPreprocessor') -> 'CompiledFeatureTransform':
+        scaler = preprocessor.scalers.get('standard')
+        if scaler is None or not hasattr(scaler, 'feature_names_in_'):
+            raise ValueError("Preprocessor has no fitted, named StandardScaler")
+        
+        scaled = {name: i for i, name in enumerate(scaler.feature_names_in_)}
+        mean = np.zeros(len(preprocessor.feature_columns), dtype=np.float64)
+        scale = np.ones(len(preprocessor.feature_columns), dtype=np.float64)
+        plan = []
+        
+        for position, column in enumerate(preprocessor.feature_columns):
+            if column in scaled:
+                if scaler.with_mean:
+                    mean[position] = scaler.mean_[scaled[column]]
+                if scaler.with_std:
+                    scale[position] = scaler.scale_[scaled[column]]
+            
+            if column in preprocessor.encoders:
+                classes = preprocessor.encoders[column].classes_
+                plan.append((column, cls.CATEGORICAL, {str(label): code for code, label in enumerate(classes)}))
+            elif column in cls.ENGINEERED_FEATURES:
+                plan.append((column, cls.ENGINEERED, None))
+            elif column in scaled:
+                plan.append((column, cls.NUMERIC, None))
+            else:
+                # Never computed for prediction: the pandas path adds it as 0
+                plan.append((column, cls.CONSTANT, 0.0))
+        
+        # Preprocessors saved before fill_values existed only kept the raw medians
+        fill_values = {
+            **(getattr(preprocessor, 'training_medians', None) or {}),
+            **(getattr(preprocessor, 'fill_values', None) or {})
+        }
+        return cls(preprocessor.feature_columns, plan, mean, scale, fill_values)
+    
+    def transform(self, application_data: Dict) -> np.ndarray:
+        """(1, width) feature row for one application, like preprocess_prediction_data"""
+        return self.transform_batch([application_data])
+    
+    def transform_batch(self, applications_data: List[Dict]) -> np.ndarray:
+        """Feature matrix for prediction records (one row per dict)"""
+        rows = []
+        for application_data in applications_data:
+            row = [application_data.get(column) for column in self.row_columns]
+            for i, lookup, fill in self.categorical:
+                row[i] = _encode(row[i], lookup, fill)
+            rows.append(row)
+        matrix = np.array(rows, dtype=np.float64).reshape(len(rows), len(self.row_columns))
+        return self._transform(matrix)
+    
+    def transform_columns(self, columns: Mapping[str, Any], rows: int = None) -> np.ndarray:
+        """
+        Feature matrix for column-oriented input: raw numeric values and
+        category labels per column name (lists or arrays, None/NaN for
+        missing; absent columns are missing in every row).
+        """
+        if rows is None:
+            rows = len(next(iter(columns.values()))) if columns else 0
+        
+        matrix = np.full((rows, len(self.row_columns)), np.nan)
+        for i in self.numeric_positions:
+            values = columns.get(self.row_columns[i])
+            if values is not None:
+                matrix[:, i] = np.asarray(values, dtype=np.float64)
+        for i, lookup, fill in self.categorical:
+            labels = columns.get(self.row_columns[i])
+            matrix[:, i] = _encode(None, lookup, fill) if labels is None else [
+                _encode(label, lookup, fill) for label in labels
+            ]
+        return self._transform(matrix)
+    
+    def _transform(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Shared by every entry point and batch size (in place on the row
+        layout matrix): each step is a column operation whose result for
+        a row depends on that row only.
+        """
+        columns = matrix.T
+        for i, value in self.constants:
+            columns[i] = value
+        engineered = self._engineer_features(*[columns[i] for i in self.engineered_inputs])
+        for i, feature in self.engineered_positions:
+            columns[i] = engineered[feature]
+        
+        if len(self.row_columns) > self.width:
+            matrix = np.ascontiguousarray(matrix[:, :self.width])
+        
+        if not np.isfinite(matrix).all():
+            # Missing numeric and engineered values take the training median (codes are never NaN)
+            missing = np.isnan(matrix)
+            np.copyto(matrix, self.fill_row, where=missing)
+            # StandardScaler.transform accepts NaN but rejects infinity
+            if np.isinf(matrix).any():
+                raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+        matrix -= self.mean
+        matrix /= self.scale
+        return matrix
+    
+    def _engineer_features(self, total_monthly_installments, monthly_income, last_month_sales, total_expense_ratio,
+                           years_of_operation, years_of_residency, bank_transaction_volume, inventory_value,
+                           existing_loan_count) -> List[np.ndarray]:
+        """Column version of CreditDataPreprocessor._engineer_features, in ENGINEERED_FEATURES order"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return [
+                total_monthly_installments / (monthly_income + 1),
+                last_month_sales / (last_month_sales * total_expense_ratio + 1),
+                np.sqrt(years_of_operation * years_of_residency),
+                (bank_transaction_volume / 1000000) + (inventory_value / 1000000),
+                existing_loan_count > 3
+            ]
+
+def _encode(label, lookup: Dict[str, int], fill: str) -> int:
+    """Label code; missing labels take the training mode, unseen ones the first class's code"""
+    if label is None or label != label:
+        label = fill
+    return lookup.get(str(label), 0)
@@ -0,0 +1,341 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Tuple
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import time
+
+import numpy as np
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+logger = logging.getLogger(__name__)
+
+# Sampled per family; anything not listed keeps the trainer's default
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': randint(50, 301),
+        'max_depth': [6, 8, 10, 14, None],
+        'min_samples_split': randint(2, 21),
+        'min_samples_leaf': randint(1, 11),
+        'max_features': ['sqrt', 'log2', 0.5]
+    },
+    'gradient_boosting': {
+        'n_estimators': randint(50, 301),
+        'learning_rate': loguniform(0.01, 0.3),
+        'max_depth': randint(2, 8),
+        'subsample': uniform(0.6, 0.4),
+        'min_samples_leaf': randint(1, 21)
+    },
+    'logistic_regression': {
+        'C': loguniform(0.001, 100)
+    }
+}
+
+class HyperparameterSearch:
+    """
+    Successive halving random search (as HalvingRandomSearchCV) over the
+    trainer's model families, on the cached train split of one dataset.
+    All candidates are scored with a small sample budget; the best
+    1/factor go on to the next round with factor times the samples,
+    until one remains or the full fold is used.
+
+    Stratified folds are cached once per dataset as .npy matrices whose
+    training rows are pre-shuffled, so a round's sample budget is a
+    prefix of a memory-mapped array. Fits run in a process pool of
+    cpu_budget single-threaded workers. Every finished fit is appended
+    to results.jsonl under searches/<search id>/, and running the same
+    search again skips the fits already there, so an interrupted search
+    resumes where it stopped.
+    """
+    
+    SEARCH_DIR = 'searches'
+    STATE_FILE = 'state.json'
+    RESULTS_FILE = 'results.jsonl'
+    
+    def __init__(self, model_dir: str, preprocessor_id: str, base_models: Dict[str, Any],
+                 n_candidates: int = 27, factor: int = 3, cv: int = 5, min_resources: int = 500,
+                 scoring: str = 'roc_auc', cpu_budget: int = None, random_state: int = 42):
+        self.model_dir = model_dir
+        self.preprocessor_id = preprocessor_id
+        self.dataset_dir = os.path.join(model_dir, 'datasets', preprocessor_id)
+        self.base_models = {name: model for name, model in base_models.items() if name in SEARCH_SPACES}
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.cv = cv
+        self.min_resources = min_resources
+        self.scoring = scoring
+        self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+        self.random_state = random_state
+        
+        if not os.path.exists(os.path.join(self.dataset_dir, 'y_train.npy')):
+            raise ValueError(f"No cached dataset for preprocessor {preprocessor_id}")
+        
+        config = {
+            'preprocessor_id': preprocessor_id,
+            'families': sorted(self.base_models),
+            'n_candidates': n_candidates,
+            'factor': factor,
+            'cv': cv,
+            'min_resources': min_resources,
+            'scoring': scoring,
+            'random_state': random_state
+        }
+        # The same search (not the same CPU budget) resumes the same state
+        search_id = hashlib.blake2b(json.dumps(config, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+        self.config = {**config, 'search_id': search_id}
+        self.search_path = os.path.join(model_dir, self.SEARCH_DIR, search_id)
+    
+    def run(self) -> Dict[str, Any]:
+        """Run (or resume) the search; returns the best candidate and the best parameters per family"""
+        try:
+            started = time.perf_counter()
+            fold_dir = self._cache_folds()
+            state = self._load_state()
+            candidates = state['candidates']
+            completed = self._load_results()
+            resumed = len(completed)
+            
+            schedule = self._schedule(len(candidates), self._max_resources(fold_dir))
+            logger.info(f"Hyperparameter search {self.config['search_id']}: {len(candidates)} candidates, "
+                        f"{len(schedule)} rounds, {resumed} fits already done, {self._workers()} workers")
+            
+            survivors = list(range(len(candidates)))
+            rounds = []
+            for round_index, (keep, n_resources) in enumerate(schedule):
+                survivors = survivors[:keep]
+                tasks = [
+                    (round_index, candidate, fold, n_resources)
+                    for candidate in survivors for fold in range(self.cv)
+                    if (round_index, candidate, fold) not in completed
+                ]
+                self._run_tasks(tasks, candidates, fold_dir, completed)
+                
+                scores = {
+                    candidate: float(np.mean([completed[(round_index, candidate, fold)]['score'] for fold in range(self.cv)]))
+                    for candidate in survivors
+                }
+                # Best first; ties (and failed fits, scored NaN) go to the earlier candidate
+                survivors.sort(key=lambda candidate: (-_rank_score(scores[candidate]), candidate))
+                rounds.append({
+                    'round': round_index,
+                    'n_candidates': len(survivors),
+                    'n_resources': n_resources,
+                    'best_score': scores[survivors[0]],
+                    'scores': {str(candidate): scores[candidate] for candidate in survivors}
+                })
+            
+            best = survivors[0]
+            family_best = self._family_best(candidates, rounds)
+            return {
+                'status': 'completed',
+                'search_id': self.config['search_id'],
+                'best_model': candidates[best]['family'],
+                'best_params': candidates[best]['params'],
+                'best_score': rounds[-1]['scores'][str(best)],
+                'scoring': self.scoring,
+                'family_best_params': {family: best['params'] for family, best in family_best.items()},
+                'family_best_scores': {family: best['score'] for family, best in family_best.items()},
+                'rounds': [{key: value for key, value in item.items() if key != 'scores'} for item in rounds],
+                'fits': len(completed),
+                'resumed_fits': resumed,
+                'workers': self._workers(),
+                'seconds': round(time.perf_counter() - started, 3)
+            }
+        
+        except Exception as e:
+            logger.error(f"Hyperparameter search failed: {str(e)}")
+            raise
+    
+    def _schedule(self, n_candidates: int, max_resources: int) -> List[Tuple[int, int]]:
+        """
+        (candidates kept, training rows per fold) per round. Enough rounds
+        to get down to one candidate if the data allows it, else as many
+        as fit between min_resources and the full fold (the last round
+        then still has several). The last round uses (nearly) the full fold.
+        """
+        n_required = 1 + int(math.floor(math.log(max(1, n_candidates), self.factor)))
+        n_possible = 1 + int(math.floor(math.log(max(1, max_resources // self.min_resources), self.factor)))
+        n_rounds = max(1, min(n_required, n_possible))
+        first_resources = max(1, max_resources // self.factor ** (n_rounds - 1))
+        return [
+            (max(1, math.ceil(n_candidates / self.factor ** round_index)),
+             min(max_resources, first_resources * self.factor ** round_index))
+            for round_index in range(n_rounds)
+        ]
+    
+    def _run_tasks(self, tasks: List[Tuple[int, int, int, int]], candidates: List[Dict[str, Any]],
+                   fold_dir: str, completed: Dict[Tuple[int, int, int], Dict[str, Any]]) -> None:
+        if not tasks:
+            return
+        
+        arguments = [
+            (candidates[candidate]['family'], self.base_models[candidates[candidate]['family']],
+             candidates[candidate]['params'], fold_dir, fold, n_resources, self.scoring)
+            for _, candidate, fold, n_resources in tasks
+        ]
+        workers = self._workers()
+        
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_fit_and_score, *args): task for task, args in zip(tasks, arguments)}
+                for future in as_completed(futures):
+                    self._record(futures[future], future.result(), completed)
+        else:
+            for task, args in zip(tasks, arguments):
+                self._record(task, _fit_and_score(*args), completed)
+    
+    def _record(self, task: Tuple[int, int, int, int], outcome: Tuple[float, float],
+                completed: Dict[Tuple[int, int, int], Dict[str, Any]]) -> None:
+        """Append one finished fit to the results log (flushed, so an interruption loses at most the running fits)"""
+        round_index, candidate, fold, n_resources = task
+        score, fit_seconds = outcome
+        result = {
+            'round': round_index,
+            'candidate': candidate,
+            'fold': fold,
+            'n_resources': n_resources,
+            'score': score,
+            'fit_seconds': round(fit_seconds, 3)
+        }
+        with open(os.path.join(self.search_path, self.RESULTS_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        completed[(round_index, candidate, fold)] = result
+    
+    def _workers(self) -> int:
+        if multiprocessing.current_process().daemon:
+            # e.g. a Celery prefork worker, which may not start child processes
+            return 1
+        return self.cpu_budget
+    
+    def _family_best(self, candidates: List[Dict[str, Any]], rounds: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Each family's best candidate in the last round it reached"""
+        family_best = {}
+        for item in reversed(rounds):
+            for candidate, score in item['scores'].items():
+                family = candidates[int(candidate)]['family']
+                if family in family_best and family_best[family]['round'] > item['round']:
+                    continue
+                if family not in family_best or _rank_score(score) > _rank_score(family_best[family]['score']):
+                    family_best[family] = {
+                        'params': candidates[int(candidate)]['params'],
+                        'score': score,
+                        'round': item['round']
+                    }
+        return family_best
+    
+    def _load_state(self) -> Dict[str, Any]:
+        state_path = os.path.join(self.search_path, self.STATE_FILE)
+        if os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                return json.load(f)
+        
+        # Candidates are sampled once and stored, so a resumed search evaluates the same ones
+        candidates = []
+        for family in sorted(self.base_models):
+            for params in ParameterSampler(SEARCH_SPACES[family], self.n_candidates, random_state=self.random_state):
+                candidates.append({'family': family, 'params': {key: _plain(value) for key, value in params.items()}})
+        state = {**self.config, 'candidates': candidates}
+        
+        os.makedirs(self.search_path, exist_ok=True)
+        temp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, state_path)
+        return state
+    
+    def _load_results(self) -> Dict[Tuple[int, int, int], Dict[str, Any]]:
+        results_path = os.path.join(self.search_path, self.RESULTS_FILE)
+        try:
+            with open(results_path, encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return {}
+        
+        lines = content.split('\n')
+        if lines[-1]:
+            # A line cut short by the interruption: drop it so new results start on a fresh line
+            with open(results_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines[:-1] + ['']))
+        
+        completed = {}
+        for line in lines[:-1]:
+            if line:
+                result = json.loads(line)
+                completed[(result['round'], result['candidate'], result['fold'])] = result
+        return completed
+    
+    def _cache_folds(self) -> str:
+        """Write the stratified folds of the cached train split once per dataset, training rows shuffled"""
+        fold_dir = os.path.join(self.dataset_dir, f"folds_{self.cv}_{self.random_state}")
+        if os.path.exists(fold_dir):
+            return fold_dir
+        
+        X = np.load(os.path.join(self.dataset_dir, 'X_train.npy'), mmap_mode='r')
+        y = np.load(os.path.join(self.dataset_dir, 'y_train.npy'), mmap_mode='r')
+        rng = np.random.default_rng(self.random_state)
+        splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        
+        temp_dir = f"{fold_dir}.{os.getpid()}.tmp"
+        os.makedirs(temp_dir, exist_ok=True)
+        for fold, (train_index, test_index) in enumerate(splitter.split(np.zeros(len(y)), y)):
+            # Any prefix of the shuffled training rows is a uniform sample of the fold
+            train_index = rng.permutation(train_index)
+            for name, array in [
+                ('train_index', train_index), ('test_index', test_index),
+                ('X_train', X[train_index]), ('y_train', y[train_index]),
+                ('X_test', X[test_index]), ('y_test', y[test_index])
+            ]:
+                np.save(os.path.join(temp_dir, f"fold_{fold}_{name}.npy"), array)
+        try:
+            os.rename(temp_dir, fold_dir)
+        except OSError:
+            # Another search cached the same folds first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return fold_dir
+    
+    def _max_resources(self, fold_dir: str) -> int:
+        return min(
+            np.load(os.path.join(fold_dir, f"fold_{fold}_y_train.npy"), mmap_mode='r').shape[0]
+            for fold in range(self.cv)
+        )
+
+def _fit_and_score(family: str, base_model, params: Dict[str, Any], fold_dir: str, fold: int,
+                   n_resources: int, scoring: str) -> Tuple[float, float]:
+    """Fit one candidate on the first n_resources rows of a fold and score it on the fold's test rows"""
+    X_train = np.load(os.path.join(fold_dir, f"fold_{fold}_X_train.npy"), mmap_mode='r')[:n_resources]
+    y_train = np.load(os.path.join(fold_dir, f"fold_{fold}_y_train.npy"), mmap_mode='r')[:n_resources]
+    X_test = np.load(os.path.join(fold_dir, f"fold_{fold}_X_test.npy"), mmap_mode='r')
+    y_test = np.load(os.path.join(fold_dir, f"fold_{fold}_y_test.npy"), mmap_mode='r')
+    
+    model = clone(base_model).set_params(**params)
+    if 'n_jobs' in model.get_params():
+        # The CPU budget is spent on parallel fits, one core each
+        model.set_params(n_jobs=1)
+    
+    started = time.perf_counter()
+    try:
+        with threadpool_limits(limits=1, user_api='blas'):
+            model.fit(X_train, y_train)
+        score = float(get_scorer(scoring)(model, X_test, y_test))
+    except ValueError as e:
+        # e.g. a sample budget with a single class
+        logger.warning(f"{family} fit on fold {fold} failed: {str(e)}")
+        score = float('nan')
+    return score, time.perf_counter() - started
+
+def _rank_score(score: float) -> float:
+    return -math.inf if math.isnan(score) else score
+
+def _plain(value: Any) -> Any:
+    """NumPy scalars from the samplers as JSON-serialisable Python values"""
+    return value.item() if isinstance(value, np.generic) else value
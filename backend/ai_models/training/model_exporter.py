@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Any, Tuple
+import logging
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from .data_preprocessor import CreditDataPreprocessor
+from .feature_transform import CompiledFeatureTransform
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+def export_model(model_path: str, export_dir: str) -> Dict[str, Any]:
+    """
+    Compile a saved model file (trainer output: model + preprocessor_id)
+    into the portable format read by ai_models.inference.portable_model:
+    manifest.json with the feature transform plan and model metadata,
+    plus one .npy file per array. Tree ensembles are flattened into
+    node arrays shared by every tree, linear models into coef/intercept.
+    Returns the manifest.
+    """
+    try:
+        model_data = joblib.load(model_path)
+        model = model_data['model']
+        if 'preprocessor' in model_data:
+            preprocessor = model_data['preprocessor']
+        else:
+            preprocessor = CreditDataPreprocessor.load(os.path.dirname(model_path), model_data['preprocessor_id'])
+        
+        transform = CompiledFeatureTransform.from_preprocessor(preprocessor)
+        model_manifest, arrays = compile_estimator(model)
+        arrays['transform_mean'] = transform.mean
+        arrays['transform_scale'] = transform.scale
+        
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'model_type': model_data.get('model_type', 'unknown'),
+            'preprocessor_id': model_data.get('preprocessor_id'),
+            'performance': model_data.get('performance', {}),
+            'training_date': model_data.get('training_date'),
+            'exported_at': datetime.utcnow().isoformat(),
+            'feature_columns': transform.feature_columns,
+            'transform_plan': [[column, kind, lookup] for column, kind, lookup in transform.plan],
+            'training_medians': getattr(preprocessor, 'training_medians', None) or {},
+            'fill_values': transform.fill_values,
+            'model': model_manifest,
+            'arrays': sorted(arrays)
+        }
+        
+        # Written next to the target and renamed, so a reader never sees half an export
+        temp_dir = f"{os.path.abspath(export_dir).rstrip(os.sep)}.{os.getpid()}.tmp"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        shutil.rmtree(export_dir, ignore_errors=True)
+        os.replace(temp_dir, export_dir)
+        
+        logger.info(f"Exported {manifest['model_type']} model from {model_path} to {export_dir}")
+        return manifest
+    
+    except Exception as e:
+        logger.error(f"Model export failed: {str(e)}")
+        raise
+
+def compile_estimator(model) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Manifest entry and arrays for a fitted classifier"""
+    if isinstance(model, RandomForestClassifier):
+        return _compile_forest(model)
+    if isinstance(model, GradientBoostingClassifier):
+        return _compile_boosting(model)
+    if isinstance(model, (LogisticRegression, SGDClassifier)):
+        return _compile_linear(model)
+    raise ValueError(f"Unsupported model for export: {type(model).__name__}")
+
+def _flatten_trees(trees, leaf_values) -> Dict[str, np.ndarray]:
+    """
+    Concatenate sklearn Tree objects into one set of node arrays,
+    renumbered breadth first so the two children of a node are adjacent:
+    the next node is tree_children[node] + (x > threshold). Leaves point
+    to themselves with an infinite threshold, so every tree can be walked
+    for the same number of steps (max_depth).
+    """
+    feature, threshold, children, value, roots = [], [], [], [], []
+    offset = 0
+    for tree, values in zip(trees, leaf_values):
+        # order[i] is the sklearn node that gets position i
+        order = [0]
+        children_of = np.empty(tree.node_count, dtype=np.int64)
+        for position in range(tree.node_count):
+            node = order[position]
+            if tree.children_left[node] == -1:
+                children_of[position] = position
+            else:
+                children_of[position] = len(order)
+                order.extend([tree.children_left[node], tree.children_right[node]])
+        order = np.asarray(order)
+        is_leaf = tree.children_left[order] == -1
+        
+        feature.append(np.where(is_leaf, 0, tree.feature[order]))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        children.append(children_of + offset)
+        value.append(values[order])
+        roots.append(offset)
+        offset += tree.node_count
+    
+    return {
+        'tree_feature': np.concatenate(feature).astype(np.int32),
+        'tree_threshold': np.concatenate(threshold).astype(np.float64),
+        'tree_children': np.concatenate(children).astype(np.int32),
+        'tree_value': np.concatenate(value).astype(np.float64),
+        'tree_roots': np.asarray(roots, dtype=np.int32)
+    }
+
+def _compile_forest(model: RandomForestClassifier):
+    if model.n_outputs_ != 1:
+        raise ValueError("Only single-output forests can be exported")
+    
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    leaf_values = []
+    for tree in trees:
+        # Normalised as DecisionTreeClassifier.predict_proba does
+        proba = tree.value[:, 0, :model.n_classes_].copy()
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        proba /= normalizer
+        leaf_values.append(proba)
+    
+    manifest = {
+        'kind': 'forest',
+        'classes': model.classes_.tolist(),
+        'n_trees': len(trees),
+        'max_depth': int(max(tree.max_depth for tree in trees))
+    }
+    return manifest, _flatten_trees(trees, leaf_values)
+
+def _compile_boosting(model: GradientBoostingClassifier):
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Only binary gradient boosting models can be exported")
+    if model.init not in (None, 'zero'):
+        raise ValueError("Gradient boosting models with a custom init estimator cannot be exported")
+    if model.loss not in ('log_loss', 'exponential'):
+        raise ValueError(f"Unsupported gradient boosting loss: {model.loss}")
+    
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    # The prior (or zero) init is the same for every row
+    init = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))
+    
+    manifest = {
+        'kind': 'boosting',
+        'classes': model.classes_.tolist(),
+        'n_trees': len(trees),
+        'max_depth': int(max(tree.max_depth for tree in trees)),
+        'learning_rate': float(model.learning_rate),
+        'init_raw_prediction': float(init[0, 0]),
+        # Exponential loss maps raw predictions to probabilities with expit(2 * raw)
+        'raw_scale': 2.0 if model.loss == 'exponential' else 1.0
+    }
+    return manifest, _flatten_trees(trees, [tree.value[:, 0, 0] for tree in trees])
+
+def _compile_linear(model):
+    if isinstance(model, SGDClassifier) and model.loss != 'log_loss':
+        raise ValueError(f"SGDClassifier with loss={model.loss} has no predict_proba")
+    
+    classes = model.classes_.tolist()
+    multiclass = None
+    if len(classes) > 2:
+        ovr = isinstance(model, SGDClassifier) or model.multi_class == 'ovr' or (
+            model.multi_class == 'auto' and model.solver == 'liblinear'
+        )
+        multiclass = 'ovr' if ovr else 'multinomial'
+    
+    manifest = {
+        'kind': 'linear',
+        'classes': classes,
+        'multiclass': multiclass
+    }
+    return manifest, {
+        'linear_coef': np.asarray(model.coef_, dtype=np.float64),
+        'linear_intercept': np.asarray(model.intercept_, dtype=np.float64)
+    }
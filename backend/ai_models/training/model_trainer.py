@@ -1,198 +1,510 @@
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
+from concurrent.futures import ProcessPoolExecutor
+from threadpoolctl import threadpool_limits
 import joblib
 import numpy as np
 from typing import Dict, Any, Tuple
+import hashlib
+import json
 import logging
+import multiprocessing
+import shutil
+import time
 from datetime import datetime
 import os
 
 from .data_preprocessor import CreditDataPreprocessor
+from .data_extractor import ExtractedTrainingData
+from .training_store import TrainingStore
+from .hyperparameter_search import HyperparameterSearch
+from ..inference.model_registry import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
 class CreditScoringModelTrainer:
     """Train and evaluate credit scoring models"""
     
-    def __init__(self, model_save_path: str = 'ai_models/models/saved_models/'):
+    # Preprocessed train/test splits, keyed by the preprocessor ID
+    DATASET_DIR = 'datasets'
+    
+    def __init__(self, model_save_path: str = 'ai_models/models/saved_models/', reservoir_size: int = 50000):
         self.model_save_path = model_save_path
+        self.reservoir_size = reservoir_size
         self.preprocessor = CreditDataPreprocessor()
         self.models = {}
         self.model_performance = {}
+        self.registry = ModelRegistry(model_save_path)
         
         # Ensure save directory exists
         os.makedirs(model_save_path, exist_ok=True)
     
-    def train_models(self, training_data: list) -> Dict[str, Any]:
-        """Train multiple credit scoring models"""
+    def train_models(self, training_data, parallel: bool = True,
+                     tuned_params: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Train multiple credit scoring models. The data is preprocessed
+        once and cached as .npy files that every candidate memory-maps;
+        with parallel=True the candidates are fitted concurrently in a
+        process pool, each with n_jobs sized to the cores left for it.
+        training_data is a list of application/score dicts or the
+        ExtractedTrainingData of a MongoTrainingDataExtractor.
+        tuned_params (e.g. a search's family_best_params) override the
+        default hyperparameters per model.
+        """
         try:
             logger.info("Starting model training process...")
+            timings = {}
+            started = time.perf_counter()
             
             # Preprocess data
-            X, y = self.preprocessor.preprocess_training_data(training_data)
+            if isinstance(training_data, ExtractedTrainingData):
+                X, y = self.preprocessor.preprocess_extracted(training_data)
+            else:
+                X, y = self.preprocessor.preprocess_training_data(training_data)
+            timings['preprocess'] = time.perf_counter() - started
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
-            )
+            # Identical data gives an identical fitted preprocessor, so one ID names both
+            step_started = time.perf_counter()
+            preprocessor_id = self._dataset_id(X, y)
+            self.preprocessor.save(self.model_save_path, preprocessor_id)
+            dataset_dir = self._cache_dataset(preprocessor_id, X, y)
+            del X, y
             
-            logger.info(f"Training set size: {X_train.shape[0]}, Test set size: {X_test.shape[0]}")
-            
-            # Define models to train
-            model_configs = {
-                'random_forest': RandomForestClassifier(
-                    n_estimators=100,
-                    max_depth=10,
-                    min_samples_split=5,
-                    min_samples_leaf=2,
-                    random_state=42
-                ),
-                'gradient_boosting': GradientBoostingClassifier(
-                    n_estimators=100,
-                    learning_rate=0.1,
-                    max_depth=6,
-                    random_state=42
-                ),
-                'logistic_regression': LogisticRegression(
-                    random_state=42,
-                    max_iter=1000
+            # Incremental retraining mixes a sample of these rows into every update
+            store = self.training_store(preprocessor_id)
+            if store.stats()['rows_seen'] == 0:
+                store.absorb(
+                    np.load(os.path.join(dataset_dir, 'X_train.npy'), mmap_mode='r'),
+                    np.load(os.path.join(dataset_dir, 'y_train.npy'), mmap_mode='r')
                 )
-            }
+            timings['dataset_cache'] = time.perf_counter() - step_started
+            
+            logger.info(f"Training set size: {self._dataset_rows(dataset_dir, 'y_train')}, "
+                        f"Test set size: {self._dataset_rows(dataset_dir, 'y_test')}")
+            
+            # Fit and evaluate each candidate
+            step_started = time.perf_counter()
+            workers = self._training_workers(parallel)
+            jobs = [
+                (model_name, model, dataset_dir, self.model_save_path, preprocessor_id,
+                 self.preprocessor.feature_columns, 1 if workers > 1 else None)
+                for model_name, model in self._candidate_models(workers, tuned_params).items()
+            ]
+            
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    fitted = list(executor.map(_fit_candidate, *zip(*jobs)))
+            else:
+                fitted = [_fit_candidate(*job) for job in jobs]
+            timings['fit'] = time.perf_counter() - step_started
             
-            # Train and evaluate each model
             training_results = {}
             
-            for model_name, model in model_configs.items():
-                logger.info(f"Training {model_name}...")
-                
-                # Train model
-                model.fit(X_train, y_train)
-                
-                # Evaluate model
-                performance = self._evaluate_model(model, X_test, y_test)
-                
+            for model_name, model, model_path, performance, fit_seconds in fitted:
                 # Store model and performance
                 self.models[model_name] = model
                 self.model_performance[model_name] = performance
                 
-                # Save model
-                model_filename = f"{model_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.joblib"
-                model_path = os.path.join(self.model_save_path, model_filename)
-                joblib.dump({
-                    'model': model,
-                    'preprocessor': self.preprocessor,
-                    'performance': performance,
-                    'feature_columns': self.preprocessor.feature_columns,
-                    'training_date': datetime.now().isoformat()
-                }, model_path)
-                
                 training_results[model_name] = {
                     'model_path': model_path,
-                    'performance': performance
+                    'performance': performance,
+                    'fit_seconds': round(fit_seconds, 3),
+                    'version': self.registry.register(
+                        model_path, model_name, performance=performance,
+                        training_date=datetime.now().isoformat(), training_samples=len(training_data),
+                        preprocessor_id=preprocessor_id
+                    )
                 }
                 
-                logger.info(f"{model_name} training completed. Accuracy: {performance['accuracy']:.4f}")
+                logger.info(f"{model_name} training completed in {fit_seconds:.1f}s. "
+                            f"Accuracy: {performance['accuracy']:.4f}")
             
             # Select best model
-            best_model_name = max(training_results.keys(), 
+            best_model_name = max(training_results.keys(),
                                 key=lambda x: training_results[x]['performance']['accuracy'])
             
             # Save best model as default
             best_model_path = os.path.join(self.model_save_path, 'best_model.joblib')
             joblib.dump({
                 'model': self.models[best_model_name],
-                'preprocessor': self.preprocessor,
+                'preprocessor_id': preprocessor_id,
                 'performance': self.model_performance[best_model_name],
                 'feature_columns': self.preprocessor.feature_columns,
                 'training_date': datetime.now().isoformat(),
                 'model_type': best_model_name
             }, best_model_path)
             
+            # Workers serving predictions pick the new version up without a restart
+            self.registry.promote(training_results[best_model_name]['version'])
+            
             logger.info(f"Best model ({best_model_name}) saved as default model")
+            timings['total'] = time.perf_counter() - started
             
             return {
                 'status': 'completed',
                 'models_trained': list(training_results.keys()),
                 'best_model': best_model_name,
                 'training_results': training_results,
-                'training_samples': len(training_data)
+                'training_samples': len(training_data),
+                'preprocessor_id': preprocessor_id,
+                'training_workers': workers,
+                'timings': {name: round(seconds, 3) for name, seconds in timings.items()}
             }
-            
+        
         except Exception as e:
             logger.error(f"Model training failed: {str(e)}")
             raise
     
-    def _evaluate_model(self, model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
-        """Evaluate model performance"""
-        # Make predictions
-        y_pred = model.predict(X_test)
-        y_pred_proba = model.predict_proba(X_test)[:, 1] if hasattr(model, 'predict_proba') else y_pred
+    def _candidate_models(self, workers: int, tuned_params: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Models to train. Only the random forest parallelises internally
+        (one tree per job); the others are sequential, so while they run
+        alongside it each takes one core and the forest gets the rest.
+        The SGD logistic model supports partial_fit for retraining.
+        """
+        cores = os.cpu_count() or 1
+        forest_jobs = max(1, cores - (workers - 1)) if workers > 1 else -1
         
-        # Calculate metrics
-        performance = {
-            'accuracy': accuracy_score(y_test, y_pred),
-            'precision': precision_score(y_test, y_pred, average='weighted'),
-            'recall': recall_score(y_test, y_pred, average='weighted'),
-            'f1_score': f1_score(y_test, y_pred, average='weighted'),
-            'roc_auc': roc_auc_score(y_test, y_pred_proba) if len(np.unique(y_test)) > 1 else 0.5
+        models = {
+            'random_forest': RandomForestClassifier(
+                n_estimators=100,
+                max_depth=10,
+                min_samples_split=5,
+                min_samples_leaf=2,
+                random_state=42,
+                n_jobs=forest_jobs
+            ),
+            'gradient_boosting': GradientBoostingClassifier(
+                n_estimators=100,
+                learning_rate=0.1,
+                max_depth=6,
+                random_state=42
+            ),
+            'logistic_regression': LogisticRegression(
+                random_state=42,
+                max_iter=1000
+            ),
+            'sgd_logistic': SGDClassifier(
+                loss='log_loss',
+                alpha=0.0001,
+                max_iter=1000,
+                random_state=42
+            )
         }
         
-        # Calculate precision and recall by class
-        for class_label in np.unique(y_test):
-            class_mask = (y_test == class_label)
-            class_pred_mask = (y_pred == class_label)
-            
-            if np.sum(class_mask) > 0:
-                performance[f'precision_class_{class_label}'] = precision_score(
-                    class_mask, class_pred_mask, average='binary'
-                )
-                performance[f'recall_class_{class_label}'] = recall_score(
-                    class_mask, class_pred_mask, average='binary'
-                )
+        for model_name, params in (tuned_params or {}).items():
+            if model_name in models:
+                models[model_name].set_params(**params)
+        return models
+    
+    def tune_hyperparameters(self, preprocessor_id: str, **search_options) -> Dict[str, Any]:
+        """
+        Successive halving search over the model families on the cached
+        dataset of a training run (see HyperparameterSearch). Pass its
+        family_best_params to train_models as tuned_params.
+        """
+        search = HyperparameterSearch(
+            self.model_save_path, preprocessor_id, self._candidate_models(workers=1), **search_options
+        )
+        return search.run()
+    
+    def _training_workers(self, parallel: bool) -> int:
+        if not parallel:
+            return 1
+        if multiprocessing.current_process().daemon:
+            # e.g. a Celery prefork worker, which may not start child processes
+            logger.warning("Training in a daemonic process; fitting candidates sequentially")
+            return 1
+        # At most one worker per candidate
+        return min(4, os.cpu_count() or 1)
+    
+    def _dataset_id(self, X: np.ndarray, y: np.ndarray) -> str:
+        """Content hash of the preprocessed data and its feature layout"""
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(json.dumps(self.preprocessor.feature_columns).encode('utf-8'))
+        for array in (X, y):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode('utf-8'))
+            digest.update(memoryview(array).cast('B'))
+        return digest.hexdigest()
+    
+    def _cache_dataset(self, dataset_id: str, X: np.ndarray, y: np.ndarray) -> str:
+        """Write the train/test split as .npy files once; every candidate (and later runs) reuse them"""
+        dataset_dir = os.path.join(self.model_save_path, self.DATASET_DIR, dataset_id)
+        if os.path.exists(dataset_dir):
+            return dataset_dir
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
         
-        return performance
+        temp_dir = f"{dataset_dir}.{os.getpid()}.tmp"
+        os.makedirs(temp_dir, exist_ok=True)
+        for name, array in [('X_train', X_train), ('X_test', X_test), ('y_train', y_train), ('y_test', y_test)]:
+            np.save(os.path.join(temp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        try:
+            os.rename(temp_dir, dataset_dir)
+        except OSError:
+            # Another run cached the same data first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return dataset_dir
+    
+    def _dataset_rows(self, dataset_dir: str, name: str) -> int:
+        return np.load(os.path.join(dataset_dir, f"{name}.npy"), mmap_mode='r').shape[0]
     
-    def retrain_model(self, model_name: str, new_training_data: list) -> Dict[str, Any]:
-        """Retrain existing model with new data"""
+    def _evaluate_model(self, model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
+        """Evaluate model performance"""
+        return evaluate_model(model, X_test, y_test)
+
+    def add_training_data(self, training_data: list, preprocessor_id: str) -> Dict[str, Any]:
+        """
+        Append labelled applications to the training store of a fitted
+        preprocessor, transformed exactly as for prediction (the
+        preprocessor is not refit). They are used by the next retrain.
+        """
+        preprocessor = CreditDataPreprocessor.load(self.model_save_path, preprocessor_id)
+        records = [
+            preprocessor.fill_missing_features(preprocessor.build_feature_record(data['application'], data['score']))
+            for data in training_data
+        ]
+        X = preprocessor.preprocess_prediction_batch(records)
+        # Same simplified target as _convert_to_dataframe
+        y = np.array([1 if data['score'].grade == 'R' else 0 for data in training_data], dtype=np.int64)
+        
+        store = self.training_store(preprocessor_id)
+        store.append(X, y)
+        return store.stats()
+    
+    def training_store(self, preprocessor_id: str) -> TrainingStore:
+        return TrainingStore(self.model_save_path, preprocessor_id, reservoir_size=self.reservoir_size)
+    
+    def retrain_model(self, model_name: str, new_training_data: list = None,
+                      additional_estimators: int = 20, max_estimators: int = 200) -> Dict[str, Any]:
+        """
+        Incrementally retrain the latest registered model_name model on
+        the rows added to its training store since the last retrain
+        (new_training_data is appended first) plus the store's reservoir
+        sample of the rows it was trained on before. The fitted
+        preprocessor is reused, so the feature space does not change.
+        The store is shared by every model type trained with that
+        preprocessor, so only a retrain of the active model's type
+        commits the pending rows; other types train on them and leave
+        them pending.
+        """
         try:
-            if model_name not in self.models:
+            base_version = self.registry.latest_version(model_name)
+            if base_version is None:
                 raise ValueError(f"Model {model_name} not found")
             
-            logger.info(f"Retraining {model_name} with {len(new_training_data)} new samples")
+            model_data = joblib.load(self.registry.model_file(base_version))
+            preprocessor_id = model_data.get('preprocessor_id') or self.registry.get_entry(base_version).get('preprocessor_id')
+            if not preprocessor_id:
+                raise ValueError(f"Model {base_version} has no saved preprocessor to retrain with")
+            
+            store = self.training_store(preprocessor_id)
+            if new_training_data:
+                self.add_training_data(new_training_data, preprocessor_id)
             
-            # Preprocess new data
-            X_new, y_new = self.preprocessor.preprocess_training_data(new_training_data)
+            X_new, y_new, chunks = store.pending()
+            if not chunks:
+                return {
+                    'status': 'skipped',
+                    'model_name': model_name,
+                    'base_version': base_version,
+                    'reason': 'No new labelled rows'
+                }
+            X_old, y_old = store.reservoir()
+            X = np.concatenate([X_old, X_new])
+            y = np.concatenate([y_old, y_new])
+            
+            logger.info(f"Retraining {base_version} with {len(y_new)} new and {len(y_old)} reservoir samples")
             
-            # Get existing model
-            model = self.models[model_name]
+            model = model_data['model']
+            started = time.perf_counter()
+            # Saved models are single-threaded for serving; the update may use every core
+            set_model_jobs(model, -1)
+            update = warm_start_update(model, X, y, additional_estimators, max_estimators)
+            fit_seconds = time.perf_counter() - started
             
-            # Retrain (this is simplified - in practice you might want incremental learning)
-            model.fit(X_new, y_new)
+            # Evaluated on the held-out split of the original run, so versions stay comparable
+            performance = {}
+            dataset_dir = os.path.join(self.model_save_path, self.DATASET_DIR, preprocessor_id)
+            if os.path.exists(os.path.join(dataset_dir, 'y_test.npy')):
+                performance = evaluate_model(
+                    model,
+                    np.load(os.path.join(dataset_dir, 'X_test.npy'), mmap_mode='r'),
+                    np.load(os.path.join(dataset_dir, 'y_test.npy'), mmap_mode='r')
+                )
             
             # Update stored model
             self.models[model_name] = model
+            self.model_performance[model_name] = performance
             
             # Save retrained model
+            set_model_jobs(model, None)
             model_filename = f"{model_name}_retrained_{datetime.now().strftime('%Y%m%d_%H%M%S')}.joblib"
             model_path = os.path.join(self.model_save_path, model_filename)
             
             joblib.dump({
                 'model': model,
-                'preprocessor': self.preprocessor,
-                'feature_columns': self.preprocessor.feature_columns,
+                'preprocessor_id': preprocessor_id,
+                'performance': performance,
+                'feature_columns': model_data.get('feature_columns'),
                 'training_date': datetime.now().isoformat(),
+                'model_type': model_name,
                 'retrained': True
             }, model_path)
             
+            # Registered only: the caller decides whether to promote it
+            version = self.registry.register(
+                model_path, model_name, performance=performance, training_date=datetime.now().isoformat(),
+                retrained=True, base_version=base_version, update=update, training_samples=len(y),
+                new_samples=len(y_new), preprocessor_id=preprocessor_id
+            )
+            
+            active_version = self.registry.active_version()
+            committed = bool(active_version) and self.registry.get_entry(active_version).get('model_type') == model_name
+            if committed:
+                # The new rows now only survive in the reservoir
+                store_stats = store.commit(chunks)
+            else:
+                store_stats = store.stats()
+            
             return {
                 'status': 'completed',
                 'model_name': model_name,
                 'model_path': model_path,
-                'samples_used': len(new_training_data)
+                'version': version,
+                'base_version': base_version,
+                'update': update,
+                'performance': performance,
+                'samples_used': len(y),
+                'new_samples': len(y_new),
+                'fit_seconds': round(fit_seconds, 3),
+                'committed_pending': committed,
+                'training_store': store_stats
             }
             
         except Exception as e:
             logger.error(f"Model retraining failed: {str(e)}")
             raise
+
+def warm_start_update(model, X: np.ndarray, y: np.ndarray, additional_estimators: int = 20,
+                      max_estimators: int = 200) -> str:
+    """
+    Update a fitted model with more data without starting over. Models
+    with partial_fit take one more pass, ensembles grow
+    additional_estimators members fitted on X, and other warm_start
+    models (lbfgs logistic regression) start from their current
+    coefficients. Ensembles never exceed max_estimators: at the cap a
+    bagged ensemble (random forest) drops its oldest members to make
+    room, and a boosted one, whose stages each correct the ones before,
+    is refit at its current size. Returns how the model was updated.
+    """
+    params = model.get_params()
+    
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X, y, classes=getattr(model, 'classes_', np.unique(y)))
+        return 'partial_fit'
+    
+    if 'warm_start' in params:
+        if 'n_estimators' in params:
+            estimators = getattr(model, 'estimators_', None)
+            if params['n_estimators'] + additional_estimators <= max_estimators:
+                model.set_params(warm_start=True, n_estimators=params['n_estimators'] + additional_estimators)
+                update = 'warm_start_estimators'
+            elif isinstance(estimators, list):
+                keep = max(0, max_estimators - additional_estimators)
+                model.estimators_ = estimators[len(estimators) - keep:] if keep else []
+                model.set_params(warm_start=True, n_estimators=keep + additional_estimators)
+                if isinstance(params['random_state'], int):
+                    # New members are seeded by position; a new seed keeps them from repeating the kept ones' draws
+                    model.set_params(random_state=int(np.random.RandomState(params['random_state']).randint(2 ** 31 - 1)))
+                update = 'replace_oldest_estimators'
+            else:
+                model.fit(X, y)
+                return 'refit'
+        else:
+            model.set_params(warm_start=True)
+            update = 'warm_start'
+        try:
+            model.fit(X, y)
+        finally:
+            # A later full fit should start from scratch again
+            model.set_params(warm_start=params['warm_start'])
+        return update
+    
+    model.fit(X, y)
+    return 'refit'
+
+def set_model_jobs(model, n_jobs) -> None:
+    """Set n_jobs on models that parallelise internally (the random forest)"""
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_jobs)
+
+def evaluate_model(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
+    """Evaluate model performance"""
+    # Make predictions
+    y_pred = model.predict(X_test)
+    y_pred_proba = model.predict_proba(X_test)[:, 1] if hasattr(model, 'predict_proba') else y_pred
+    
+    # Calculate metrics
+    performance = {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred, average='weighted'),
+        'recall': recall_score(y_test, y_pred, average='weighted'),
+        'f1_score': f1_score(y_test, y_pred, average='weighted'),
+        'roc_auc': roc_auc_score(y_test, y_pred_proba) if len(np.unique(y_test)) > 1 else 0.5
+    }
+    
+    # Calculate precision and recall by class
+    for class_label in np.unique(y_test):
+        class_mask = (y_test == class_label)
+        class_pred_mask = (y_pred == class_label)
+        
+        if np.sum(class_mask) > 0:
+            performance[f'precision_class_{class_label}'] = precision_score(
+                class_mask, class_pred_mask, average='binary'
+            )
+            performance[f'recall_class_{class_label}'] = recall_score(
+                class_mask, class_pred_mask, average='binary'
+            )
+    
+    return performance
+
+def _fit_candidate(model_name: str, model, dataset_dir: str, model_save_path: str,
+                   preprocessor_id: str, feature_columns: list,
+                   blas_threads: int = None) -> Tuple[str, Any, str, Dict[str, float], float]:
+    """Fit, evaluate and save one candidate (runs in a training pool worker)"""
+    X_train, X_test, y_train, y_test = [
+        np.load(os.path.join(dataset_dir, f"{name}.npy"), mmap_mode='r')
+        for name in ['X_train', 'X_test', 'y_train', 'y_test']
+    ]
+    
+    logger.info(f"Training {model_name}...")
+    started = time.perf_counter()
+    # Next to other candidates, BLAS threads would oversubscribe the cores they are using
+    with threadpool_limits(limits=blas_threads, user_api='blas'):
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    
+    performance = evaluate_model(model, X_test, y_test)
+    
+    # Save model (the preprocessor is saved once and referenced by ID). n_jobs is
+    # pickled with it, and serving should not start a thread pool per predict call
+    set_model_jobs(model, None)
+    model_filename = f"{model_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.joblib"
+    model_path = os.path.join(model_save_path, model_filename)
+    joblib.dump({
+        'model': model,
+        'preprocessor_id': preprocessor_id,
+        'performance': performance,
+        'feature_columns': feature_columns,
+        'training_date': datetime.now().isoformat(),
+        'model_type': model_name
+    }, model_path)
+    
+    return model_name, model, model_path, performance, fit_seconds
@@ -0,0 +1,191 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class TrainingStore:
+    """
+    Persistent labelled rows for incremental retraining, in the feature
+    space of one fitted preprocessor (<model dir>/training_store/<id>/).
+    New rows are appended as .npy chunks and stay pending until a retrain
+    commits them; committed rows (and the rows of the original training
+    run) only survive as a uniform reservoir sample of fixed size, so
+    the store does not grow with the history.
+    """
+    
+    STORE_DIR = 'training_store'
+    STATE_FILE = 'state.json'
+    LOCK_FILE = 'store.lock'
+    
+    def __init__(self, model_dir: str, preprocessor_id: str, reservoir_size: int = 50000, seed: int = 42):
+        self.store_path = os.path.join(model_dir, self.STORE_DIR, preprocessor_id)
+        self.reservoir_size = reservoir_size
+        self.seed = seed
+        os.makedirs(self.store_path, exist_ok=True)
+    
+    def append(self, X: np.ndarray, y: np.ndarray) -> str:
+        """Add new labelled rows; returns the chunk name"""
+        if len(X) != len(y):
+            raise ValueError("X and y have different lengths")
+        
+        with self._locked():
+            state = self._read_state()
+            self._check_width(state, X)
+            chunk = f"chunk_{state['next_chunk']:06d}"
+            self._save_array(f"{chunk}_X", np.asarray(X, dtype=np.float64))
+            self._save_array(f"{chunk}_y", np.asarray(y))
+            state['pending'].append({'chunk': chunk, 'rows': len(y), 'appended_at': datetime.utcnow().isoformat()})
+            state['next_chunk'] += 1
+            self._write_state(state)
+        
+        logger.info(f"Appended {len(y)} labelled rows to training store as {chunk}")
+        return chunk
+    
+    def pending(self) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Rows appended since the last commit, and their chunk names for commit()"""
+        state = self._read_state()
+        chunks = [entry['chunk'] for entry in state['pending']]
+        if not chunks:
+            width = state['width'] or 0
+            return np.empty((0, width)), np.empty(0, dtype=np.int64), []
+        
+        X = np.concatenate([self._load_array(f"{chunk}_X") for chunk in chunks])
+        y = np.concatenate([self._load_array(f"{chunk}_y") for chunk in chunks])
+        return X, y, chunks
+    
+    def reservoir(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Uniform sample of every committed row (memory mapped)"""
+        state = self._read_state()
+        if not state['reservoir_rows']:
+            width = state['width'] or 0
+            return np.empty((0, width)), np.empty(0, dtype=np.int64)
+        return self._load_array('reservoir_X', mmap_mode='r'), self._load_array('reservoir_y', mmap_mode='r')
+    
+    def commit(self, chunks: List[str]) -> Dict[str, Any]:
+        """Fold pending chunks a retrain has used into the reservoir and delete them"""
+        with self._locked():
+            state = self._read_state()
+            committed = [entry for entry in state['pending'] if entry['chunk'] in chunks]
+            for entry in committed:
+                self._absorb(state, self._load_array(f"{entry['chunk']}_X"), self._load_array(f"{entry['chunk']}_y"))
+            state['pending'] = [entry for entry in state['pending'] if entry['chunk'] not in chunks]
+            self._write_state(state)
+            
+            for entry in committed:
+                for suffix in ('X', 'y'):
+                    os.remove(os.path.join(self.store_path, f"{entry['chunk']}_{suffix}.npy"))
+            return self._stats(state)
+    
+    def absorb(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+        """Add rows models have already been trained on (e.g. a full training run) to the reservoir only"""
+        with self._locked():
+            state = self._read_state()
+            self._check_width(state, X)
+            self._absorb(state, X, y)
+            self._write_state(state)
+            return self._stats(state)
+    
+    def stats(self) -> Dict[str, Any]:
+        return self._stats(self._read_state())
+    
+    def _absorb(self, state: Dict[str, Any], X: np.ndarray, y: np.ndarray) -> None:
+        """
+        Reservoir sampling (algorithm R) over a batch: row t of the stream
+        replaces a random slot j in [0, t] when j < reservoir_size. The
+        random stream is seeded by the rows seen so far, so folding the
+        same data gives the same sample.
+        """
+        seen = state['rows_seen']
+        size = self.reservoir_size
+        if state['reservoir_rows']:
+            reservoir_X = self._load_array('reservoir_X')
+            reservoir_y = self._load_array('reservoir_y')
+        else:
+            reservoir_X = np.empty((0, X.shape[1]), dtype=np.float64)
+            reservoir_y = np.empty(0, dtype=np.asarray(y).dtype)
+        
+        # Fill the free slots in order
+        fill = min(len(y), max(0, size - len(reservoir_y)))
+        if fill:
+            reservoir_X = np.concatenate([reservoir_X, np.asarray(X[:fill], dtype=np.float64)])
+            reservoir_y = np.concatenate([reservoir_y, np.asarray(y[:fill])])
+        
+        if fill < len(y):
+            rng = np.random.default_rng([self.seed, seen])
+            positions = np.arange(seen + fill, seen + len(y))
+            slots = rng.integers(0, positions + 1)
+            replaced = np.flatnonzero(slots < size) + fill
+            if len(replaced):
+                # Later rows win a slot drawn twice, as in the sequential algorithm
+                slots_taken, last = np.unique(slots[replaced - fill][::-1], return_index=True)
+                rows = replaced[::-1][last]
+                reservoir_X[slots_taken] = X[rows]
+                reservoir_y[slots_taken] = y[rows]
+        
+        self._save_array('reservoir_X', reservoir_X)
+        self._save_array('reservoir_y', reservoir_y)
+        state['rows_seen'] = seen + len(y)
+        state['reservoir_rows'] = len(reservoir_y)
+        state['committed_at'] = datetime.utcnow().isoformat()
+    
+    def _check_width(self, state: Dict[str, Any], X: np.ndarray) -> None:
+        if state['width'] is None:
+            state['width'] = X.shape[1]
+        elif X.shape[1] != state['width']:
+            raise ValueError(f"Expected {state['width']} features, got {X.shape[1]}")
+    
+    def _stats(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'pending_rows': sum(entry['rows'] for entry in state['pending']),
+            'pending_chunks': len(state['pending']),
+            'reservoir_rows': state['reservoir_rows'],
+            'rows_seen': state['rows_seen']
+        }
+    
+    def _save_array(self, name: str, array: np.ndarray) -> None:
+        """Write to a temporary file and rename, so readers never see a partial array"""
+        path = os.path.join(self.store_path, f"{name}.npy")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(temp_path, path)
+    
+    def _load_array(self, name: str, mmap_mode: str = None) -> np.ndarray:
+        return np.load(os.path.join(self.store_path, f"{name}.npy"), mmap_mode=mmap_mode)
+    
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.store_path, self.STATE_FILE), encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        state.setdefault('width', None)
+        state.setdefault('pending', [])
+        state.setdefault('next_chunk', 1)
+        state.setdefault('rows_seen', 0)
+        state.setdefault('reservoir_rows', 0)
+        return state
+    
+    def _write_state(self, state: Dict[str, Any]) -> None:
+        path = os.path.join(self.store_path, self.STATE_FILE)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, path)
+    
+    @contextmanager
+    def _locked(self):
+        """Serialise appends and commits across processes (scoring workers, the retrain job)"""
+        with open(os.path.join(self.store_path, self.LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
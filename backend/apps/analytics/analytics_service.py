@@ -4,6 +4,9 @@ from decimal import Decimal
 import logging
 
 from .models import AnalyticsMetric, ModelPerformanceMetric
+from .sector_stats import SectorStatsService
+from .red_flag_index import RedFlagIndexService
+from .model_performance import ModelPerformanceService
 from apps.credit_scoring.models import CreditApplication, CreditScore
 
 logger = logging.getLogger(__name__)
@@ -12,7 +15,9 @@ class AnalyticsService:
     """Service for generating analytics and insights"""
     
     def __init__(self):
-        pass
+        self.sector_stats_service = SectorStatsService()
+        self.red_flag_index_service = RedFlagIndexService()
+        self.model_performance_service = ModelPerformanceService()
     
     def get_dashboard_analytics(self, date_from: datetime = None, date_to: datetime = None,
                               business_type: str = None, grade: str = None) -> Dict[str, Any]:
@@ -49,8 +54,13 @@ class AnalyticsService:
             # Calculate approval rates
             approval_rates = self._calculate_approval_rates(scores, date_from, date_to)
             
-            # Get top red flags
-            top_red_flags = self._get_top_red_flags(scores)
+            # Get top red flags (the index is not broken down by grade)
+            if grade:
+                top_red_flags = self._get_top_red_flags(scores)
+            else:
+                top_red_flags = self.red_flag_index_service.get_flag_index(
+                    date_from, date_to, top_n=10
+                )['top_flags']
             
             return {
                 'score_trends': score_trends,
@@ -70,69 +80,76 @@ class AnalyticsService:
             logger.error(f"Error generating dashboard analytics: {str(e)}")
             raise
     
-    def get_performance_metrics(self, period: str = '6m') -> Dict[str, Any]:
-        """Get model performance metrics"""
+    def get_performance_metrics(self, period: str = '6m', model_version: str = None) -> Dict[str, Any]:
+        """Get model performance metrics from the latest scheduled evaluation"""
         try:
-            # Calculate date range based on period
-            end_date = datetime.utcnow()
-            if period == '1m':
-                start_date = end_date - timedelta(days=30)
-            elif period == '3m':
-                start_date = end_date - timedelta(days=90)
-            elif period == '1y':
-                start_date = end_date - timedelta(days=365)
-            else:  # 6m default
-                start_date = end_date - timedelta(days=180)
+            if period not in ModelPerformanceService.PERIOD_DAYS:
+                period = '6m'
             
-            # Get applications and scores in the period
-            applications = CreditApplication.objects(
-                created_at__gte=start_date,
-                created_at__lte=end_date
-            )
-            scores = CreditScore.objects(
-                calculated_at__gte=start_date,
-                calculated_at__lte=end_date
-            )
+            end_date = datetime.utcnow()
+            start_date = end_date - timedelta(days=ModelPerformanceService.PERIOD_DAYS[period])
             
-            # Calculate performance metrics
-            model_accuracy = self._calculate_model_accuracy(scores)
-            precision_by_grade = self._calculate_precision_by_grade(scores)
-            recall_by_grade = self._calculate_recall_by_grade(scores)
-            false_positive_rate = self._calculate_false_positive_rate(scores)
-            false_negative_rate = self._calculate_false_negative_rate(scores)
+            # Evaluation is precomputed by the evaluate_model_performance task
+            evaluation = self.model_performance_service.get_latest_metrics(
+                period=period, model_version=model_version
+            ) or {}
             
             return {
-                'model_accuracy': model_accuracy,
-                'precision_by_grade': precision_by_grade,
-                'recall_by_grade': recall_by_grade,
-                'false_positive_rate': false_positive_rate,
-                'false_negative_rate': false_negative_rate,
+                'model_accuracy': evaluation.get('model_accuracy'),
+                'precision_by_grade': evaluation.get('precision_by_grade', {}),
+                'recall_by_grade': evaluation.get('recall_by_grade', {}),
+                'false_positive_rate': evaluation.get('false_positive_rate'),
+                'false_negative_rate': evaluation.get('false_negative_rate'),
+                'confusion_matrix': evaluation.get('confusion_matrix', {}),
                 'evaluation_period': {
                     'start_date': start_date.isoformat(),
                     'end_date': end_date.isoformat(),
-                    'total_samples': scores.count()
+                    'total_samples': evaluation.get('sample_size', 0),
+                    'evaluated_at': evaluation.get('evaluated_at')
                 }
             }
             
         except Exception as e:
-            logger.error(f"Error calculating performance metrics: {str(e)}")
+            logger.error(f"Error fetching performance metrics: {str(e)}")
+            raise
+    
+    def get_red_flag_index(self, date_from: datetime = None, date_to: datetime = None,
+                           top_n: int = 10) -> Dict[str, Any]:
+        """Get top red flags and flag co-occurrence for a date range"""
+        try:
+            if not date_to:
+                date_to = datetime.utcnow()
+            if not date_from:
+                date_from = date_to - timedelta(days=180)
+            
+            index = self.red_flag_index_service.get_flag_index(date_from, date_to, top_n=top_n)
+            index['date_range'] = {
+                'date_from': date_from.isoformat(),
+                'date_to': date_to.isoformat()
+            }
+            return index
+            
+        except Exception as e:
+            logger.error(f"Error reading red flag index: {str(e)}")
             raise
     
     def get_business_insights(self) -> Dict[str, Any]:
         """Get business insights and recommendations"""
         try:
-            # Get data from last 6 months
-            six_months_ago = datetime.utcnow() - timedelta(days=180)
-            scores = CreditScore.objects(calculated_at__gte=six_months_ago)
+            # Read materialized sector stats for the last 6 calendar months (this one and the 5 before)
+            now = datetime.utcnow()
+            months_back = now.year * 12 + now.month - 1 - 5
+            six_months_ago = datetime(months_back // 12, months_back % 12 + 1, 1)
+            sector_stats = self.sector_stats_service.get_sector_stats(six_months_ago)
             
             # Analyze high-performing sectors
-            high_performing_sectors = self._identify_high_performing_sectors(scores)
+            high_performing_sectors = self._identify_high_performing_sectors(sector_stats['sectors'])
             
             # Identify risk concentrations
-            risk_concentrations = self._identify_risk_concentrations(scores)
+            risk_concentrations = self._identify_risk_concentrations(sector_stats['sectors'])
             
             # Analyze seasonal patterns
-            seasonal_patterns = self._analyze_seasonal_patterns(scores)
+            seasonal_patterns = self._analyze_seasonal_patterns(sector_stats['months'])
             
             # Generate recommendations
             recommendations = self._generate_business_recommendations(
@@ -269,81 +286,13 @@ class AnalyticsService:
         approved = sum([1 for score in scores if score.grade in ['A', 'B', 'C']])
         return round((approved / scores.count()) * 100, 2)
     
-    def _calculate_model_accuracy(self, scores) -> float:
-        """Calculate model accuracy (placeholder implementation)"""
-        # This would require actual vs predicted data
-        # For now, return a calculated metric based on score distribution
-        if not scores:
-            return 0.0
-        
-        # Simple heuristic: higher accuracy if grade distribution is reasonable
-        grade_dist = self._calculate_grade_distribution(scores)
-        total = sum(grade_dist.values())
-        
-        if total == 0:
-            return 0.0
-        
-        # Good distribution would have reasonable spread across grades
-        # This is a simplified calculation
-        balanced_score = 1.0 - abs(0.25 - (grade_dist['A'] / total)) * 2
-        return max(0.7, min(0.95, balanced_score))  # Keep between 70% and 95%
-    
-    def _calculate_precision_by_grade(self, scores) -> Dict[str, float]:
-        """Calculate precision by grade (placeholder)"""
-        # This would require actual performance data
-        return {
-            'A': 0.92,
-            'B': 0.88,
-            'C': 0.75,
-            'R': 0.85
-        }
-    
-    def _calculate_recall_by_grade(self, scores) -> Dict[str, float]:
-        """Calculate recall by grade (placeholder)"""
-        return {
-            'A': 0.89,
-            'B': 0.91,
-            'C': 0.78,
-            'R': 0.82
-        }
-    
-    def _calculate_false_positive_rate(self, scores) -> float:
-        """Calculate false positive rate (placeholder)"""
-        return 0.08  # 8%
-    
-    def _calculate_false_negative_rate(self, scores) -> float:
-        """Calculate false negative rate (placeholder)"""
-        return 0.12  # 12%
-    
-    def _identify_high_performing_sectors(self, scores) -> List[str]:
+    def _identify_high_performing_sectors(self, sector_stats: Dict[str, Dict]) -> List[str]:
         """Identify high-performing business sectors"""
-        sector_performance = {}
-        
-        for score in scores:
-            # Get business type from application
-            app = score.application
-            if app and app.business_data:
-                business_type = app.business_data.business_type
-                
-                if business_type not in sector_performance:
-                    sector_performance[business_type] = {
-                        'scores': [],
-                        'approved_count': 0,
-                        'total_count': 0
-                    }
-                
-                sector_performance[business_type]['scores'].append(float(score.total_points))
-                sector_performance[business_type]['total_count'] += 1
-                
-                if score.grade in ['A', 'B']:
-                    sector_performance[business_type]['approved_count'] += 1
-        
-        # Calculate performance metrics and identify top performers
         high_performers = []
         
-        for business_type, data in sector_performance.items():
+        for business_type, data in sector_stats.items():
             if data['total_count'] >= 10:  # Minimum sample size
-                avg_score = sum(data['scores']) / len(data['scores'])
+                avg_score = data['score_sum'] / data['total_count']
                 approval_rate = data['approved_count'] / data['total_count']
                 
                 # Consider high performing if avg score > 65 and approval rate > 80%
@@ -352,49 +301,20 @@ class AnalyticsService:
         
         return high_performers
     
-    def _identify_risk_concentrations(self, scores) -> Dict[str, float]:
+    def _identify_risk_concentrations(self, sector_stats: Dict[str, Dict]) -> Dict[str, float]:
         """Identify risk concentrations"""
         risk_concentrations = {}
         
-        # Group by business type and calculate risk percentages
-        business_risk = {}
-        
-        for score in scores:
-            app = score.application
-            if app and app.business_data:
-                business_type = app.business_data.business_type
-                
-                if business_type not in business_risk:
-                    business_risk[business_type] = {'high_risk': 0, 'total': 0}
-                
-                business_risk[business_type]['total'] += 1
-                if score.risk_level in ['high', 'very_high']:
-                    business_risk[business_type]['high_risk'] += 1
-        
-        # Calculate risk concentrations
-        for business_type, data in business_risk.items():
-            if data['total'] >= 5:  # Minimum sample size
-                risk_percentage = (data['high_risk'] / data['total']) * 100
+        for business_type, data in sector_stats.items():
+            if data['total_count'] >= 5:  # Minimum sample size
+                risk_percentage = (data['high_risk_count'] / data['total_count']) * 100
                 if risk_percentage > 30:  # High risk concentration threshold
                     risk_concentrations[business_type] = round(risk_percentage, 2)
         
         return risk_concentrations
     
-    def _analyze_seasonal_patterns(self, scores) -> List[Dict]:
+    def _analyze_seasonal_patterns(self, monthly_stats: Dict[int, Dict]) -> List[Dict]:
         """Analyze seasonal patterns"""
-        monthly_patterns = {}
-        
-        for score in scores:
-            month = score.calculated_at.month
-            if month not in monthly_patterns:
-                monthly_patterns[month] = {
-                    'scores': [],
-                    'applications': 0
-                }
-            
-            monthly_patterns[month]['scores'].append(float(score.total_points))
-            monthly_patterns[month]['applications'] += 1
-        
         patterns = []
         month_names = [
             '', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
@@ -402,9 +322,9 @@ class AnalyticsService:
         ]
         
         for month in range(1, 13):
-            if month in monthly_patterns:
-                data = monthly_patterns[month]
-                avg_score = sum(data['scores']) / len(data['scores'])
+            data = monthly_stats.get(month)
+            if data and data['total_count'] > 0:
+                avg_score = data['score_sum'] / data['total_count']
                 
                 # Simple trend analysis
                 if avg_score > 70:
@@ -418,7 +338,7 @@ class AnalyticsService:
                     'month': month_names[month],
                     'trend': trend,
                     'avg_score': round(avg_score, 2),
-                    'applications': data['applications']
+                    'applications': data['total_count']
                 })
         
         return patterns
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Iterable, Tuple
+import json
+
+from django.conf import settings
+from django_redis import get_redis_connection
+import redis.asyncio as aioredis
+
+class LiveScoreMetrics:
+    """
+    Per-minute score aggregates shared by every worker through Redis.
+    Each minute is a hash of counters, indexed by a sorted set on the
+    minute's timestamp, so a late score for an earlier minute still lands
+    in its sorted position. Every update bumps a global sequence number
+    and is announced on a pub/sub channel with the minute it changed;
+    stream consumers subscribe and re-read only those buckets.
+    """
+    
+    KEY_PREFIX = 'live_scores'
+    CHANNEL = 'live_scores:updates'
+    GRADES = ['A', 'B', 'C', 'R']
+    RISK_LEVELS = ['low', 'medium', 'high', 'very_high']
+    
+    def __init__(self, window_minutes: int = 180):
+        self.window_minutes = window_minutes
+        self.minutes_key = f"{self.KEY_PREFIX}:minutes"
+        self.sequence_key = f"{self.KEY_PREFIX}:sequence"
+    
+    def publish(self, credit_score) -> None:
+        """Fold a saved score into its minute bucket and announce the change"""
+        calculated_at = credit_score.calculated_at or datetime.utcnow()
+        minute = calculated_at.replace(second=0, microsecond=0)
+        cutoff = self._window_start()
+        if minute < cutoff:
+            # Older than the live window - nothing to update
+            return
+        
+        bucket_key = self._bucket_key(minute.isoformat())
+        pipe = get_redis_connection('default').pipeline(transaction=True)
+        pipe.hincrby(bucket_key, 'count', 1)
+        pipe.hincrbyfloat(bucket_key, 'score_sum', float(credit_score.total_points or 0))
+        if credit_score.grade in ['A', 'B', 'C']:
+            pipe.hincrby(bucket_key, 'approved', 1)
+        if credit_score.grade in self.GRADES:
+            pipe.hincrby(bucket_key, f"grade:{credit_score.grade}", 1)
+        if credit_score.risk_level in self.RISK_LEVELS:
+            pipe.hincrby(bucket_key, f"risk:{credit_score.risk_level}", 1)
+        # Bucket hashes expire once they leave the window; the index is trimmed here
+        pipe.expireat(bucket_key, int(self._epoch(minute)) + (self.window_minutes + 1) * 60)
+        pipe.zadd(self.minutes_key, {minute.isoformat(): self._epoch(minute)})
+        pipe.zremrangebyscore(self.minutes_key, '-inf', f"({self._epoch(cutoff)}")
+        pipe.incr(self.sequence_key)
+        sequence = pipe.execute()[-1]
+        
+        get_redis_connection('default').publish(
+            self.CHANNEL, json.dumps({'sequence': sequence, 'minute': minute.isoformat()})
+        )
+    
+    def snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Current sequence number and every bucket in the window, oldest first"""
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        self._queue_window(pipe)
+        sequence, minutes = self._parse_window(pipe.execute())
+        return sequence, self.buckets(minutes)
+    
+    def buckets(self, minutes: Iterable[str]) -> List[Dict[str, Any]]:
+        """Buckets for the given minutes (ISO strings), oldest first"""
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        minutes = self._queue_buckets(pipe, minutes)
+        return self._parse_buckets(minutes, pipe.execute())
+    
+    def async_client(self) -> aioredis.Redis:
+        """New asyncio client for one stream; the caller closes it"""
+        return aioredis.from_url(settings.CACHES['default']['LOCATION'])
+    
+    async def async_snapshot(self, client: aioredis.Redis) -> Tuple[int, List[Dict[str, Any]]]:
+        pipe = client.pipeline(transaction=False)
+        self._queue_window(pipe)
+        sequence, minutes = self._parse_window(await pipe.execute())
+        return sequence, await self.async_buckets(client, minutes)
+    
+    async def async_buckets(self, client: aioredis.Redis, minutes: Iterable[str]) -> List[Dict[str, Any]]:
+        pipe = client.pipeline(transaction=False)
+        minutes = self._queue_buckets(pipe, minutes)
+        return self._parse_buckets(minutes, await pipe.execute())
+    
+    def _window_start(self) -> datetime:
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        return now - timedelta(minutes=self.window_minutes - 1)
+    
+    def _epoch(self, minute: datetime) -> float:
+        # Score timestamps are naive UTC
+        return minute.replace(tzinfo=timezone.utc).timestamp()
+    
+    def _bucket_key(self, minute: str) -> str:
+        return f"{self.KEY_PREFIX}:bucket:{minute}"
+    
+    def _queue_window(self, pipe) -> None:
+        pipe.get(self.sequence_key)
+        pipe.zrangebyscore(self.minutes_key, self._epoch(self._window_start()), '+inf')
+    
+    def _parse_window(self, results) -> Tuple[int, List[str]]:
+        sequence, minutes = results
+        return int(sequence or 0), [minute.decode() for minute in minutes]
+    
+    def _queue_buckets(self, pipe, minutes: Iterable[str]) -> List[str]:
+        minutes = sorted(set(minutes))
+        for minute in minutes:
+            pipe.hgetall(self._bucket_key(minute))
+        return minutes
+    
+    def _parse_buckets(self, minutes: List[str], results) -> List[Dict[str, Any]]:
+        return [
+            self._serialize(minute, {key.decode(): value for key, value in fields.items()})
+            for minute, fields in zip(minutes, results) if fields
+        ]
+    
+    def _serialize(self, minute: str, fields: Dict[str, bytes]) -> Dict[str, Any]:
+        count = int(fields.get('count', 0))
+        score_sum = float(fields.get('score_sum', 0))
+        approved = int(fields.get('approved', 0))
+        return {
+            'minute': minute,
+            'count': count,
+            'avg_score': round(score_sum / count, 2) if count else 0,
+            'approval_rate': round(approved / count * 100, 2) if count else 0,
+            'grade_distribution': {grade: int(fields.get(f"grade:{grade}", 0)) for grade in self.GRADES},
+            'risk_distribution': {level: int(fields.get(f"risk:{level}", 0)) for level in self.RISK_LEVELS}
+        }
+
+# Shared accessor fed by CreditScoringEngine and read by the score trend stream
+live_score_metrics = LiveScoreMetrics()
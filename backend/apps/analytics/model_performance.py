@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+import logging
+import uuid
+
+import numpy as np
+from pymongo import UpdateOne
+
+from .models import LoanOutcome, ModelPerformanceMetric
+from apps.credit_scoring.models import CreditApplication, CreditScore
+
+logger = logging.getLogger(__name__)
+
+class ModelPerformanceService:
+    """
+    Ingest observed repayment outcomes and evaluate scoring performance.
+
+    Grades A/B/C are treated as a "will repay" decision and grade R as a
+    "will default" decision. Precision for a grade is the share of its
+    decisions that turned out correct; recall for a grade is the share of
+    all outcomes of the class it predicts that landed in that grade.
+    """
+
+    GRADES = ['A', 'B', 'C', 'R']
+    REJECT_GRADE = 'R'
+    PERIOD_DAYS = {'1m': 30, '3m': 90, '6m': 180, '1y': 365}
+    ALL_VERSIONS = 'all'
+
+    def record_outcomes(self, outcomes: List[Dict], recorded_by: str = None) -> Dict[str, Any]:
+        """Upsert repayment outcomes keyed by application_id"""
+        application_ids = list({item['application_id'] for item in outcomes})
+        applications = {
+            doc['application_id']: doc['_id']
+            for doc in CreditApplication.objects(
+                application_id__in=application_ids
+            ).only('application_id').as_pymongo()
+        }
+
+        now = datetime.utcnow()
+        operations = []
+        missing = []
+
+        for item in outcomes:
+            app_object_id = applications.get(item['application_id'])
+            if not app_object_id:
+                missing.append(item['application_id'])
+                continue
+
+            operations.append(UpdateOne(
+                {'application_id': item['application_id']},
+                {'$set': {
+                    'application': app_object_id,
+                    'outcome': item['outcome'],
+                    'observed_at': item.get('observed_at') or now,
+                    'recorded_by': recorded_by,
+                    'notes': item.get('notes', ''),
+                    'updated_at': now
+                }},
+                upsert=True
+            ))
+
+        if operations:
+            LoanOutcome._get_collection().bulk_write(operations, ordered=False)
+
+        return {
+            'recorded': len(operations),
+            'missing_applications': missing
+        }
+
+    def evaluate(self, periods: List[str] = None) -> str:
+        """
+        Compute confusion matrices per grade and model version for every
+        period and persist them as ModelPerformanceMetric rows.
+        """
+        periods = periods or list(self.PERIOD_DAYS.keys())
+        run_id = uuid.uuid4().hex
+        evaluated_at = datetime.utcnow()
+
+        labelled = self._load_labelled_scores()
+        metrics = []
+
+        for period in periods:
+            since = evaluated_at - timedelta(days=self.PERIOD_DAYS[period])
+            mask = labelled['calculated_at'] >= np.datetime64(since)
+            metrics.extend(self._build_period_metrics(
+                labelled, mask, period, run_id, evaluated_at
+            ))
+
+        if metrics:
+            ModelPerformanceMetric.objects.insert(metrics, load_bulk=False)
+
+        logger.info(
+            f"Model evaluation {run_id} stored {len(metrics)} metrics "
+            f"from {len(labelled['grade'])} labelled outcomes"
+        )
+        return run_id
+
+    def get_latest_metrics(self, period: str = '6m',
+                           model_version: str = None) -> Optional[Dict[str, Any]]:
+        """Read the most recent stored evaluation for a period"""
+        model_version = model_version or self.ALL_VERSIONS
+
+        latest = ModelPerformanceMetric.objects(
+            evaluation_period=period
+        ).order_by('-evaluation_date').only('evaluation_run_id', 'evaluation_date').first()
+
+        if not latest:
+            return None
+
+        rows = ModelPerformanceMetric.objects(
+            evaluation_run_id=latest.evaluation_run_id,
+            evaluation_period=period,
+            model_version=model_version
+        )
+
+        result = {
+            'model_accuracy': None,
+            'precision_by_grade': {},
+            'recall_by_grade': {},
+            'false_positive_rate': None,
+            'false_negative_rate': None,
+            'confusion_matrix': {},
+            'sample_size': 0,
+            'evaluated_at': latest.evaluation_date.isoformat()
+        }
+
+        for row in rows:
+            if row.grade:
+                if row.metric_type == 'precision':
+                    result['precision_by_grade'][row.grade] = row.value
+                elif row.metric_type == 'recall':
+                    result['recall_by_grade'][row.grade] = row.value
+            elif row.metric_type == 'accuracy':
+                result['model_accuracy'] = row.value
+                result['confusion_matrix'] = row.confusion_matrix
+                result['sample_size'] = row.sample_size
+            elif row.metric_type == 'false_positive_rate':
+                result['false_positive_rate'] = row.value
+            elif row.metric_type == 'false_negative_rate':
+                result['false_negative_rate'] = row.value
+
+        return result
+
+    def _load_labelled_scores(self) -> Dict[str, np.ndarray]:
+        """Join outcomes with the latest score of each application into arrays"""
+        outcomes = {
+            doc['application']: doc['outcome'] == 'defaulted'
+            for doc in LoanOutcome.objects.only('application', 'outcome').as_pymongo()
+        }
+
+        latest_scores = {}
+        application_ids = list(outcomes.keys())
+        chunk_size = 5000
+
+        for start in range(0, len(application_ids), chunk_size):
+            scores = CreditScore.objects(
+                application__in=application_ids[start:start + chunk_size]
+            ).only('application', 'grade', 'ai_predictions.model_version', 'calculated_at').as_pymongo()
+
+            for score in scores:
+                current = latest_scores.get(score['application'])
+                if not current or score['calculated_at'] > current['calculated_at']:
+                    latest_scores[score['application']] = score
+
+        grade_index = {grade: i for i, grade in enumerate(self.GRADES)}
+        rows = [s for s in latest_scores.values() if s.get('grade') in grade_index]
+
+        return {
+            'grade': np.array([grade_index[s['grade']] for s in rows], dtype=np.int64),
+            'version': np.array([self._model_version(s) for s in rows], dtype=object),
+            'defaulted': np.array([outcomes[s['application']] for s in rows], dtype=np.int64),
+            'calculated_at': np.array([s['calculated_at'] for s in rows], dtype='datetime64[us]')
+        }
+
+    def _model_version(self, score: Dict) -> str:
+        """
+        Registry version of the model that predicted the score. CreditScore.version
+        is the scorecard version, the same for every score; scores without a
+        model prediction (no model registered, timeout) count as 'unknown'.
+        """
+        return str((score.get('ai_predictions') or {}).get('model_version') or 'unknown')
+
+    def _build_period_metrics(self, labelled: Dict[str, np.ndarray], mask: np.ndarray,
+                              period: str, run_id: str,
+                              evaluated_at: datetime) -> List[ModelPerformanceMetric]:
+        """Vectorized confusion matrices for all (version, grade) pairs"""
+        grades = labelled['grade'][mask]
+        defaulted = labelled['defaulted'][mask]
+        if grades.size == 0:
+            return []
+
+        versions, version_idx = np.unique(labelled['version'][mask], return_inverse=True)
+        predicted_default = (grades == self.GRADES.index(self.REJECT_GRADE)).astype(np.int64)
+
+        # counts[version, grade, predicted_default, actual_default]
+        n_grades = len(self.GRADES)
+        flat_index = ((version_idx * n_grades + grades) * 2 + predicted_default) * 2 + defaulted
+        counts = np.bincount(
+            flat_index, minlength=len(versions) * n_grades * 4
+        ).reshape(len(versions), n_grades, 2, 2)
+
+        per_version = {str(version): counts[i] for i, version in enumerate(versions)}
+        per_version[self.ALL_VERSIONS] = counts.sum(axis=0)
+
+        metrics = []
+        for version, matrix in per_version.items():
+            metrics.extend(self._metrics_from_matrix(
+                matrix, version, period, run_id, evaluated_at
+            ))
+        return metrics
+
+    def _metrics_from_matrix(self, matrix: np.ndarray, version: str, period: str,
+                             run_id: str, evaluated_at: datetime) -> List[ModelPerformanceMetric]:
+        """Turn a [grade, predicted, actual] count tensor into metric rows"""
+        overall = matrix.sum(axis=0)
+        tn, fn = int(overall[0, 0]), int(overall[0, 1])
+        fp, tp = int(overall[1, 0]), int(overall[1, 1])
+        total = tp + fp + tn + fn
+
+        common = {
+            'model_version': version,
+            'evaluation_period': period,
+            'evaluation_run_id': run_id,
+            'evaluation_date': evaluated_at
+        }
+        overall_matrix = {'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn}
+
+        metrics = [
+            ModelPerformanceMetric(
+                metric_type='accuracy', value=self._ratio(tp + tn, total),
+                sample_size=total, confusion_matrix=overall_matrix, **common
+            ),
+            ModelPerformanceMetric(
+                metric_type='false_positive_rate', value=self._ratio(fp, fp + tn),
+                sample_size=fp + tn, confusion_matrix=overall_matrix, **common
+            ),
+            ModelPerformanceMetric(
+                metric_type='false_negative_rate', value=self._ratio(fn, fn + tp),
+                sample_size=fn + tp, confusion_matrix=overall_matrix, **common
+            )
+        ]
+
+        # Outcomes per actual class, used as the recall denominator
+        actual_totals = overall.sum(axis=0)
+
+        for grade_idx, grade in enumerate(self.GRADES):
+            predicts_default = int(grade == self.REJECT_GRADE)
+            grade_counts = matrix[grade_idx, predicts_default]
+            correct = int(grade_counts[predicts_default])
+            grade_total = int(grade_counts.sum())
+            class_total = int(actual_totals[predicts_default])
+
+            precision = self._ratio(correct, grade_total)
+            recall = self._ratio(correct, class_total)
+            f1 = self._ratio(2 * precision * recall, precision + recall)
+            grade_matrix = {
+                'correct': correct,
+                'incorrect': grade_total - correct,
+                'class_total': class_total
+            }
+
+            for metric_type, value, sample_size in (
+                ('precision', precision, grade_total),
+                ('recall', recall, class_total),
+                ('f1_score', f1, grade_total)
+            ):
+                metrics.append(ModelPerformanceMetric(
+                    metric_type=metric_type, value=value, grade=grade,
+                    sample_size=sample_size, confusion_matrix=grade_matrix, **common
+                ))
+
+        return metrics
+
+    def _ratio(self, numerator: float, denominator: float) -> float:
+        """Safe ratio rounded for storage"""
+        return round(float(numerator) / denominator, 4) if denominator else 0.0
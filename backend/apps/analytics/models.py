@@ -1,6 +1,8 @@
 from mongoengine import Document, fields
 from datetime import datetime
 
+from apps.credit_scoring.models import CreditApplication
+
 class AnalyticsMetric(Document):
     """Store analytics metrics"""
     metric_name = fields.StringField(required=True)
@@ -25,7 +27,7 @@ class AnalyticsMetric(Document):
             'metric_type',
             'period_type',
             ('metric_name', 'period_start'),
-            ('date_recorded', -1)
+            '-date_recorded'
         ]
     }
 
@@ -39,10 +41,66 @@ class ModelPerformanceMetric(Document):
     value = fields.FloatField(required=True)
     grade = fields.StringField(required=False)  # For grade-specific metrics
     sample_size = fields.IntField(required=True)
+    confusion_matrix = fields.DictField()  # tp / fp / tn / fn counts behind the value
+    evaluation_period = fields.StringField(choices=['1m', '3m', '6m', '1y'])
+    evaluation_run_id = fields.StringField()
     evaluation_date = fields.DateTimeField(default=datetime.utcnow)
     notes = fields.StringField()
     
     meta = {
         'collection': 'model_performance_metrics',
-        'indexes': ['model_version', 'metric_type', 'evaluation_date']
+        'indexes': [
+            'model_version',
+            'metric_type',
+            'evaluation_date',
+            ('evaluation_period', '-evaluation_date')
+        ]
+    }
+
+class LoanOutcome(Document):
+    """Observed repayment outcome for a scored application"""
+    application = fields.ReferenceField(CreditApplication, required=True)
+    application_id = fields.StringField(required=True, unique=True)
+    outcome = fields.StringField(choices=['repaid', 'defaulted'], required=True)
+    observed_at = fields.DateTimeField(default=datetime.utcnow)
+    recorded_by = fields.StringField()
+    notes = fields.StringField()
+    updated_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'loan_outcomes',
+        'indexes': ['application', 'outcome', 'observed_at']
+    }
+
+class SectorPerformanceStat(Document):
+    """Materialized per-business-type score statistics, bucketed by month"""
+    business_type = fields.StringField(required=True)
+    period_start = fields.DateTimeField(required=True)  # First day of the month (UTC)
+    total_count = fields.IntField(default=0)
+    approved_count = fields.IntField(default=0)  # Grades A and B
+    score_sum = fields.FloatField(default=0.0)
+    high_risk_count = fields.IntField(default=0)  # Risk levels high and very_high
+    updated_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'sector_performance_stats',
+        'indexes': [
+            {'fields': ['period_start', 'business_type'], 'unique': True}
+        ]
+    }
+
+class RedFlagDailyIndex(Document):
+    """Per-day red flag counters and flag pair co-occurrence counts"""
+    day = fields.DateTimeField(required=True)  # Midnight UTC
+    total_scores = fields.IntField(default=0)
+    flag_counts = fields.DictField()  # flag key -> number of scores raising it
+    pair_counts = fields.DictField()  # "flag_a|flag_b" (sorted) -> number of scores raising both
+    flag_meta = fields.DictField()  # flag key -> {name, flag_type, severity}
+    updated_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'red_flag_daily_index',
+        'indexes': [
+            {'fields': ['day'], 'unique': True}
+        ]
     }
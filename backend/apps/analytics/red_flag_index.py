@@ -0,0 +1,173 @@
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Any
+import logging
+
+from pymongo import UpdateOne
+
+from .models import RedFlagDailyIndex
+from apps.credit_scoring.models import CreditScore
+
+logger = logging.getLogger(__name__)
+
+class RedFlagIndexService:
+    """
+    Maintain per-day red flag frequencies and flag pair co-occurrence.
+    Each score write increments its day bucket, so any date range is
+    answered by summing at most one small document per day.
+    """
+    
+    PAIR_SEPARATOR = '|'
+    
+    def record_score(self, score) -> None:
+        """Fold a newly saved score into its day bucket"""
+        self._get_collection().update_one(
+            {'day': self._day_start(score.calculated_at)},
+            self._build_update(score.red_flags or []),
+            upsert=True
+        )
+    
+    def get_flag_index(self, date_from: datetime, date_to: datetime = None,
+                       top_n: int = 10) -> Dict[str, Any]:
+        """
+        Top flags and most frequent flag pairs for a date range.
+        Ranges are resolved at day granularity.
+        """
+        filters = {'day__gte': self._day_start(date_from)}
+        if date_to:
+            filters['day__lte'] = self._day_start(date_to)
+        
+        total_scores = 0
+        flag_counts = {}
+        pair_counts = {}
+        flag_meta = {}
+        
+        buckets = RedFlagDailyIndex.objects(**filters).only(
+            'total_scores', 'flag_counts', 'pair_counts', 'flag_meta'
+        ).as_pymongo()
+        
+        for bucket in buckets:
+            total_scores += bucket.get('total_scores', 0)
+            for key, count in bucket.get('flag_counts', {}).items():
+                flag_counts[key] = flag_counts.get(key, 0) + count
+            for key, count in bucket.get('pair_counts', {}).items():
+                pair_counts[key] = pair_counts.get(key, 0) + count
+            flag_meta.update(bucket.get('flag_meta', {}))
+        
+        top_flags = []
+        for key, count in sorted(flag_counts.items(), key=lambda x: x[1], reverse=True)[:top_n]:
+            meta = flag_meta.get(key, {})
+            top_flags.append({
+                'flag': meta.get('name', key),
+                'count': count,
+                'percentage': round(count / total_scores * 100, 2) if total_scores else 0,
+                'type': meta.get('flag_type'),
+                'severity': meta.get('severity')
+            })
+        
+        co_occurrence = []
+        for key, count in sorted(pair_counts.items(), key=lambda x: x[1], reverse=True)[:top_n]:
+            flag_a, flag_b = key.split(self.PAIR_SEPARATOR)
+            co_occurrence.append({
+                'flags': [flag_meta.get(flag_a, {}).get('name', flag_a),
+                          flag_meta.get(flag_b, {}).get('name', flag_b)],
+                'count': count,
+                'percentage': round(count / total_scores * 100, 2) if total_scores else 0,
+                # Share of scores raising either flag that raised both
+                'jaccard': round(
+                    count / (flag_counts.get(flag_a, 0) + flag_counts.get(flag_b, 0) - count), 4
+                ) if count else 0
+            })
+        
+        return {
+            'total_scores': total_scores,
+            'top_flags': top_flags,
+            'co_occurrence': co_occurrence
+        }
+    
+    def rebuild(self) -> int:
+        """Recompute every day bucket from stored scores (backfill / repair)"""
+        # Taken before the scan: buckets that live record_score calls create
+        # or touch while it runs are newer and survive the cleanup below
+        started_at = datetime.utcnow()
+        buckets = {}
+        scores = CreditScore.objects.only(
+            'calculated_at', 'red_flags.flag_name', 'red_flags.flag_type', 'red_flags.severity'
+        ).as_pymongo().batch_size(5000)
+        
+        for score in scores:
+            day = self._day_start(score['calculated_at'])
+            bucket = buckets.setdefault(day, {
+                'total_scores': 0, 'flag_counts': {}, 'pair_counts': {}, 'flag_meta': {}
+            })
+            bucket['total_scores'] += 1
+            
+            flags = self._unique_flags(score.get('red_flags') or [], lambda f, k: f.get(k))
+            for key, meta in flags.items():
+                bucket['flag_counts'][key] = bucket['flag_counts'].get(key, 0) + 1
+                bucket['flag_meta'][key] = meta
+            for pair in self._pair_keys(flags):
+                bucket['pair_counts'][pair] = bucket['pair_counts'].get(pair, 0) + 1
+        
+        # Each bucket is overwritten in place with an upsert, so live
+        # record_score increments never hit a missing or duplicate bucket
+        # and readers never see an empty index
+        operations = [
+            UpdateOne(
+                {'day': day},
+                {'$set': {**bucket, 'updated_at': started_at}},
+                upsert=True
+            )
+            for day, bucket in buckets.items()
+        ]
+        
+        collection = self._get_collection()
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        # Days no longer backed by any score (written before this rebuild and not since)
+        collection.delete_many({'updated_at': {'$lt': started_at}})
+        
+        logger.info(f"Rebuilt {len(operations)} red flag index buckets")
+        return len(operations)
+    
+    def _build_update(self, red_flags) -> Dict[str, Any]:
+        """Single $inc/$set update covering every flag and pair on a score"""
+        flags = self._unique_flags(red_flags, getattr)
+        
+        increments = {'total_scores': 1}
+        updates = {'updated_at': datetime.utcnow()}
+        
+        for key, meta in flags.items():
+            increments[f'flag_counts.{key}'] = 1
+            updates[f'flag_meta.{key}'] = meta
+        for pair in self._pair_keys(flags):
+            increments[f'pair_counts.{pair}'] = 1
+        
+        return {'$inc': increments, '$set': updates}
+    
+    def _unique_flags(self, red_flags, get) -> Dict[str, Dict]:
+        """Flags on one score keyed by storage key, each counted once"""
+        flags = {}
+        for flag in red_flags:
+            name = get(flag, 'flag_name')
+            if not name:
+                continue
+            flags[self._flag_key(name)] = {
+                'name': name,
+                'flag_type': get(flag, 'flag_type'),
+                'severity': get(flag, 'severity')
+            }
+        return flags
+    
+    def _pair_keys(self, flags: Dict[str, Dict]) -> List[str]:
+        return [self.PAIR_SEPARATOR.join(pair) for pair in combinations(sorted(flags), 2)]
+    
+    def _flag_key(self, name: str) -> str:
+        """Flag names become document keys, so strip characters MongoDB reserves"""
+        return name.replace('.', '_').replace('$', '_').replace(self.PAIR_SEPARATOR, '_')
+    
+    def _day_start(self, value: datetime) -> datetime:
+        return datetime(value.year, value.month, value.day)
+    
+    def _get_collection(self):
+        return RedFlagDailyIndex._get_collection()
@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import Dict, Any
+import logging
+
+from pymongo import UpdateOne
+
+from .models import SectorPerformanceStat
+from apps.credit_scoring.models import CreditScore
+
+logger = logging.getLogger(__name__)
+
+class SectorStatsService:
+    """
+    Maintain materialized per-business-type statistics.
+    Stats are bucketed by calendar month and updated incrementally
+    whenever a credit score is written.
+    """
+
+    APPROVED_GRADES = ['A', 'B']
+    HIGH_RISK_LEVELS = ['high', 'very_high']
+
+    def record_score(self, score) -> None:
+        """Fold a newly saved score into its sector/month bucket"""
+        application = score.application
+        if not application or not application.business_data:
+            return
+
+        SectorPerformanceStat.objects(
+            business_type=application.business_data.business_type,
+            period_start=self._month_start(score.calculated_at)
+        ).update_one(
+            upsert=True,
+            inc__total_count=1,
+            inc__approved_count=1 if score.grade in self.APPROVED_GRADES else 0,
+            inc__score_sum=float(score.total_points or 0),
+            inc__high_risk_count=1 if score.risk_level in self.HIGH_RISK_LEVELS else 0,
+            set__updated_at=datetime.utcnow()
+        )
+
+    def get_sector_stats(self, date_from: datetime) -> Dict[str, Any]:
+        """
+        Read all buckets since date_from in a single indexed query.
+        Buckets are whole months, so the window starts at the first day
+        of date_from's month. Returns per-sector totals and per-month
+        totals (across sectors).
+        """
+        sectors = {}
+        months = {}
+
+        buckets = SectorPerformanceStat.objects(
+            period_start__gte=self._month_start(date_from)
+        ).only(
+            'business_type', 'period_start', 'total_count',
+            'approved_count', 'score_sum', 'high_risk_count'
+        ).as_pymongo()
+
+        for bucket in buckets:
+            sector = sectors.setdefault(bucket['business_type'], {
+                'total_count': 0,
+                'approved_count': 0,
+                'score_sum': 0.0,
+                'high_risk_count': 0
+            })
+            sector['total_count'] += bucket.get('total_count', 0)
+            sector['approved_count'] += bucket.get('approved_count', 0)
+            sector['score_sum'] += bucket.get('score_sum', 0.0)
+            sector['high_risk_count'] += bucket.get('high_risk_count', 0)
+
+            month = months.setdefault(bucket['period_start'].month, {
+                'total_count': 0,
+                'score_sum': 0.0
+            })
+            month['total_count'] += bucket.get('total_count', 0)
+            month['score_sum'] += bucket.get('score_sum', 0.0)
+
+        return {'sectors': sectors, 'months': months}
+
+    def rebuild(self) -> int:
+        """Recompute every bucket from scratch (backfill / repair)"""
+        # Only scores before the cutoff are aggregated; ones written during
+        # the rebuild are left to record_score, which adds to the rebuilt bucket
+        now = datetime.utcnow()
+        pipeline = [
+            {'$match': {'calculated_at': {'$lt': now}}},
+            {'$lookup': {
+                'from': 'credit_applications',
+                'localField': 'application',
+                'foreignField': '_id',
+                'as': 'app'
+            }},
+            {'$unwind': '$app'},
+            {'$group': {
+                '_id': {
+                    'business_type': '$app.business_data.business_type',
+                    'year': {'$year': '$calculated_at'},
+                    'month': {'$month': '$calculated_at'}
+                },
+                'total_count': {'$sum': 1},
+                'approved_count': {'$sum': {
+                    '$cond': [{'$in': ['$grade', self.APPROVED_GRADES]}, 1, 0]
+                }},
+                'score_sum': {'$sum': '$total_points'},
+                'high_risk_count': {'$sum': {
+                    '$cond': [{'$in': ['$risk_level', self.HIGH_RISK_LEVELS]}, 1, 0]
+                }}
+            }}
+        ]
+
+        # Each bucket is overwritten in place with an upsert, so live
+        # record_score increments never hit a missing or duplicate bucket
+        # and readers never see an empty collection
+        operations = [
+            UpdateOne(
+                {
+                    'business_type': row['_id']['business_type'],
+                    'period_start': datetime(row['_id']['year'], row['_id']['month'], 1)
+                },
+                {'$set': {
+                    'total_count': row['total_count'],
+                    'approved_count': row['approved_count'],
+                    'score_sum': float(row['score_sum'] or 0),
+                    'high_risk_count': row['high_risk_count'],
+                    'updated_at': now
+                }},
+                upsert=True
+            )
+            for row in CreditScore.objects.aggregate(pipeline)
+            if row['_id'].get('business_type')
+        ]
+
+        collection = SectorPerformanceStat._get_collection()
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        # Buckets no longer backed by any score (written before this rebuild and not since)
+        collection.delete_many({'updated_at': {'$lt': now}})
+
+        logger.info(f"Rebuilt {len(operations)} sector performance buckets")
+        return len(operations)
+
+    def _month_start(self, value: datetime) -> datetime:
+        """Truncate a datetime to the first day of its month"""
+        return datetime(value.year, value.month, 1)
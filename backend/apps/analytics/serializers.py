@@ -0,0 +1,16 @@
+from rest_framework import serializers
+
+class LoanOutcomeSerializer(serializers.Serializer):
+    """Serializer for a single observed repayment outcome"""
+    application_id = serializers.CharField()
+    outcome = serializers.ChoiceField(choices=['repaid', 'defaulted'])
+    observed_at = serializers.DateTimeField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+class OutcomeIngestionRequestSerializer(serializers.Serializer):
+    """Serializer for bulk outcome ingestion requests"""
+    outcomes = serializers.ListField(
+        child=LoanOutcomeSerializer(),
+        min_length=1,
+        max_length=5000
+    )
@@ -0,0 +1,287 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+import json
+import logging
+import os
+import uuid
+
+import pandas as pd
+from django.conf import settings
+
+from apps.credit_scoring.models import CreditScore
+
+logger = logging.getLogger(__name__)
+
+def _require_pyarrow():
+    """Import pyarrow lazily so the rest of analytics works without it"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.dataset
+        return pyarrow
+    except ImportError:
+        logger.error("pyarrow not installed - analytics snapshots unavailable")
+        raise Exception("Analytics snapshots not available")
+
+def _snapshot_schema(pa):
+    return pa.schema([
+        ('score_id', pa.string()),
+        ('application_id', pa.string()),
+        ('business_type', pa.string()),
+        ('business_category', pa.int64()),
+        ('application_created_at', pa.timestamp('us')),
+        ('calculated_at', pa.timestamp('us')),
+        ('total_points', pa.float64()),
+        ('grade', pa.string()),
+        ('risk_level', pa.string()),
+        ('default_probability', pa.float64()),
+        ('data_points_score', pa.int64()),
+        ('credit_ratios_score', pa.float64()),
+        ('borrower_attributes_score', pa.int64()),
+        ('max_loan_amount', pa.float64()),
+        ('loan_amount_requested', pa.float64()),
+        ('version', pa.string()),
+        ('red_flags', pa.list_(pa.string())),
+        ('hard_flag_count', pa.int64()),
+        ('soft_flag_count', pa.int64()),
+    ])
+
+class AnalyticsSnapshotExporter:
+    """
+    Stream CreditApplication + CreditScore rows into month-partitioned
+    Parquet files. Each run appends only scores newer than the stored
+    watermark, so the production database is read once per score.
+    """
+    
+    STATE_FILE = '_export_state.json'
+    # Leave recently written scores for the next run so late inserts are not skipped
+    SETTLE_DELAY = timedelta(minutes=5)
+    
+    def __init__(self, snapshot_dir: str = None, batch_size: int = 5000):
+        self.snapshot_dir = snapshot_dir or settings.ANALYTICS_SNAPSHOT_DIR
+        self.batch_size = batch_size
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+    
+    def export(self) -> Dict[str, Any]:
+        """Append all settled scores newer than the watermark"""
+        pa = _require_pyarrow()
+        schema = _snapshot_schema(pa)
+        
+        state = self._load_state()
+        run_id = datetime.utcnow().strftime('%Y%m%d%H%M%S') + '-' + uuid.uuid4().hex[:6]
+        cutoff = datetime.utcnow() - self.SETTLE_DELAY
+        
+        cursor = CreditScore.objects.aggregate(
+            self._export_pipeline(state, cutoff),
+            allowDiskUse=True,
+            batchSize=self.batch_size
+        )
+        
+        batch = []
+        exported = 0
+        part = 0
+        
+        for doc in cursor:
+            batch.append(self._flatten(doc))
+            if len(batch) >= self.batch_size:
+                self._write_batch(pa, schema, batch, run_id, part)
+                self._save_state(batch[-1]['calculated_at'], batch[-1]['score_id'], len(batch))
+                exported += len(batch)
+                part += 1
+                batch = []
+        
+        if batch:
+            self._write_batch(pa, schema, batch, run_id, part)
+            self._save_state(batch[-1]['calculated_at'], batch[-1]['score_id'], len(batch))
+            exported += len(batch)
+        
+        logger.info(f"Analytics snapshot {run_id} exported {exported} rows")
+        return {'run_id': run_id, 'rows_exported': exported}
+    
+    def _export_pipeline(self, state: Dict, cutoff: datetime) -> List[Dict]:
+        """Aggregation that joins each new score with its application"""
+        from bson import ObjectId
+        
+        match = {'calculated_at': {'$lt': cutoff}}
+        if state.get('last_calculated_at'):
+            last_time = datetime.fromisoformat(state['last_calculated_at'])
+            match['$or'] = [
+                {'calculated_at': {'$gt': last_time}},
+                {'calculated_at': last_time, '_id': {'$gt': ObjectId(state['last_score_id'])}}
+            ]
+        
+        return [
+            {'$match': match},
+            {'$sort': {'calculated_at': 1, '_id': 1}},
+            {'$lookup': {
+                'from': 'credit_applications',
+                'localField': 'application',
+                'foreignField': '_id',
+                'as': 'app'
+            }},
+            {'$unwind': '$app'},
+            {'$project': {
+                'application_id': '$app.application_id',
+                'business_type': '$app.business_data.business_type',
+                'business_category': '$app.business_data.business_category',
+                'application_created_at': '$app.created_at',
+                'loan_amount_requested': '$app.loan_amount_requested',
+                'calculated_at': 1, 'total_points': 1, 'grade': 1,
+                'risk_level': 1, 'default_probability': 1,
+                'data_points_score': 1, 'credit_ratios_score': 1,
+                'borrower_attributes_score': 1, 'max_loan_amount': 1,
+                'version': 1, 'red_flags.flag_name': 1, 'red_flags.flag_type': 1
+            }}
+        ]
+    
+    def _flatten(self, doc: Dict) -> Dict[str, Any]:
+        """Convert one joined document into a snapshot row"""
+        flags = doc.get('red_flags') or []
+        return {
+            'score_id': str(doc['_id']),
+            'application_id': doc.get('application_id'),
+            'business_type': doc.get('business_type'),
+            'business_category': doc.get('business_category'),
+            'application_created_at': doc.get('application_created_at'),
+            'calculated_at': doc['calculated_at'],
+            'total_points': self._float(doc.get('total_points')),
+            'grade': doc.get('grade'),
+            'risk_level': doc.get('risk_level'),
+            'default_probability': self._float(doc.get('default_probability')),
+            'data_points_score': doc.get('data_points_score'),
+            'credit_ratios_score': self._float(doc.get('credit_ratios_score')),
+            'borrower_attributes_score': doc.get('borrower_attributes_score'),
+            'max_loan_amount': self._float(doc.get('max_loan_amount')),
+            'loan_amount_requested': self._float(doc.get('loan_amount_requested')),
+            'version': doc.get('version'),
+            'red_flags': [f.get('flag_name') for f in flags],
+            'hard_flag_count': len([f for f in flags if f.get('flag_type') == 'hard']),
+            'soft_flag_count': len([f for f in flags if f.get('flag_type') == 'soft']),
+        }
+    
+    def _write_batch(self, pa, schema, rows: List[Dict], run_id: str, part: int) -> None:
+        """Write one batch, split into its month partitions"""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row['calculated_at'].strftime('%Y-%m'), []).append(row)
+        
+        for month, month_rows in by_month.items():
+            partition_dir = os.path.join(self.snapshot_dir, f"month={month}")
+            os.makedirs(partition_dir, exist_ok=True)
+            
+            table = pa.Table.from_pylist(month_rows, schema=schema)
+            file_path = os.path.join(partition_dir, f"part-{run_id}-{part:05d}.parquet")
+            tmp_path = file_path + '.tmp'
+            pa.parquet.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, file_path)
+    
+    def _load_state(self) -> Dict[str, Any]:
+        state_path = os.path.join(self.snapshot_dir, self.STATE_FILE)
+        if not os.path.exists(state_path):
+            return {}
+        with open(state_path) as f:
+            return json.load(f)
+    
+    def _save_state(self, last_calculated_at: datetime, last_score_id: str, rows_written: int) -> None:
+        """Persist the watermark atomically after every written batch"""
+        state = self._load_state()
+        state.update({
+            'last_calculated_at': last_calculated_at.isoformat(),
+            'last_score_id': last_score_id,
+            'rows_exported_total': state.get('rows_exported_total', 0) + rows_written,
+            'updated_at': datetime.utcnow().isoformat()
+        })
+        
+        state_path = os.path.join(self.snapshot_dir, self.STATE_FILE)
+        tmp_path = state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, state_path)
+    
+    def _float(self, value) -> Optional[float]:
+        return float(value) if value is not None else None
+
+class SnapshotQuery:
+    """Run heavy analytical queries against local snapshot files"""
+    
+    MONTH_NAMES = [
+        '', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'
+    ]
+    
+    def __init__(self, snapshot_dir: str = None):
+        self.snapshot_dir = snapshot_dir or settings.ANALYTICS_SNAPSHOT_DIR
+    
+    def load(self, columns: List[str] = None, date_from: datetime = None,
+             date_to: datetime = None) -> pd.DataFrame:
+        """Load snapshot rows, pruning month partitions outside the range"""
+        pa = _require_pyarrow()
+        import pyarrow.dataset as ds
+        
+        dataset = ds.dataset(
+            self.snapshot_dir,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive'),
+            exclude_invalid_files=True
+        )
+        
+        expression = None
+        if date_from:
+            expression = ds.field('month') >= date_from.strftime('%Y-%m')
+            expression &= ds.field('calculated_at') >= pa.scalar(date_from, pa.timestamp('us'))
+        if date_to:
+            upper = (ds.field('month') <= date_to.strftime('%Y-%m')) & \
+                    (ds.field('calculated_at') <= pa.scalar(date_to, pa.timestamp('us')))
+            expression = upper if expression is None else expression & upper
+        
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+    
+    def seasonal_patterns(self, date_from: datetime = None, date_to: datetime = None,
+                          by_business_type: bool = False) -> List[Dict]:
+        """Average score and volume per calendar month (optionally per sector)"""
+        df = self.load(['calculated_at', 'business_type', 'total_points'], date_from, date_to)
+        if df.empty:
+            return []
+        
+        df['month'] = df['calculated_at'].dt.month
+        keys = ['business_type', 'month'] if by_business_type else ['month']
+        grouped = df.groupby(keys)['total_points'].agg(['mean', 'count']).reset_index()
+        
+        patterns = []
+        for row in grouped.itertuples(index=False):
+            avg_score = float(row.mean)
+            if avg_score > 70:
+                trend = 'high'
+            elif avg_score > 55:
+                trend = 'normal'
+            else:
+                trend = 'low'
+            
+            pattern = {
+                'month': self.MONTH_NAMES[int(row.month)],
+                'trend': trend,
+                'avg_score': round(avg_score, 2),
+                'applications': int(row.count)
+            }
+            if by_business_type:
+                pattern['business_type'] = row.business_type
+            patterns.append(pattern)
+        
+        return patterns
+    
+    def flag_co_occurrence(self, date_from: datetime = None, date_to: datetime = None,
+                           top_n: int = 20) -> List[Dict]:
+        """Most frequent pairs of red flags raised on the same score"""
+        df = self.load(['score_id', 'red_flags'], date_from, date_to)
+        flags = df.explode('red_flags').dropna(subset=['red_flags']).drop_duplicates()
+        if flags.empty:
+            return []
+        
+        pairs = flags.merge(flags, on='score_id')
+        pairs = pairs[pairs['red_flags_x'] < pairs['red_flags_y']]
+        counts = pairs.groupby(['red_flags_x', 'red_flags_y']).size().nlargest(top_n)
+        
+        return [
+            {'flags': [flag_a, flag_b], 'count': int(count)}
+            for (flag_a, flag_b), count in counts.items()
+        ]
@@ -0,0 +1,45 @@
+from celery import shared_task
+import logging
+
+from .sector_stats import SectorStatsService
+from .red_flag_index import RedFlagIndexService
+from .model_performance import ModelPerformanceService
+from .snapshots import AnalyticsSnapshotExporter
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def rebuild_sector_stats():
+    """Rebuild materialized sector statistics from all stored scores"""
+    try:
+        return SectorStatsService().rebuild()
+    except Exception as e:
+        logger.error(f"Sector statistics rebuild failed: {str(e)}")
+        raise
+
+@shared_task
+def rebuild_red_flag_index():
+    """Rebuild the red flag frequency and co-occurrence index from all stored scores"""
+    try:
+        return RedFlagIndexService().rebuild()
+    except Exception as e:
+        logger.error(f"Red flag index rebuild failed: {str(e)}")
+        raise
+
+@shared_task
+def evaluate_model_performance():
+    """Evaluate scoring decisions against recorded repayment outcomes"""
+    try:
+        return ModelPerformanceService().evaluate()
+    except Exception as e:
+        logger.error(f"Model performance evaluation failed: {str(e)}")
+        raise
+
+@shared_task
+def export_analytics_snapshot():
+    """Append newly scored applications to the columnar analytics snapshot"""
+    try:
+        return AnalyticsSnapshotExporter().export()
+    except Exception as e:
+        logger.error(f"Analytics snapshot export failed: {str(e)}")
+        raise
@@ -1,8 +1,15 @@
 from django.urls import path
-from .views import DashboardAnalyticsView, PerformanceMetricsView, BusinessInsightsView
+from .views import (
+    DashboardAnalyticsView, PerformanceMetricsView, BusinessInsightsView,
+    OutcomeIngestionView, ScoreTrendStreamView, RedFlagIndexView, MLStageLatencyView
+)
 
 urlpatterns = [
     path('dashboard/', DashboardAnalyticsView.as_view(), name='dashboard_analytics'),
     path('performance/', PerformanceMetricsView.as_view(), name='performance_metrics'),
     path('business-insights/', BusinessInsightsView.as_view(), name='business_insights'),
+    path('ml-stage-latency/', MLStageLatencyView.as_view(), name='ml_stage_latency'),
+    path('red-flags/', RedFlagIndexView.as_view(), name='red_flag_index'),
+    path('outcomes/', OutcomeIngestionView.as_view(), name='outcome_ingestion'),
+    path('stream/score-trends/', ScoreTrendStreamView.as_view(), name='score_trend_stream'),
 ]
\ No newline at end of file
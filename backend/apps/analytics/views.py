@@ -2,12 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
 from datetime import datetime
+import asyncio
+import json
 import logging
 
 from .analytics_service import AnalyticsService
+from .live_metrics import live_score_metrics
+from .model_performance import ModelPerformanceService
+from .serializers import OutcomeIngestionRequestSerializer
 from apps.common.mixins import ResponseMixin
-from apps.common.permissions import CanViewReports
+from apps.common.permissions import CanViewReports, IsAnalystOrAbove
+from apps.authentication.models import User
+from apps.credit_scoring.services.ml_prediction import ml_stage_latency
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +69,13 @@ class PerformanceMetricsView(APIView, ResponseMixin):
         """Get performance metrics"""
         try:
             period = request.GET.get('period', '6m')
+            model_version = request.GET.get('model_version')
             
             analytics_service = AnalyticsService()
-            performance_data = analytics_service.get_performance_metrics(period=period)
+            performance_data = analytics_service.get_performance_metrics(
+                period=period,
+                model_version=model_version
+            )
             
             return self.success_response(data=performance_data)
             
@@ -69,6 +86,23 @@ class PerformanceMetricsView(APIView, ResponseMixin):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class MLStageLatencyView(APIView, ResponseMixin):
+    """Latency percentiles of the scoring engine's ML stage across all workers"""
+    permission_classes = [IsAuthenticated, CanViewReports]
+    
+    def get(self, request):
+        """Get ML stage latency percentiles against the configured budget"""
+        try:
+            budget_ms = float(settings.CREDIT_SCORING.get('AI_PREDICTION_TIMEOUT_MS', 50))
+            return self.success_response(data=ml_stage_latency.summary(budget_ms))
+            
+        except Exception as e:
+            logger.error(f"Error fetching ML stage latency: {str(e)}")
+            return self.error_response(
+                message="Failed to fetch ML stage latency",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 class BusinessInsightsView(APIView, ResponseMixin):
     """Get business insights"""
     permission_classes = [IsAuthenticated, CanViewReports]
@@ -87,356 +121,171 @@ class BusinessInsightsView(APIView, ResponseMixin):
                 message="Failed to fetch business insights",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-        
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse, Http404
-from datetime import datetime, timedelta
-import os
-import logging
 
-from .models import GeneratedReport, ReportTemplate
-from .serializers import ReportGenerationRequestSerializer, ReportListSerializer
-from .report_generator import ReportGenerator
-from apps.common.mixins import ResponseMixin, AuditMixin
-from apps.common.permissions import CanViewReports, IsAnalystOrAbove
-from apps.common.utils import paginate_queryset
-from apps.authentication.models import User
-
-logger = logging.getLogger(__name__)
-
-class ReportGenerationView(APIView, ResponseMixin, AuditMixin):
-    """Generate reports"""
+class RedFlagIndexView(APIView, ResponseMixin):
+    """Get red flag frequencies and co-occurrence"""
     permission_classes = [IsAuthenticated, CanViewReports]
     
-    def post(self, request):
-        """Generate new report"""
+    def get(self, request):
+        """Get top red flags and flag pairs for a date range"""
         try:
-            # Validate request
-            serializer = ReportGenerationRequestSerializer(data=request.data)
-            if not serializer.is_valid():
-                return self.validation_error_response(serializer)
-            
-            # Get current user
-            user_id = request.user.get('user_id')
-            user = User.objects(id=user_id).first()
-            
-            if not user:
-                return self.error_response(
-                    message="User not found",
-                    status_code=status.HTTP_401_UNAUTHORIZED
-                )
-            
-            # Extract request data
-            report_type = serializer.validated_data['report_type']
-            application_ids = serializer.validated_data['application_ids']
-            format_type = serializer.validated_data.get('format', 'pdf')
-            include_charts = serializer.validated_data.get('include_charts', True)
-            include_recommendations = serializer.validated_data.get('include_recommendations', True)
+            date_from = request.GET.get('date_from')
+            date_to = request.GET.get('date_to')
+            top_n = min(int(request.GET.get('top_n', 10)), 100)
             
-            # Generate report
-            generator = ReportGenerator()
-            result = generator.generate_report(
-                report_type=report_type,
-                application_ids=application_ids,
-                format=format_type,
-                include_charts=include_charts,
-                include_recommendations=include_recommendations
-            )
+            if date_from:
+                date_from = datetime.fromisoformat(date_from)
+            if date_to:
+                date_to = datetime.fromisoformat(date_to)
             
-            # Save report record
-            report_record = GeneratedReport(
-                report_id=result['report_id'],
-                report_type=result['report_type'],
-                application_ids=application_ids,
-                format=result['format'],
-                report_data=result['report_data'],
-                file_path=result['file_path'],
-                download_url=result['download_url'],
-                requested_by=str(user.id),
-                generated_at=result['generated_at'],
-                generation_duration=result['generation_duration'],
-                file_size=result['file_size'],
-                status='completed',
-                expires_at=result['expires_at']
+            analytics_service = AnalyticsService()
+            index_data = analytics_service.get_red_flag_index(
+                date_from=date_from,
+                date_to=date_to,
+                top_n=top_n
             )
-            report_record.save()
             
-            # Log activity
-            self.log_user_activity(
-                user=user,
-                action='generate_report',
-                resource=result['report_id'],
-                details={
-                    'report_type': report_type,
-                    'format': format_type,
-                    'application_count': len(application_ids)
-                },
-                request=request
-            )
+            return self.success_response(data=index_data)
             
-            return self.success_response(
-                 data={
-                    'report_id': result['report_id'],
-                    'report_type': result['report_type'],
-                    'format': result['format'],
-                    'status': result['status'],
-                    'download_url': result['download_url'],
-                    'file_size': result['file_size'],
-                    'expires_at': result['expires_at'].isoformat()
-                },
-                message="Report generated successfully",
-                status_code=status.HTTP_201_CREATED
+        except ValueError:
+            return self.error_response(
+                message="Invalid date or top_n parameter",
+                status_code=status.HTTP_400_BAD_REQUEST
             )
-            
         except Exception as e:
-            logger.error(f"Report generation failed: {str(e)}")
+            logger.error(f"Error fetching red flag index: {str(e)}")
             return self.error_response(
-                message=f"Report generation failed: {str(e)}",
+                message="Failed to fetch red flag index",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class ReportListView(APIView, ResponseMixin):
-    """List generated reports"""
-    permission_classes = [IsAuthenticated, CanViewReports]
+class OutcomeIngestionView(APIView, ResponseMixin):
+    """Record observed repayment outcomes for scored applications"""
+    permission_classes = [IsAuthenticated, IsAnalystOrAbove]
     
-    def get(self, request):
-        """Get user's reports"""
+    def post(self, request):
+        """Ingest a batch of repayment outcomes"""
         try:
-            # Get current user
-            user_id = request.user.get('user_id')
-            user = User.objects(id=user_id).first()
-            
-            if not user:
-                return self.error_response(
-                    message="User not found",
-                    status_code=status.HTTP_401_UNAUTHORIZED
-                )
-            
-            # Get query parameters
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 20))
-            report_type = request.GET.get('report_type')
-            status_filter = request.GET.get('status')
-            
-            # Build query
-            query_params = {'requested_by': str(user.id)}
-            if report_type:
-                query_params['report_type'] = report_type
-            if status_filter:
-                query_params['status'] = status_filter
-            
-            # Get reports
-            reports = GeneratedReport.objects(**query_params).order_by('-generated_at')
-            
-            # Paginate
-            paginated_data = paginate_queryset(reports, page, page_size)
+            serializer = OutcomeIngestionRequestSerializer(data=request.data)
+            if not serializer.is_valid():
+                return self.validation_error_response(serializer)
             
-            # Serialize
-            serializer_data = []
-            for report in paginated_data['items']:
-                serializer_data.append({
-                    'id': str(report.id),
-                    'report_id': report.report_id,
-                    'report_type': report.report_type,
-                    'format': report.format,
-                    'status': report.status,
-                    'generated_at': report.generated_at,
-                    'expires_at': report.expires_at,
-                    'file_size': report.file_size,
-                    'download_url': report.download_url
-                })
+            service = ModelPerformanceService()
+            result = service.record_outcomes(
+                serializer.validated_data['outcomes'],
+                recorded_by=str(request.user.get('user_id'))
+            )
             
-            return self.success_response({
-                'results': serializer_data,
-                'pagination': paginated_data['pagination']
-            })
+            return self.success_response(
+                data=result,
+                message=f"{result['recorded']} outcomes recorded",
+                status_code=status.HTTP_201_CREATED
+            )
             
         except Exception as e:
-            logger.error(f"Error fetching reports: {str(e)}")
+            logger.error(f"Error recording loan outcomes: {str(e)}")
             return self.error_response(
-                message="Failed to fetch reports",
+                message="Failed to record loan outcomes",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class ReportDownloadView(APIView):
-    """Download generated reports"""
-    permission_classes = [IsAuthenticated, CanViewReports]
+class ScoreTrendStreamView(View):
+    """
+    Server-sent event stream of per-minute score trend deltas.
+    Sends the full live window once, then only buckets that changed,
+    as announced on the live metrics Redis channel by any worker.
+    Served by the ASGI stream service (see docker-compose.yml) so an
+    open stream does not pin a WSGI worker.
+    """
+    poll_interval = 1.0  # Seconds of updates coalesced into one delta
+    heartbeat_interval = 15.0  # Seconds between keep-alive comments
     
-    def get(self, request, report_id):
-        """Download report file"""
-        try:
-            # Get report
-            report = GeneratedReport.objects(report_id=report_id).first()
-            
-            if not report:
-                return Response(
-                    {'error': 'Report not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Check if user can access this report
-            user_id = request.user.get('user_id')
-            if report.requested_by != str(user_id):
-                # Check if user is admin or manager
-                user = User.objects(id=user_id).first()
-                if not user or user.role not in ['admin', 'manager']:
-                    return Response(
-                        {'error': 'Access denied'},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
-            
-            # Check if report has expired
-            if report.expires_at and datetime.utcnow() > report.expires_at:
-                return Response(
-                    {'error': 'Report has expired'},
-                    status=status.HTTP_410_GONE
-                )
-            
-            # Check if file exists
-            if not os.path.exists(report.file_path):
-                return Response(
-                    {'error': 'Report file not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Log download activity
-            user = User.objects(id=user_id).first()
-            if user:
-                self.log_user_activity(
-                    user=user,
-                    action='download_report',
-                    resource=report_id,
-                    request=request
-                )
-            
-            # Return file
-            response = FileResponse(
-                open(report.file_path, 'rb'),
-                content_type='application/octet-stream'
+    async def get(self, request):
+        """Open the score trend event stream"""
+        user_id = self._authenticate(request)
+        if not user_id:
+            return JsonResponse(
+                {'success': False, 'message': 'Authentication required'},
+                status=status.HTTP_401_UNAUTHORIZED
             )
-            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(report.file_path)}"'
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error downloading report: {str(e)}")
-            return Response(
-                {'error': 'Download failed'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        
+        if not await sync_to_async(self._can_view_reports)(user_id):
+            return JsonResponse(
+                {'success': False, 'message': 'Access denied'},
+                status=status.HTTP_403_FORBIDDEN
             )
-
-class ScoreBreakdownView(APIView, ResponseMixin):
-    """Get score breakdown for specific application"""
-    permission_classes = [IsAuthenticated, CanViewReports]
+        
+        response = StreamingHttpResponse(
+            self._event_stream(),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
     
-    def get(self, request, application_id):
-        """Get detailed score breakdown"""
+    async def _event_stream(self):
+        """Yield a snapshot event followed by delta events"""
+        client = live_score_metrics.async_client()
+        pubsub = client.pubsub()
         try:
-            from apps.credit_scoring.models import CreditApplication, CreditScore
-            
-            # Get application and score
-            application = CreditApplication.objects(application_id=application_id).first()
-            if not application:
-                return self.error_response(
-                    message="Application not found",
-                    status_code=status.HTTP_404_NOT_FOUND
-                )
-            
-            score = CreditScore.objects(application=application).first()
-            if not score:
-                return self.error_response(
-                    message="Score not calculated yet",
-                    status_code=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Generate breakdown report
-            generator = ReportGenerator()
-            report_data = generator._generate_score_breakdown([{
-                'application': application,
-                'score': score
-            }])
-            
-            # Return the breakdown for single application
-            if report_data['applications']:
-                breakdown = report_data['applications'][0]
-                
-                return self.success_response(data={
-                    'application_id': breakdown['application_id'],
-                    'borrower_name': breakdown['borrower_name'],
-                    'business_name': breakdown['business_name'],
-                    'final_score': breakdown['score_details']['final_score'],
-                    'grade': breakdown['score_details']['grade'],
-                    'component_scores': breakdown['score_details']['component_scores'],
-                    'risk_assessment': breakdown['risk_assessment'],
-                    'recommendations': breakdown['recommendations']
-                })
-            else:
-                return self.error_response(
-                    message="Unable to generate breakdown",
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-                
-        except Exception as e:
-            logger.error(f"Error generating score breakdown: {str(e)}")
-            return self.error_response(
-                message="Failed to generate score breakdown",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-class RiskAssessmentView(APIView, ResponseMixin):
-    """Get risk assessment for specific application"""
-    permission_classes = [IsAuthenticated, CanViewReports]
+            # Subscribe before reading the snapshot so no update falls in between
+            await pubsub.subscribe(live_score_metrics.CHANNEL)
+            sequence, buckets = await live_score_metrics.async_snapshot(client)
+            yield self._format_event('snapshot', {'sequence': sequence, 'buckets': buckets})
+            
+            idle = 0.0
+            while True:
+                minutes = await self._collect_updates(pubsub)
+                if minutes:
+                    idle = 0.0
+                    sequence = max(sequence, max(minutes.values()))
+                    changed = await live_score_metrics.async_buckets(client, minutes)
+                    yield self._format_event('delta', {'sequence': sequence, 'buckets': changed})
+                else:
+                    idle += self.poll_interval
+                    if idle >= self.heartbeat_interval:
+                        idle = 0.0
+                        yield ': keep-alive\n\n'
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+    
+    async def _collect_updates(self, pubsub) -> dict:
+        """Minutes announced during one poll interval, with the latest sequence of each"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.poll_interval
+        minutes = {}
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return minutes
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is None:
+                continue
+            update = json.loads(message['data'])
+            minutes[update['minute']] = max(minutes.get(update['minute'], 0), update['sequence'])
     
-    def get(self, request, application_id):
-        """Get detailed risk assessment"""
+    def _format_event(self, event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    def _authenticate(self, request):
+        """Validate the JWT from the Authorization header or ?token= (EventSource cannot set headers)"""
+        raw_token = request.GET.get('token')
+        if not raw_token:
+            header = request.META.get('HTTP_AUTHORIZATION', '')
+            parts = header.split()
+            if len(parts) == 2 and parts[0] == 'Bearer':
+                raw_token = parts[1]
+        
+        if not raw_token:
+            return None
+        
         try:
-            from apps.credit_scoring.models import CreditApplication, CreditScore
-            
-            # Get application and score
-            application = CreditApplication.objects(application_id=application_id).first()
-            if not application:
-                return self.error_response(
-                    message="Application not found",
-                    status_code=status.HTTP_404_NOT_FOUND
-                )
-            
-            score = CreditScore.objects(application=application).first()
-            if not score:
-                return self.error_response(
-                    message="Score not calculated yet",
-                    status_code=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Generate risk assessment
-            generator = ReportGenerator()
-            risk_factors = generator._identify_risk_factors(application, score)
-            mitigation_strategies = generator._generate_mitigation_strategies(score)
-            monitoring_recommendations = generator._generate_monitoring_recommendations(score)
-            
-            return self.success_response(data={
-                'application_id': application_id,
-                'risk_level': score.risk_level,
-                'default_probability': float(score.default_probability),
-                'red_flags': [
-                    {
-                        'type': flag.flag_type,
-                        'name': flag.flag_name,
-                        'description': flag.description,
-                        'severity': flag.severity,
-                        'impact': flag.impact
-                    }
-                    for flag in score.red_flags
-                ],
-                'risk_factors': risk_factors,
-                'mitigation_strategies': mitigation_strategies,
-                'monitoring_recommendations': monitoring_recommendations
-            })
-            
-        except Exception as e:
-            logger.error(f"Error generating risk assessment: {str(e)}")
-            return self.error_response(
-                message="Failed to generate risk assessment",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            validated_token = JWTAuthentication().get_validated_token(raw_token)
+            return validated_token.get('user_id')
+        except (InvalidToken, TokenError):
+            return None
+    
+    def _can_view_reports(self, user_id) -> bool:
+        user = User.objects(id=user_id).first()
+        return bool(user and user.has_permission('view_reports') and user.is_active)
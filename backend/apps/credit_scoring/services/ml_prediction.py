@@ -0,0 +1,243 @@
+# apps/credit_scoring/services/ml_prediction.py
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from ai_models.inference.model_registry import ModelRegistry
+from ai_models.inference.risk_assessor import RiskAssessor
+from ai_models.training.data_preprocessor import CreditDataPreprocessor
+
+logger = logging.getLogger(__name__)
+
+class MLStageLatency:
+    """
+    Recent ML stage latencies as seen by the scoring request (submit to
+    result or fallback), with the outcome of each call. Samples go to a
+    capped Redis list shared by every worker process, so the summary
+    covers the whole deployment rather than the process answering it.
+    """
+    
+    KEY = 'ml_stage_latency:samples'
+    PERCENTILES = [50, 90, 95, 99]
+    
+    def __init__(self, max_samples: int = 20000):
+        self.max_samples = max_samples
+    
+    def record(self, latency_ms: float, status: str) -> None:
+        try:
+            pipe = get_redis_connection('default').pipeline(transaction=False)
+            pipe.lpush(self.KEY, f"{latency_ms:.3f}:{status}")
+            pipe.ltrim(self.KEY, 0, self.max_samples - 1)
+            pipe.execute()
+        except Exception as e:
+            # Monitoring must never fail the score
+            logger.error(f"Failed to record ML stage latency: {str(e)}")
+    
+    def summary(self, budget_ms: float) -> Dict[str, Any]:
+        """Latency percentiles overall and per outcome, and the share of calls within budget"""
+        samples = [
+            sample.decode().split(':', 1)
+            for sample in get_redis_connection('default').lrange(self.KEY, 0, -1)
+        ]
+        
+        latencies = np.array([float(latency) for latency, _ in samples], dtype=np.float64)
+        statuses = np.array([status for _, status in samples], dtype=object)
+        
+        return {
+            'budget_ms': budget_ms,
+            'samples': len(samples),
+            'within_budget_rate': round(float(np.mean(latencies <= budget_ms)) * 100, 2) if len(samples) else None,
+            'latency_ms': self._percentiles(latencies),
+            'outcomes': {
+                status: {
+                    'count': int(np.sum(statuses == status)),
+                    'latency_ms': self._percentiles(latencies[statuses == status])
+                }
+                for status in sorted(set(statuses))
+            }
+        }
+    
+    def _percentiles(self, latencies: np.ndarray) -> Dict[str, Optional[float]]:
+        if not len(latencies):
+            return {f"p{p}": None for p in self.PERCENTILES} | {'max': None}
+        values = np.percentile(latencies, self.PERCENTILES)
+        return {f"p{p}": round(float(v), 3) for p, v in zip(self.PERCENTILES, values)} | {
+            'max': round(float(latencies.max()), 3)
+        }
+
+class PredictionCache:
+    """Bounded LRU of model predictions keyed by (model version, feature record hash)"""
+    
+    def __init__(self, max_entries: int = 10000):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+    
+    def get(self, key) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            prediction = self._entries.get(key)
+            if prediction is not None:
+                self._entries.move_to_end(key)
+            return prediction
+    
+    def set(self, key, prediction: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = prediction
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class MLPredictionStage:
+    """
+    Optional ML stage of CreditScoringEngine. submit() starts the model
+    prediction on a worker thread as soon as the rule-based outputs it
+    uses as features exist; collect() waits for it only until the
+    latency budget (measured from submit) runs out. On timeout, a full
+    worker pool, a missing model or an error the score stays rules-only
+    and ai_predictions records why.
+    """
+    
+    def __init__(self):
+        config = settings.CREDIT_SCORING
+        self.enabled = config.get('ENABLE_AI_PREDICTIONS', True)
+        self.budget_ms = float(config.get('AI_PREDICTION_TIMEOUT_MS', 50))
+        self.registry = ModelRegistry(config.get('AI_MODELS_PATH'))
+        # Only builds the raw feature record; the model's fitted preprocessor transforms it
+        self.record_builder = CreditDataPreprocessor()
+    
+    def submit(self, application, credit_score) -> Optional[Dict[str, Any]]:
+        """Start predicting for an unsaved score; returns the pending call for collect()"""
+        if not self.enabled:
+            return None
+        
+        started = time.perf_counter()
+        pending = {'started': started, 'future': None, 'prediction': None, 'status': None}
+        try:
+            record = self.record_builder.build_feature_record(application, credit_score)
+            record_hash = hashlib.sha256(
+                json.dumps(record, sort_keys=True, default=str).encode('utf-8')
+            ).hexdigest()
+            
+            # A stale or unloaded model goes to the worker, which (re)loads it off the request thread
+            version = self.registry.loaded_version()
+            prediction = _prediction_cache.get((version, record_hash)) if version else None
+            if prediction is not None:
+                pending.update(prediction=prediction, status='cached')
+                return pending
+            
+            if not _worker_slots.acquire(blocking=False):
+                pending['status'] = 'busy'
+                return pending
+            
+            try:
+                future = _get_executor().submit(self._predict, record, record_hash)
+            except Exception:
+                _worker_slots.release()
+                raise
+            future.add_done_callback(lambda _: _worker_slots.release())
+            pending['future'] = future
+            return pending
+        
+        except Exception as e:
+            logger.error(f"Failed to start ML prediction: {str(e)}")
+            pending['status'] = 'error'
+            return pending
+    
+    def collect(self, pending: Optional[Dict[str, Any]], application, credit_score) -> Dict[str, Any]:
+        """ai_predictions for the score: the model output if it arrived within budget, plus the risk assessment"""
+        if pending is None:
+            return {}
+        
+        prediction = pending['prediction']
+        status = pending['status']
+        if pending['future'] is not None:
+            remaining = self.budget_ms / 1000 - (time.perf_counter() - pending['started'])
+            try:
+                prediction = pending['future'].result(timeout=max(remaining, 0))
+                status = 'predicted'
+            except FutureTimeoutError:
+                # The worker finishes in the background and still fills the cache
+                status = 'timeout'
+            except ModelUnavailableError:
+                status = 'unavailable'
+            except Exception as e:
+                logger.error(f"ML prediction failed: {str(e)}")
+                status = 'error'
+        
+        latency_ms = (time.perf_counter() - pending['started']) * 1000
+        ml_stage_latency.record(latency_ms, status)
+        
+        ai_predictions = {'status': status, 'latency_ms': round(latency_ms, 3), 'budget_ms': self.budget_ms}
+        if prediction is not None:
+            ai_predictions.update(prediction)
+        
+        try:
+            ai_predictions['risk_assessment'] = RiskAssessor().comprehensive_risk_assessment(
+                self._application_data(application),
+                self._score_data(credit_score),
+                ml_prediction=prediction
+            )
+        except Exception as e:
+            logger.error(f"Risk assessment failed: {str(e)}")
+        
+        return ai_predictions
+    
+    def _predict(self, record: Dict[str, Any], record_hash: str) -> Dict[str, Any]:
+        """Worker thread: load (or reuse) the active model and predict one record"""
+        try:
+            predictor = self.registry.get_predictor()
+        except (FileNotFoundError, ValueError) as e:
+            raise ModelUnavailableError(str(e))
+        
+        result = predictor.predict_batch([predictor.preprocessor.fill_missing_features(record)])[0]
+        version = predictor.model_info.get('version')
+        prediction = {
+            'model_version': version,
+            'default_probability': result['default_probability'],
+            'predicted_default': result['predicted_default'],
+            'confidence': result['confidence'],
+            'risk_level': result['risk_level']
+        }
+        _prediction_cache.set((version, record_hash), prediction)
+        return prediction
+    
+    def _application_data(self, application) -> Dict[str, Any]:
+        return application.to_mongo().to_dict()
+    
+    def _score_data(self, credit_score) -> Dict[str, Any]:
+        return {
+            'risk_level': credit_score.risk_level,
+            'default_probability': float(credit_score.default_probability),
+            'total_points': float(credit_score.total_points),
+            'grade': credit_score.grade,
+            'credit_ratios_breakdown': [ratio.to_mongo().to_dict() for ratio in credit_score.credit_ratios_breakdown or []]
+        }
+
+class ModelUnavailableError(Exception):
+    """No model is registered or the active model file is missing"""
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='ml-prediction')
+    return _executor
+
+# Process-wide state shared by every engine instance (one engine is created per request)
+_max_workers = settings.CREDIT_SCORING.get('AI_PREDICTION_WORKERS', 2)
+_executor = None
+_executor_lock = threading.Lock()
+# Running plus queued predictions; beyond this a call falls back immediately instead of queueing
+_worker_slots = threading.BoundedSemaphore(_max_workers * 2)
+_prediction_cache = PredictionCache(settings.CREDIT_SCORING.get('AI_PREDICTION_CACHE_SIZE', 10000))
+ml_stage_latency = MLStageLatency()
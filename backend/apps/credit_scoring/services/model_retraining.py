@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any
+import json
+import logging
+import os
+
+from django.conf import settings
+
+from ai_models.training.model_trainer import CreditScoringModelTrainer
+from ..models import CreditScore
+
+logger = logging.getLogger(__name__)
+
+class IncrementalRetrainJob:
+    """
+    Scheduled incremental retraining of the active model. Scores
+    calculated since the watermark are appended to the active model's
+    training store as labelled rows; once enough are pending, the model
+    is warm-started on them plus the store's reservoir sample of older
+    rows. The new version is promoted only if it does at least as well
+    on the held-out test split as the version it was trained from.
+    """
+    
+    STATE_FILE = 'retrain_state.json'
+    # Leave recently written scores for the next run so late inserts are not skipped
+    SETTLE_DELAY = timedelta(minutes=5)
+    
+    def __init__(self, model_path: str = None, min_new_rows: int = None, batch_size: int = 1000):
+        config = settings.CREDIT_SCORING
+        self.trainer = CreditScoringModelTrainer(
+            model_path or config.get('AI_MODELS_PATH'),
+            reservoir_size=config.get('AI_RETRAIN_RESERVOIR_SIZE', 50000)
+        )
+        self.registry = self.trainer.registry
+        self.min_new_rows = min_new_rows if min_new_rows is not None else config.get('AI_RETRAIN_MIN_NEW_ROWS', 500)
+        self.max_estimators = config.get('AI_RETRAIN_MAX_ESTIMATORS', 200)
+        self.batch_size = batch_size
+        self.state_path = os.path.join(self.trainer.model_save_path, self.STATE_FILE)
+    
+    def run(self) -> Dict[str, Any]:
+        """Collect newly scored applications, then retrain and promote if enough are pending"""
+        active_version = self.registry.active_version()
+        if not active_version:
+            return {'status': 'skipped', 'reason': 'No active model'}
+        
+        active = self.registry.get_entry(active_version)
+        preprocessor_id = active.get('preprocessor_id')
+        if not preprocessor_id:
+            return {'status': 'skipped', 'reason': f"Model {active_version} has no saved preprocessor"}
+        
+        state = self._load_state()
+        if state.get('preprocessor_id') != preprocessor_id:
+            # A full training run replaced the feature space; its data is already in the new store
+            state = {'preprocessor_id': preprocessor_id, 'watermark': active['registered_at']}
+        
+        collected = self._collect(state)
+        store_stats = self.trainer.training_store(preprocessor_id).stats()
+        result = {
+            'active_version': active_version,
+            'collected_rows': collected,
+            'pending_rows': store_stats['pending_rows']
+        }
+        
+        if store_stats['pending_rows'] < self.min_new_rows:
+            return {**result, 'status': 'waiting'}
+        
+        retrained = self.trainer.retrain_model(active['model_type'], max_estimators=self.max_estimators)
+        result.update(retrained)
+        
+        active_accuracy = active.get('performance', {}).get('accuracy')
+        new_accuracy = retrained.get('performance', {}).get('accuracy')
+        if new_accuracy is not None and (active_accuracy is None or new_accuracy >= active_accuracy):
+            self.registry.promote(retrained['version'])
+            result['promoted'] = True
+        else:
+            logger.warning(f"Retrained {retrained['version']} not promoted: accuracy {new_accuracy} "
+                           f"vs {active_accuracy} for {active_version}")
+            result['promoted'] = False
+        
+        return result
+    
+    def _collect(self, state: Dict[str, Any]) -> int:
+        """Append settled scores newer than the watermark to the training store"""
+        cutoff = datetime.utcnow() - self.SETTLE_DELAY
+        watermark = datetime.fromisoformat(state['watermark'])
+        scores = CreditScore.objects(
+            calculated_at__gt=watermark,
+            calculated_at__lte=cutoff
+        ).order_by('calculated_at').no_cache()
+        
+        collected = 0
+        batch = []
+        for score in scores.batch_size(self.batch_size):
+            batch.append({'application': score.application, 'score': score})
+            if len(batch) >= self.batch_size:
+                collected += self._append(state, batch)
+                batch = []
+        if batch:
+            collected += self._append(state, batch)
+        
+        # Everything up to the cutoff is stored
+        state['watermark'] = max(watermark, cutoff).isoformat()
+        self._save_state(state)
+        return collected
+    
+    def _append(self, state: Dict[str, Any], batch: list) -> int:
+        self.trainer.add_training_data(batch, state['preprocessor_id'])
+        # Advanced per batch, so a failed run resumes after the last stored batch
+        state['watermark'] = batch[-1]['score'].calculated_at.isoformat()
+        self._save_state(state)
+        return len(batch)
+    
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, self.state_path)
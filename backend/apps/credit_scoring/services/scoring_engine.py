@@ -9,6 +9,7 @@ from .data_points_calculator import DataPointsCalculator
 from .credit_ratios_calculator import CreditRatiosCalculator
 from .borrower_attributes_calculator import BorrowerAttributesCalculator
 from .psychometric_analyzer import PsychometricAnalyzer
+from .ml_prediction import MLPredictionStage
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +24,7 @@ class CreditScoringEngine:
         self.credit_ratios_calculator = CreditRatiosCalculator()
         self.borrower_attributes_calculator = BorrowerAttributesCalculator()
         self.psychometric_analyzer = PsychometricAnalyzer()
+        self.ml_stage = MLPredictionStage()
         
         # Default weights as per documentation
         self.weights = {
@@ -76,13 +78,7 @@ class CreditScoringEngine:
                                                credit_ratios_result,
                                                borrower_attributes_result)
             
-            # 7. Calculate Max Loan Amount
-            max_loan_amount = self._calculate_max_loan_amount(application, grade, final_score)
-            
-            # 8. Generate Recommendations
-            recommendations = self._generate_recommendations(application, final_score, grade, red_flags)
-            
-            # 9. Assess Risk Level
+            # 7. Assess Risk Level
             risk_level, default_probability = self._assess_risk(final_score, red_flags)
             
             # Create Credit Score Document
@@ -101,15 +97,28 @@ class CreditScoringEngine:
                 risk_level=risk_level,
                 default_probability=default_probability,
                 red_flags=red_flags,
-                recommendations=recommendations,
-                max_loan_amount=max_loan_amount,
-                calculated_at=datetime.utcnow(),
                 calculated_by='system',
                 version='1.0'
             )
             
+            # 8. Start the ML prediction (its features are the rule-based outputs above)
+            ml_prediction = self.ml_stage.submit(application, credit_score)
+            
+            # 9. Calculate Max Loan Amount
+            credit_score.max_loan_amount = self._calculate_max_loan_amount(application, grade, final_score)
+            
+            # 10. Generate Recommendations
+            credit_score.recommendations = self._generate_recommendations(application, final_score, grade, red_flags)
+            
+            # 11. Collect the ML prediction within its latency budget (rules-only otherwise)
+            credit_score.ai_predictions = self.ml_stage.collect(ml_prediction, application, credit_score)
+            
+            credit_score.calculated_at = datetime.utcnow()
             credit_score.save()
             
+            # Keep materialized analytics in step with the new score
+            self._publish_score_written(credit_score)
+            
             logger.info(f"Credit score calculated successfully. Grade: {grade}, Score: {final_score}")
             return credit_score
             
@@ -117,6 +126,34 @@ class CreditScoringEngine:
             logger.error(f"Error calculating credit score: {str(e)}")
             raise Exception(f"Credit scoring failed: {str(e)}")
     
+    def _publish_score_written(self, credit_score: CreditScore) -> None:
+        """Update incrementally maintained analytics and report fragments for a saved score"""
+        from apps.analytics.sector_stats import SectorStatsService
+        from apps.analytics.red_flag_index import RedFlagIndexService
+        from apps.analytics.live_metrics import live_score_metrics
+        from apps.reports.fragments import report_fragments
+        
+        # Analytics must never fail the scoring request
+        try:
+            SectorStatsService().record_score(credit_score)
+        except Exception as e:
+            logger.error(f"Failed to update sector statistics: {str(e)}")
+        
+        try:
+            RedFlagIndexService().record_score(credit_score)
+        except Exception as e:
+            logger.error(f"Failed to update red flag index: {str(e)}")
+        
+        try:
+            live_score_metrics.publish(credit_score)
+        except Exception as e:
+            logger.error(f"Failed to publish live score metrics: {str(e)}")
+        
+        try:
+            report_fragments.record_score(credit_score)
+        except Exception as e:
+            logger.error(f"Failed to build report fragment: {str(e)}")
+    
     def _calculate_final_score(self, data_points: int, credit_ratios: float, 
                               borrower_attributes: int, psychometric: int) -> Tuple[float, str, str]:
         """
@@ -0,0 +1,15 @@
+from celery import shared_task
+import logging
+
+from .services.model_retraining import IncrementalRetrainJob
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def retrain_active_model():
+    """Warm-start the active model on newly scored applications and promote it if it does not regress"""
+    try:
+        return IncrementalRetrainJob().run()
+    except Exception as e:
+        logger.error(f"Incremental model retraining failed: {str(e)}")
+        raise
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+import logging
+
+from django.conf import settings
+from mongoengine import Q
+
+from .models import GeneratedReport, ReportArtifact
+from .storage import ENCODING_SUFFIXES, get_report_storage
+from .streaming import build_application_filters
+
+logger = logging.getLogger(__name__)
+
+class ReportArtifactCache:
+    """
+    Content-addressed cache of rendered report files.
+    The key covers the report type, format, selection, options and the
+    versions of the scores involved, so a new or recalculated score for
+    any selected application produces a new key instead of a stale hit.
+    """
+    
+    ARTIFACT_PREFIX = 'artifacts/'
+    
+    def __init__(self, storage=None):
+        self.storage = storage or get_report_storage()
+    
+    def build_key(self, report_type: str, format: str, application_ids: List[str] = None,
+                  filters: Dict[str, Any] = None, options: Dict[str, Any] = None) -> str:
+        """sha256 over a canonical JSON description of the report"""
+        return self.build_keys(report_type, [format], application_ids, filters, options)[format]
+    
+    def build_keys(self, report_type: str, formats: List[str], application_ids: List[str] = None,
+                   filters: Dict[str, Any] = None, options: Dict[str, Any] = None) -> Dict[str, str]:
+        """Keys for several formats of one request, looking up score versions only once"""
+        if application_ids:
+            # Rows follow the id list as given (order and duplicates), so the key does too
+            selection = {'application_ids': list(application_ids)}
+            versions = self._id_selection_versions(sorted(set(application_ids)))
+        else:
+            selection = {'filters': filters or {}}
+            versions = self._filter_selection_versions(filters or {})
+        
+        keys = {}
+        for format in formats:
+            payload = {
+                'report_type': report_type,
+                'format': format.lower(),
+                'selection': selection,
+                'options': options or {},
+                'versions': versions
+            }
+            canonical = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+            keys[format] = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return keys
+    
+    def get(self, cache_key: str) -> Optional[ReportArtifact]:
+        """Return a live artifact and record the hit, or None"""
+        artifact = ReportArtifact.objects(cache_key=cache_key).first()
+        if not artifact:
+            return None
+        
+        if not self.storage.exists(artifact.file_path):
+            logger.warning(f"Report artifact {cache_key} missing from storage - discarding")
+            artifact.delete()
+            return None
+        
+        ReportArtifact.objects(id=artifact.id).update_one(
+            inc__hit_count=1,
+            set__last_accessed_at=datetime.utcnow()
+        )
+        return artifact
+    
+    def store(self, cache_key: str, report_type: str, format: str, file_path: str,
+              extension: str, row_count: int, report_summary: Dict,
+              generation_duration: float, content_encodings: List[str] = None) -> ReportArtifact:
+        """Move a freshly rendered file (and its compressed variants) into storage and register it"""
+        storage_key = f"{self.ARTIFACT_PREFIX}{cache_key}.{extension}"
+        file_size = os.path.getsize(file_path)
+        content_encodings = content_encodings or []
+        
+        for encoding in content_encodings:
+            suffix = ENCODING_SUFFIXES[encoding]
+            self.storage.save(file_path + suffix, storage_key + suffix)
+        self.storage.save(file_path, storage_key)
+        
+        now = datetime.utcnow()
+        ReportArtifact.objects(cache_key=cache_key).update_one(
+            upsert=True,
+            set__report_type=report_type,
+            set__format=format,
+            set__file_path=storage_key,
+            set__file_size=file_size,
+            set__content_encodings=content_encodings,
+            set__row_count=row_count,
+            set__report_summary=report_summary,
+            set__generation_duration=generation_duration,
+            set__last_accessed_at=now,
+            set_on_insert__created_at=now,
+            set_on_insert__hit_count=0
+        )
+        return ReportArtifact.objects(cache_key=cache_key).first()
+    
+    def evict(self, max_total_bytes: int = None, max_age_days: int = None) -> Dict[str, int]:
+        """
+        Drop artifacts not accessed within max_age_days, then the least
+        recently used ones until the cache fits in max_total_bytes.
+        Artifacts an unexpired GeneratedReport still points to are kept
+        (and count towards the total) until the last such report expires.
+        """
+        if max_total_bytes is None:
+            max_total_bytes = settings.REPORT_CACHE_MAX_BYTES
+        if max_age_days is None:
+            max_age_days = settings.REPORT_CACHE_MAX_AGE_DAYS
+        
+        evicted = 0
+        freed = 0
+        referenced = self._referenced_keys()
+        
+        cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+        for artifact in ReportArtifact.objects(last_accessed_at__lt=cutoff, cache_key__nin=referenced):
+            freed += self._remove(artifact)
+            evicted += 1
+        
+        total_bytes = sum(
+            doc.get('file_size', 0) for doc in ReportArtifact.objects.only('file_size').as_pymongo()
+        )
+        if total_bytes > max_total_bytes:
+            for artifact in ReportArtifact.objects(cache_key__nin=referenced).order_by('last_accessed_at'):
+                if total_bytes <= max_total_bytes:
+                    break
+                size = self._remove(artifact)
+                total_bytes -= size
+                freed += size
+                evicted += 1
+        
+        logger.info(f"Evicted {evicted} report artifacts ({freed} bytes), kept {len(referenced)} referenced by live reports")
+        return {'evicted': evicted, 'bytes_freed': freed, 'referenced': len(referenced)}
+    
+    def _referenced_keys(self) -> List[str]:
+        """Cache keys of every format of reports that have not expired yet"""
+        live_reports = GeneratedReport.objects(Q(expires_at=None) | Q(expires_at__gt=datetime.utcnow()))
+        keys = set(live_reports.distinct('cache_key')) | set(live_reports.distinct('artifacts.cache_key'))
+        keys.discard(None)
+        return list(keys)
+    
+    def _remove(self, artifact: ReportArtifact) -> int:
+        size = artifact.file_size or 0
+        self.storage.delete_with_variants(artifact.file_path, artifact.content_encodings)
+        artifact.delete()
+        return size
+    
+    def _id_selection_versions(self, application_ids: List[str]) -> Dict[str, Any]:
+        """Latest score id per selected application plus application edit times"""
+        from apps.credit_scoring.models import CreditApplication, CreditScore
+        
+        applications = list(CreditApplication.objects(
+            application_id__in=application_ids
+        ).only('id', 'application_id', 'updated_at').as_pymongo())
+        app_ids = {doc['_id']: doc['application_id'] for doc in applications}
+        
+        latest_scores = {}
+        scores = CreditScore.objects(
+            application__in=list(app_ids.keys())
+        ).only('id', 'application', 'calculated_at').order_by('calculated_at').as_pymongo()
+        for score in scores:
+            latest_scores[app_ids[score['application']]] = str(score['_id'])
+        
+        return {
+            'scores': sorted(latest_scores.items()),
+            'updated_at': max((doc.get('updated_at') for doc in applications if doc.get('updated_at')), default=None)
+        }
+    
+    def _filter_selection_versions(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Filter selections can span the whole portfolio, so use cheap
+        proxies: matching application count, their last edit and the
+        newest score overall. Any new score invalidates these entries.
+        """
+        from apps.credit_scoring.models import CreditApplication, CreditScore
+        
+        applications = CreditApplication.objects(**build_application_filters(filters))
+        last_edited = applications.order_by('-updated_at').only('updated_at').first()
+        newest_score = CreditScore.objects.order_by('-id').only('id').first()
+        
+        return {
+            'application_count': applications.count(),
+            'updated_at': last_edited.updated_at if last_edited else None,
+            'newest_score': str(newest_score.id) if newest_score else None
+        }
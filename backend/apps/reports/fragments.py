@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+import logging
+
+from pymongo import UpdateOne
+
+from .models import ReportFragment
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a row builder in ReportGenerator changes its output,
+# so fragments written by older code are rebuilt on next use.
+FRAGMENT_VERSION = 1
+
+class ReportFragmentService:
+    """
+    Per-score report rows computed once and stored in report_fragments.
+    Written when a score is saved; read back in bulk while reports are
+    built, rebuilding any fragment that is missing or stale (new layout
+    version, recalculated score or edited application).
+    """
+    
+    def __init__(self, generator=None):
+        self._generator = generator
+    
+    @property
+    def generator(self):
+        if self._generator is None:
+            from .report_generator import ReportGenerator
+            self._generator = ReportGenerator()
+        return self._generator
+    
+    def build(self, application, score) -> Dict[str, Any]:
+        """All per-application rows that do not depend on the rest of the selection"""
+        return {
+            'score_breakdown': self.generator._build_score_breakdown_row(application, score),
+            'risk_assessment': self.generator._build_risk_assessment_row(application, score),
+            'comparative_analysis': self.generator._build_comparative_base(application, score),
+            'portfolio_summary': self.generator._build_portfolio_row(application, score)
+        }
+    
+    def record_score(self, score) -> None:
+        """Build the fragment for a newly saved score and drop the application's older ones"""
+        application = score.application
+        self._get_collection().bulk_write([self._upsert(application, score, self.build(application, score))])
+        ReportFragment.objects(application_id=str(application.id), score_id__ne=str(score.id)).delete()
+    
+    def attach(self, applications_data: List[Dict], report_type: str = None) -> List[Dict]:
+        """
+        Set data['fragment'] on every {'application', 'score'} pair, with one
+        read and one write. With report_type only that row is read back.
+        """
+        if not applications_data:
+            return applications_data
+        
+        fields = ['score_id', 'version', 'score_calculated_at', 'application_updated_at']
+        fields.append(f"fragment.{report_type}" if report_type else 'fragment')
+        stored = {
+            doc['score_id']: doc
+            for doc in ReportFragment.objects(
+                score_id__in=[str(data['score'].id) for data in applications_data]
+            ).only(*fields).as_pymongo()
+        }
+        
+        rebuilt = []
+        for data in applications_data:
+            application = data['application']
+            score = data['score']
+            doc = stored.get(str(score.id))
+            
+            if doc and self._is_current(doc, application, score):
+                data['fragment'] = doc['fragment']
+            else:
+                data['fragment'] = self.build(application, score)
+                rebuilt.append(self._upsert(application, score, data['fragment']))
+        
+        if rebuilt:
+            try:
+                self._get_collection().bulk_write(rebuilt, ordered=False)
+            except Exception as e:
+                # Rows were built in memory; persisting them is only an optimisation
+                logger.error(f"Failed to store report fragments: {str(e)}")
+        
+        return applications_data
+    
+    def iter_with_fragments(self, applications_data: Iterator[Dict], report_type: str = None,
+                            batch_size: int = 500) -> Iterator[Dict]:
+        """attach() over a stream, one batch at a time"""
+        batch = []
+        for data in applications_data:
+            batch.append(data)
+            if len(batch) >= batch_size:
+                yield from self.attach(batch, report_type)
+                batch = []
+        
+        if batch:
+            yield from self.attach(batch, report_type)
+    
+    def _is_current(self, doc: Dict, application, score) -> bool:
+        return (
+            doc.get('version') == FRAGMENT_VERSION
+            and self._stamp(doc.get('score_calculated_at')) == self._stamp(score.calculated_at)
+            and self._stamp(doc.get('application_updated_at')) == self._stamp(application.updated_at)
+        )
+    
+    def _upsert(self, application, score, fragment: Dict[str, Any]) -> UpdateOne:
+        return UpdateOne(
+            {'score_id': str(score.id)},
+            {
+                '$set': {
+                    'application_id': str(application.id),
+                    'version': FRAGMENT_VERSION,
+                    'score_calculated_at': score.calculated_at,
+                    'application_updated_at': application.updated_at,
+                    'fragment': fragment,
+                    'created_at': datetime.utcnow()
+                }
+            },
+            upsert=True
+        )
+    
+    def _stamp(self, value: Optional[datetime]) -> Optional[datetime]:
+        # MongoDB keeps milliseconds, in-memory documents may still carry microseconds
+        if value is None:
+            return None
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    
+    def _get_collection(self):
+        return ReportFragment._get_collection()
+
+# Process-wide service used on every score write (CreditScoringEngine), so
+# its ReportGenerator and storage client are built once per worker
+report_fragments = ReportFragmentService()
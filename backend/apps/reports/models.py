@@ -19,6 +19,44 @@ class ReportTemplate(Document):
         'indexes': ['template_type', 'is_active']
     }
 
+class ReportSchedule(Document):
+    """Recurring report run by Celery beat on a crontab-style schedule"""
+    name = fields.StringField(required=True, max_length=100)
+    report_type = fields.StringField(
+        choices=['score_breakdown', 'risk_assessment', 'comparative_analysis', 'portfolio_summary'],
+        required=True
+    )
+    formats = fields.ListField(fields.StringField(choices=['pdf', 'excel', 'html', 'json']), default=lambda: ['pdf'])
+    selection_filters = fields.DictField()  # date_from / date_to / business_type / status
+    template_id = fields.StringField()
+    
+    # Crontab fields, evaluated in CELERY_TIMEZONE
+    minute = fields.StringField(default='0')
+    hour = fields.StringField(default='8')
+    day_of_week = fields.StringField(default='mon')
+    day_of_month = fields.StringField(default='*')
+    month_of_year = fields.StringField(default='*')
+    
+    is_active = fields.BooleanField(default=True)
+    next_run_at = fields.DateTimeField()  # UTC; claimed atomically by the beat task
+    last_run_at = fields.DateTimeField()
+    last_report_id = fields.StringField()
+    last_error = fields.StringField()  # Set while the latest run is failing and being retried
+    run_count = fields.IntField(default=0)
+    
+    # Incremental state: scores calculated up to the watermark are already in state
+    watermark = fields.DateTimeField()
+    state = fields.DictField()
+    
+    created_by = fields.StringField()
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    updated_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'report_schedules',
+        'indexes': ['is_active', 'next_run_at']
+    }
+
 class GeneratedReport(Document):
     """Generated report model"""
     report_id = fields.StringField(required=True, unique=True)
@@ -27,11 +65,20 @@ class GeneratedReport(Document):
         required=True
     )
     application_ids = fields.ListField(fields.StringField())
-    format = fields.StringField(choices=['pdf', 'excel', 'html', 'json'], default='pdf')
+    format = fields.StringField(choices=['pdf', 'excel', 'html', 'json'], default='pdf')  # Primary format
+    formats = fields.ListField(fields.StringField(choices=['pdf', 'excel', 'html', 'json']))
     
     # Report content and metadata
-    report_data = fields.DictField()
-    file_path = fields.StringField()  # Path to generated file
+    report_data = fields.DictField()  # Legacy inline payload; new reports only store report_summary
+    report_summary = fields.DictField()  # Summary aggregates, the rows live in the file
+    selection_filters = fields.DictField()  # Used instead of application_ids for filter-based reports
+    template_id = fields.StringField()  # ReportTemplate used for the HTML layout
+    schedule_id = fields.StringField()  # ReportSchedule that produced this report, if any
+    row_count = fields.IntField()
+    cache_key = fields.StringField()  # ReportArtifact the file belongs to
+    cache_hit = fields.BooleanField(default=False)
+    file_path = fields.StringField()  # Storage key of the generated file (see apps.reports.storage)
+    content_encodings = fields.ListField(fields.StringField())  # Precompressed variants, e.g. ['zstd', 'gzip']
     download_url = fields.StringField()
     
     # Generation details
@@ -39,6 +86,10 @@ class GeneratedReport(Document):
     generated_at = fields.DateTimeField(default=datetime.utcnow)
     generation_duration = fields.FloatField()  # Seconds
     file_size = fields.IntField()  # Bytes
+    artifacts = fields.ListField(fields.DictField())  # One entry per rendered format
+    format_timings = fields.DictField()  # Seconds per stage: 'data' plus one entry per format
+    timing_trace = fields.ListField(fields.DictField())  # Ordered stages with seconds, rows and bytes
+    profile_path = fields.StringField()  # Storage key of the opt-in cProfile/pyinstrument capture
     
     # Status and expiry
     status = fields.StringField(
@@ -50,5 +101,71 @@ class GeneratedReport(Document):
     
     meta = {
         'collection': 'generated_reports',
-        'indexes': ['report_id', 'status', 'requested_by', 'generated_at']
+        'indexes': ['report_id', 'status', 'requested_by', 'generated_at', 'expires_at']
+    }
+
+class ReportArtifact(Document):
+    """Rendered report file shared by every request with the same cache key"""
+    cache_key = fields.StringField(required=True, unique=True)  # sha256 of type, format, selection, options and score versions
+    report_type = fields.StringField(required=True)
+    format = fields.StringField(required=True)
+    file_path = fields.StringField(required=True)  # Storage key
+    file_size = fields.IntField(default=0)
+    content_encodings = fields.ListField(fields.StringField())
+    row_count = fields.IntField(default=0)
+    report_summary = fields.DictField()
+    generation_duration = fields.FloatField()
+    
+    hit_count = fields.IntField(default=0)
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    last_accessed_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'report_artifacts',
+        'indexes': ['cache_key', 'last_accessed_at']
+    }
+
+class ReportFragment(Document):
+    """Precomputed per-score report rows, rebuilt when the score, its application or the layout version changes"""
+    score_id = fields.StringField(required=True, unique=True)
+    application_id = fields.StringField(required=True)  # CreditApplication ObjectId
+    version = fields.IntField(required=True)  # apps.reports.fragments.FRAGMENT_VERSION at build time
+    score_calculated_at = fields.DateTimeField()
+    application_updated_at = fields.DateTimeField()
+    fragment = fields.DictField()  # One row per report type
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'report_fragments',
+        'indexes': ['score_id', 'application_id']
+    }
+
+class PeerScoreIndex(Document):
+    """Sorted latest scores of one business type across the whole portfolio (see apps.reports.peer_comparison)"""
+    business_type = fields.StringField(required=True, unique=True)
+    count = fields.IntField(default=0)
+    total_points = fields.FloatField(default=0.0)
+    component_totals = fields.DictField()  # data_points / credit_ratios / borrower_attributes sums
+    grade_distribution = fields.DictField()
+    chunk_count = fields.IntField(default=0)  # PeerScoreChunk documents holding the sorted scores
+    sorted_scores = fields.BinaryField()  # Legacy: whole array in one document, unset by rebuild
+    built_at = fields.DateTimeField()
+    
+    meta = {
+        'collection': 'peer_score_index',
+        'indexes': ['business_type', 'built_at']
+    }
+
+class PeerScoreChunk(Document):
+    """One slice of a business type's sorted peer scores (a single document is capped at 16 MB)"""
+    business_type = fields.StringField(required=True)
+    built_at = fields.DateTimeField(required=True)  # PeerScoreIndex build the slice belongs to
+    chunk = fields.IntField(required=True)  # Position of the slice in the sorted array
+    scores = fields.BinaryField()  # float64, ascending (8 bytes per application)
+    
+    meta = {
+        'collection': 'peer_score_chunks',
+        'indexes': [
+            {'fields': ['business_type', 'built_at', 'chunk'], 'unique': True}
+        ]
     }
@@ -0,0 +1,307 @@
+from datetime import datetime
+from typing import Dict, Any, Optional
+import logging
+import threading
+
+import numpy as np
+
+from .models import PeerScoreChunk, PeerScoreIndex
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ['data_points', 'credit_ratios', 'borrower_attributes']
+GRADES = ['A', 'B', 'C', 'R']
+
+class PeerComparisonEngine:
+    """
+    Vectorized peer statistics for a report selection.
+    Rows are added during the first pass over the selection; compute()
+    then derives every row's peer average, component averages and
+    percentile at once (bincount sums, one sort and searchsorted per
+    business type). Each application is excluded from its own peer group.
+    """
+    
+    def __init__(self):
+        self._positions = {}
+        self._business_types = []
+        self._grades = []
+        self._scores = []
+        self._components = {component: [] for component in COMPONENTS}
+        self._calculated_at = []
+        self.type_names = []
+        self.results = None
+    
+    def add(self, base: Dict[str, Any], calculated_at: datetime = None) -> None:
+        """Register one comparative base row (see ReportGenerator._build_comparative_base)"""
+        self._positions.setdefault(base['application_id'], len(self._scores))
+        self._business_types.append(base['business_type'])
+        self._grades.append(base['grade'])
+        self._scores.append(base['score'])
+        for component in COMPONENTS:
+            self._components[component].append(base['component_scores'][component])
+        self._calculated_at.append(calculated_at)
+    
+    @property
+    def row_count(self) -> int:
+        return len(self._scores)
+    
+    def compute(self, peer_index: Dict[str, Dict] = None) -> None:
+        """
+        Peer statistics for every added row. Peers are the rest of the
+        selection, or with peer_index (PeerScoreIndexService.load) the
+        whole scored portfolio of the same business type.
+        """
+        type_names, type_codes = np.unique(np.array(self._business_types, dtype=object), return_inverse=True)
+        self.type_names = [str(name) for name in type_names]
+        scores = np.asarray(self._scores, dtype=np.float64)
+        components = {c: np.asarray(v, dtype=np.float64) for c, v in self._components.items()}
+        grade_codes = np.array([GRADES.index(g) if g in GRADES else len(GRADES) for g in self._grades], dtype=np.int64)
+        
+        group_count = len(self.type_names)
+        self.group_stats = self._group_stats(type_codes, grade_codes, scores, components, group_count)
+        
+        if peer_index is None:
+            peer_count, peer_totals, below = self._selection_peers(type_codes, scores, components)
+        else:
+            peer_count, peer_totals, below = self._portfolio_peers(peer_index, type_codes, scores, components)
+        
+        has_peers = peer_count > 0
+        safe_count = np.where(has_peers, peer_count, 1)
+        
+        self.results = {
+            'peer_count': peer_count,
+            'peer_average': np.where(has_peers, peer_totals['total_points'] / safe_count, 0),
+            'percentile_ranking': np.where(has_peers, below / safe_count * 100, 50.0),
+            'component_averages': {
+                c: np.where(has_peers, peer_totals[c] / safe_count, 0) for c in COMPONENTS
+            }
+        }
+        self.results['above_average'] = np.where(has_peers, scores > self.results['peer_average'], True)
+    
+    def peer_stats(self, application_id: str) -> Dict[str, Any]:
+        """Computed peer statistics for one row, as plain Python values"""
+        i = self._positions[application_id]
+        return {
+            'peer_count': int(self.results['peer_count'][i]),
+            'peer_average': float(self.results['peer_average'][i]),
+            'percentile_ranking': float(self.results['percentile_ranking'][i]),
+            'above_average': bool(self.results['above_average'][i]),
+            'component_averages': {
+                c: float(self.results['component_averages'][c][i]) for c in COMPONENTS
+            }
+        }
+    
+    def industry_insights(self) -> Dict[str, Dict]:
+        """Per business type summary of the selection (grouped by type and grade in one bincount)"""
+        stats = self.group_stats
+        insights = {}
+        for code, business_type in enumerate(self.type_names):
+            count = int(stats['count'][code])
+            insights[business_type] = {
+                'total_applications': count,
+                'average_score': float(stats['total_points'][code] / count),
+                'grade_distribution': {
+                    grade: int(stats['grades'][code][g]) for g, grade in enumerate(GRADES) if stats['grades'][code][g]
+                },
+                'approval_rate': float(stats['approved'][code] / count * 100),
+                'score_std_dev': float(stats['std_dev'][code])
+            }
+        return insights
+    
+    def _group_stats(self, type_codes, grade_codes, scores, components, group_count) -> Dict[str, Any]:
+        count = np.bincount(type_codes, minlength=group_count)
+        total = np.bincount(type_codes, weights=scores, minlength=group_count)
+        mean = total / np.maximum(count, 1)
+        squares = np.bincount(type_codes, weights=(scores - mean[type_codes]) ** 2, minlength=group_count)
+        grades = np.bincount(
+            type_codes * (len(GRADES) + 1) + grade_codes, minlength=group_count * (len(GRADES) + 1)
+        ).reshape(group_count, len(GRADES) + 1)
+        
+        stats = {
+            'count': count,
+            'total_points': total,
+            'std_dev': np.sqrt(squares / np.maximum(count, 1)),
+            'grades': grades,
+            # Every grade except R counts as approved
+            'approved': count - grades[:, GRADES.index('R')]
+        }
+        for component in COMPONENTS:
+            stats[component] = np.bincount(type_codes, weights=components[component], minlength=group_count)
+        return stats
+    
+    def _selection_peers(self, type_codes, scores, components):
+        stats = self.group_stats
+        peer_count = stats['count'][type_codes] - 1
+        peer_totals = {'total_points': stats['total_points'][type_codes] - scores}
+        for component in COMPONENTS:
+            peer_totals[component] = stats[component][type_codes] - components[component]
+        
+        # Peers strictly below each score; the row itself is never below itself
+        below = np.empty(len(scores), dtype=np.float64)
+        for code in range(len(self.type_names)):
+            mask = type_codes == code
+            below[mask] = np.searchsorted(np.sort(scores[mask]), scores[mask], side='left')
+        return peer_count, peer_totals, below
+    
+    def _portfolio_peers(self, peer_index, type_codes, scores, components):
+        size = len(scores)
+        peer_count = np.zeros(size, dtype=np.int64)
+        below = np.zeros(size, dtype=np.float64)
+        peer_totals = {key: np.zeros(size, dtype=np.float64) for key in ['total_points'] + COMPONENTS}
+        
+        for code, business_type in enumerate(self.type_names):
+            group = peer_index.get(business_type)
+            if not group:
+                continue
+            
+            mask = type_codes == code
+            rows = np.flatnonzero(mask)
+            # A row is part of the index when its score existed at build time
+            indexed = np.array([
+                bool(self._calculated_at[i] and self._calculated_at[i] <= group['built_at']) for i in rows
+            ], dtype=bool)
+            
+            peer_count[mask] = group['count'] - indexed
+            below[mask] = np.searchsorted(group['scores'], scores[mask], side='left')
+            peer_totals['total_points'][mask] = group['total_points'] - np.where(indexed, scores[mask], 0)
+            for component in COMPONENTS:
+                peer_totals[component][mask] = group[component] - np.where(indexed, components[component][mask], 0)
+        
+        return peer_count, peer_totals, below
+
+class PeerScoreIndexService:
+    """
+    Sorted latest-score arrays per business type over the whole portfolio,
+    persisted in peer_score_index and rebuilt periodically. The sorted
+    scores are split into peer_score_chunks documents of CHUNK_SIZE values
+    so large business types stay under MongoDB's 16 MB document limit.
+    Loaded copies are kept per process until a newer build appears.
+    """
+    
+    CHUNK_SIZE = 500000  # 4 MB of float64 per chunk document
+    
+    _cache = {'built_at': None, 'groups': None}
+    _lock = threading.Lock()
+    
+    def rebuild(self, batch_size: int = 2000) -> Dict[str, int]:
+        """Recompute the index from the latest score of every application"""
+        from apps.credit_scoring.models import CreditApplication, CreditScore
+        
+        built_at = datetime.utcnow()
+        groups = {}
+        
+        applications = CreditApplication.objects.only('id', 'business_data.business_type').as_pymongo()
+        batch = []
+        
+        def flush(batch):
+            business_types = {doc['_id']: (doc.get('business_data') or {}).get('business_type') for doc in batch}
+            latest = {}
+            scores = CreditScore.objects(application__in=list(business_types.keys())).only(
+                'application', 'total_points', 'grade', 'data_points_score',
+                'credit_ratios_score', 'borrower_attributes_score', 'calculated_at'
+            ).order_by('calculated_at').as_pymongo()
+            for score in scores:
+                latest[score['application']] = score
+            
+            for application_id, score in latest.items():
+                business_type = business_types.get(application_id)
+                if not business_type:
+                    continue
+                group = groups.setdefault(business_type, {
+                    'scores': [], 'grades': {}, **{c: 0.0 for c in COMPONENTS}
+                })
+                group['scores'].append(float(score.get('total_points') or 0))
+                group['grades'][score.get('grade')] = group['grades'].get(score.get('grade'), 0) + 1
+                for component in COMPONENTS:
+                    group[component] += float(score.get(f"{component}_score") or 0)
+        
+        for doc in applications:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        
+        previous = {
+            doc['business_type']: doc.get('built_at')
+            for doc in PeerScoreIndex.objects.only('business_type', 'built_at').as_pymongo()
+        }
+        for business_type, group in groups.items():
+            scores = np.sort(np.asarray(group['scores'], dtype=np.float64))
+            chunks = [
+                PeerScoreChunk(
+                    business_type=business_type,
+                    built_at=built_at,
+                    chunk=i,
+                    scores=scores[start:start + self.CHUNK_SIZE].tobytes()
+                )
+                for i, start in enumerate(range(0, len(scores), self.CHUNK_SIZE))
+            ]
+            # New chunks first, then the index entry that points readers at them
+            if chunks:
+                PeerScoreChunk.objects.insert(chunks, load_bulk=False)
+            PeerScoreIndex.objects(business_type=business_type).update_one(
+                upsert=True,
+                set__count=len(scores),
+                set__total_points=float(scores.sum()),
+                set__component_totals={c: group[c] for c in COMPONENTS},
+                set__grade_distribution=group['grades'],
+                set__chunk_count=len(chunks),
+                unset__sorted_scores=True,
+                set__built_at=built_at
+            )
+            # The previous build's chunks stay until the next rebuild for readers still loading it
+            PeerScoreChunk.objects(
+                business_type=business_type,
+                built_at__nin=[built_at, previous.get(business_type)]
+            ).delete()
+        PeerScoreIndex.objects(business_type__nin=list(groups.keys())).delete()
+        PeerScoreChunk.objects(business_type__nin=list(groups.keys())).delete()
+        
+        logger.info(f"Peer score index rebuilt for {len(groups)} business types")
+        return {business_type: len(group['scores']) for business_type, group in groups.items()}
+    
+    def built_at(self) -> Optional[datetime]:
+        latest = PeerScoreIndex.objects.order_by('-built_at').only('built_at').first()
+        return latest.built_at if latest else None
+    
+    def load(self) -> Dict[str, Dict]:
+        """{business_type: {'scores': sorted ndarray, 'count', 'total_points', <component totals>, 'built_at'}}"""
+        built_at = self.built_at()
+        cache = PeerScoreIndexService._cache
+        if cache['groups'] is not None and cache['built_at'] == built_at:
+            return cache['groups']
+        
+        with PeerScoreIndexService._lock:
+            groups = {}
+            for doc in PeerScoreIndex.objects.as_pymongo():
+                groups[doc['business_type']] = {
+                    'scores': self._load_scores(doc),
+                    'count': doc['count'],
+                    'total_points': doc['total_points'],
+                    'built_at': doc['built_at'],
+                    **{c: doc['component_totals'].get(c, 0.0) for c in COMPONENTS}
+                }
+            cache['groups'] = groups
+            cache['built_at'] = built_at
+        return groups
+    
+    def _load_scores(self, doc: Dict) -> np.ndarray:
+        """Concatenate a build's chunks back into one sorted array"""
+        if doc.get('sorted_scores') is not None:
+            # Index written before scores were chunked
+            return np.frombuffer(doc['sorted_scores'], dtype=np.float64)
+        
+        chunks = PeerScoreChunk.objects(
+            business_type=doc['business_type'], built_at=doc['built_at']
+        ).order_by('chunk').only('scores').as_pymongo()
+        scores = np.concatenate(
+            [np.frombuffer(chunk['scores'], dtype=np.float64) for chunk in chunks] or [np.empty(0)]
+        )
+        if len(scores) != doc['count']:
+            raise ValueError(
+                f"Peer score index for {doc['business_type']} is incomplete "
+                f"({len(scores)} of {doc['count']} scores)"
+            )
+        return scores
@@ -1,587 +1,731 @@
+import json
 import os
+import tempfile
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Tuple
 import logging
 
+from django.conf import settings
+
+from ai_models.inference.model_registry import ModelRegistry
+from ai_models.inference.risk_assessor import RiskAssessor
+
+from .artifact_cache import ReportArtifactCache
+from .fragments import ReportFragmentService
+from .peer_comparison import PeerComparisonEngine, PeerScoreIndexService
+from .storage import ENCODING_SUFFIXES, get_report_storage, write_compressed_variants
+from .streaming import PortfolioAggregates, RunningStats, count_into, iter_applications_data
+from .tracing import ReportProfiler, ReportTrace, StageTimer
+from .writers import REPORT_WRITERS, JsonLinesReportWriter, render_spooled_report, table_columns
+
 logger = logging.getLogger(__name__)
 
 class ReportGenerator:
     """Main report generation class"""
     
-    def __init__(self):
+    REPORT_TITLES = {
+        'score_breakdown': 'Credit Score Breakdown Report',
+        'risk_assessment': 'Risk Assessment Report',
+        'comparative_analysis': 'Comparative Analysis Report',
+        'portfolio_summary': 'Portfolio Summary Report'
+    }
+    
+    # Key under which the in-memory (_generate_*) variants return their rows
+    ROWS_KEYS = {
+        'score_breakdown': 'applications',
+        'risk_assessment': 'risk_analysis',
+        'comparative_analysis': 'comparisons',
+        'portfolio_summary': 'applications'
+    }
+    
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self.storage = get_report_storage()
+        self.artifact_cache = ReportArtifactCache(storage=self.storage)
+        self.fragments = ReportFragmentService(generator=self)
         self.report_types = {
-            'score_breakdown': self._generate_score_breakdown,
-            'risk_assessment': self._generate_risk_assessment,
-            'comparative_analysis': self._generate_comparative_analysis,
-            'portfolio_summary': self._generate_portfolio_summary
+            'score_breakdown': self._stream_score_breakdown,
+            'risk_assessment': self._stream_risk_assessment,
+            'comparative_analysis': self._stream_comparative_analysis,
+            'portfolio_summary': self._stream_portfolio_summary
         }
     
-    def generate_report(self, report_type: str, application_ids: List[str], 
-                       format: str = 'pdf', **kwargs) -> Dict[str, Any]:
-        """Generate report based on type and parameters"""
+    def generate_report(self, report_type: str, application_ids: List[str] = None,
+                       format: str = 'pdf', filters: Dict[str, Any] = None,
+                       use_cache: bool = True, formats: List[str] = None,
+                       template_id: str = None, stream: Tuple[Iterator[Dict], Dict] = None,
+                       profile: str = None, **kwargs) -> Dict[str, Any]:
+        """
+        Generate report based on type and parameters.
+        Rows are streamed from the database once into a JSON Lines spool;
+        every requested format is then rendered from the spool in parallel.
+        Only the summary aggregates are returned for storage, and identical
+        requests over unchanged scores reuse cached artifacts per format.
+        A ReportTemplate (template_id) customises the HTML layout.
+        `stream` supplies precomputed (rows, aggregates) instead of the
+        database pass, e.g. for incremental scheduled reports; such
+        reports may have no rows and are never cached.
+        Every stage (fetch, transform, spool, render, write) is recorded in
+        timing_trace; `profile` ('cprofile' or 'pyinstrument') additionally
+        captures a profile stored next to the report.
+        """
+        profiler = None
         try:
             start_time = datetime.utcnow()
+            trace = ReportTrace()
+            
+            if profile:
+                profiler = ReportProfiler(profile)
+                profiler.start()
             
             if report_type not in self.report_types:
                 raise ValueError(f"Unsupported report type: {report_type}")
             
+            formats = [f.lower() for f in (formats or [format])]
+            formats = list(dict.fromkeys(formats))  # De-duplicate, keep order
+            for fmt in formats:
+                if fmt not in REPORT_WRITERS:
+                    raise ValueError(f"Unsupported format: {fmt}")
+            
+            template_config, template_version = self._load_template(template_id, report_type)
+            if stream is not None or profiler:
+                # Profiled reports always do the full work rather than hit the cache
+                use_cache = False
+            
             # Generate unique report ID
             report_id = f"RPT-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8].upper()}"
             
-            # Get applications and scores
-            applications_data = self._get_applications_data(application_ids)
+            cache_keys = {}
+            artifacts = {}
+            report_summary = None
+            row_count = 0
+            
+            if use_cache:
+                with trace.stage('cache_lookup', formats=len(formats)) as lookup:
+                    options = {**kwargs, 'template': template_version}
+                    if kwargs.get('peer_scope') == 'portfolio':
+                        # Portfolio peers come from the index, so a rebuild changes the report
+                        options['peer_index'] = PeerScoreIndexService().built_at()
+                    if report_type == 'portfolio_summary':
+                        # The ML risk view changes with the active model
+                        options['model_version'] = self._model_registry().active_version()
+                    cache_keys = self.artifact_cache.build_keys(
+                        report_type, formats, application_ids, filters, options=options
+                    )
+                    for fmt, cache_key in cache_keys.items():
+                        artifact = self.artifact_cache.get(cache_key)
+                        if artifact:
+                            artifacts[fmt] = self._artifact_entry(
+                                report_id, fmt, artifact.file_path, artifact.file_size,
+                                artifact.content_encodings, cache_key, cache_hit=True, render_seconds=0.0
+                            )
+                            report_summary = artifact.report_summary
+                            row_count = artifact.row_count
+                    lookup['hits'] = len(artifacts)
+            
+            format_timings = {}
+            missing = [fmt for fmt in formats if fmt not in artifacts]
+            
+            if missing:
+                spool_started = datetime.utcnow()
+                spool_path, header, aggregates, row_count = self._spool_rows(
+                    report_type, report_id, application_ids, filters, stream=stream, trace=trace, **kwargs
+                )
+                format_timings['data'] = (datetime.utcnow() - spool_started).total_seconds()
+                
+                report_summary = {
+                    **header,
+                    'total_applications': row_count,
+                    **aggregates
+                }
+                
+                # Profiled reports render inline so the writers show up in the profile
+                rendered = self._render_formats(
+                    missing, report_type, report_id, spool_path, header, aggregates, template_config,
+                    parallel=profiler is None
+                )
+                
+                for fmt in missing:
+                    local_path, render_seconds = rendered[fmt]
+                    trace.add('render', render_seconds, format=fmt, bytes=os.path.getsize(local_path))
+                    with trace.stage('write', format=fmt) as entry:
+                        artifacts[fmt] = self._store_rendered(
+                            report_id, report_type, fmt, local_path, row_count, report_summary,
+                            cache_keys.get(fmt), render_seconds, start_time
+                        )
+                        entry['bytes'] = artifacts[fmt]['file_size']
+                        entry['content_encodings'] = artifacts[fmt]['content_encodings']
+                
+                if 'json' not in missing and os.path.exists(spool_path):
+                    os.remove(spool_path)
             
-            if not applications_data:
-                raise ValueError("No valid applications found")
+            for fmt in formats:
+                format_timings[fmt] = artifacts[fmt]['render_seconds']
             
-            # Generate report data
-            generator_func = self.report_types[report_type]
-            report_data = generator_func(applications_data, **kwargs)
+            primary = artifacts[formats[0]]
             
-            # Generate file based on format
-            file_info = self._generate_file(report_data, report_type, format, report_id)
+            profile_path = None
+            if profiler:
+                profiler.stop()
+                profile_path = self._store_profile(report_id, profiler, trace)
             
             generation_duration = (datetime.utcnow() - start_time).total_seconds()
             
             return {
                 'report_id': report_id,
                 'report_type': report_type,
-                'format': format,
+                'format': formats[0],
+                'formats': formats,
                 'status': 'completed',
-                'report_data': report_data,
-                'file_path': file_info['file_path'],
-                'download_url': file_info['download_url'],
-                'file_size': file_info['file_size'],
+                'report_summary': report_summary,
+                'row_count': row_count,
+                'file_path': primary['file_path'],
+                # Generate download URL (this would be your actual file serving URL)
+                'download_url': f"/api/reports/download/{report_id}/",
+                'file_size': primary['file_size'],
+                'content_encodings': primary['content_encodings'],
+                'cache_key': primary['cache_key'],
+                'cache_hit': all(a['cache_hit'] for a in artifacts.values()),
+                'artifacts': [artifacts[fmt] for fmt in formats],
+                'format_timings': format_timings,
+                'timing_trace': trace.to_list(),
+                'profile_path': profile_path,
                 'generation_duration': generation_duration,
                 'generated_at': datetime.utcnow(),
                 'expires_at': datetime.utcnow() + timedelta(days=7)
             }
             
         except Exception as e:
+            if profiler:
+                profiler.stop()
             logger.error(f"Report generation failed: {str(e)}")
             raise
     
-    def _get_applications_data(self, application_ids: List[str]) -> List[Dict]:
-        """Get application and score data"""
-        from apps.credit_scoring.models import CreditApplication, CreditScore
+    def _load_template(self, template_id: str, report_type: str) -> Tuple[Dict[str, Any], Any]:
+        """Template config plus a version marker for the cache key"""
+        if not template_id:
+            return {}, None
         
-        applications_data = []
+        from .models import ReportTemplate
         
-        for app_id in application_ids:
-            try:
-                application = CreditApplication.objects(application_id=app_id).first()
-                if not application:
-                    logger.warning(f"Application {app_id} not found")
-                    continue
-                
-                score = CreditScore.objects(application=application).first()
-                if not score:
-                    logger.warning(f"Score not found for application {app_id}")
-                    continue
-                
-                applications_data.append({
-                    'application': application,
-                    'score': score
-                })
-                
-            except Exception as e:
-                logger.error(f"Error fetching data for application {app_id}: {str(e)}")
-                continue
+        try:
+            template = ReportTemplate.objects(id=template_id, is_active=True).first()
+        except Exception:
+            template = None
+        
+        if not template or template.template_type != report_type:
+            raise ValueError(f"Report template not found: {template_id}")
         
-        return applications_data
+        # The config itself goes into the cache key, so editing a template re-renders
+        return template.template_config or {}, {'id': str(template.id), 'config': template.template_config}
     
-    def _generate_score_breakdown(self, applications_data: List[Dict], **kwargs) -> Dict:
-        """Generate score breakdown report"""
-        report_data = {
-            'title': 'Credit Score Breakdown Report',
-            'generated_at': datetime.utcnow().isoformat(),
-            'total_applications': len(applications_data),
-            'applications': []
+    def _spool_rows(self, report_type: str, report_id: str, application_ids: List[str],
+                    filters: Dict[str, Any], stream: Tuple[Iterator[Dict], Dict] = None,
+                    trace: ReportTrace = None, **kwargs) -> Tuple[str, Dict, Dict, int]:
+        """
+        Single database pass: stream rows into a JSON Lines spool file.
+        The pass is one pipeline, so its stages are timed by nesting:
+        fetch (applications, scores, fragments) inside row assembly
+        inside the spool write.
+        """
+        fetch = StageTimer()
+        transform = StageTimer()
+        
+        def source():
+            return fetch.wrap(self.fragments.iter_with_fragments(
+                iter_applications_data(application_ids, filters, batch_size=self.batch_size),
+                report_type,
+                batch_size=self.batch_size
+            ))
+        
+        spool_started = time.perf_counter()
+        if stream is not None:
+            rows, aggregates = stream
+        else:
+            rows, aggregates = self.report_types[report_type](source, **kwargs)
+        rows = transform.wrap(rows)
+        
+        header = {
+            'title': self.REPORT_TITLES[report_type],
+            'report_type': report_type,
+            'generated_at': datetime.utcnow().isoformat()
         }
         
-        for data in applications_data:
-            application = data['application']
-            score = data['score']
-            
-            app_report = {
-                'application_id': application.application_id,
-                'borrower_name': application.borrower_info.full_name,
-                'business_name': application.business_data.business_name,
-                'business_type': application.business_data.business_type,
-                'loan_amount_requested': float(application.loan_amount_requested or 0),
-                'score_details': {
-                    'final_score': float(score.total_points),
-                    'grade': score.grade,
-                    'loan_slab_adjustment': score.loan_slab_adjustment,
-                    'risk_level': score.risk_level,
-                    'default_probability': float(score.default_probability),
-                    'max_loan_amount': float(score.max_loan_amount),
-                    'component_scores': {
-                        'data_points': {
-                            'score': score.data_points_score,
-                            'percentage': (score.data_points_score / 100) * 30,  # 30% weight
-                            'breakdown': score.data_points_breakdown
-                        },
-                        'credit_ratios': {
-                            'score': float(score.credit_ratios_score),
-                            'percentage': float(score.credit_ratios_score / 100) * 20,  # 20% weight
-                            'ratios': [
-                                {
-                                    'name': ratio.ratio_name,
-                                    'value': float(ratio.ratio_value),
-                                    'score': ratio.score,
-                                    'band': ratio.band,
-                                    'threshold_met': ratio.threshold_met
-                                }
-                                for ratio in score.credit_ratios_breakdown
-                            ]
-                        },
-                        'borrower_attributes': {
-                            'score': score.borrower_attributes_score,
-                            'percentage': (score.borrower_attributes_score / 100) * 48,  # 48% weight
-                            'breakdown': score.borrower_attributes_breakdown
-                        }
-                    }
-                },
-                'risk_assessment': {
-                    'level': score.risk_level,
-                    'probability': float(score.default_probability),
-                    'red_flags': [
-                        {
-                            'type': flag.flag_type,
-                            'name': flag.flag_name,
-                            'description': flag.description,
-                            'severity': flag.severity,
-                            'impact': flag.impact
-                        }
-                        for flag in score.red_flags
-                    ]
-                },
-                'recommendations': score.recommendations,
-                'calculated_at': score.calculated_at.isoformat()
-            }
-            
-            # Add psychometric data if available
-            if score.psychometric_result:
-                app_report['score_details']['component_scores']['psychometric'] = {
-                    'total_score': score.psychometric_result.total_score,
-                    'adjustment_points': score.psychometric_result.adjustment_points,
-                    'dimensions': {
-                        'time_discipline': score.psychometric_result.time_discipline_score,
-                        'impulse_planning': score.psychometric_result.impulse_planning_score,
-                        'honesty_responsibility': score.psychometric_result.honesty_responsibility_score,
-                        'resilience': score.psychometric_result.resilience_score,
-                        'future_orientation': score.psychometric_result.future_orientation_score
-                    },
-                    'test_duration': score.psychometric_result.test_duration_minutes
-                }
-            
-            report_data['applications'].append(app_report)
+        # Rendered locally first, then handed to report storage
+        spool_path = os.path.join(self._work_dir(), f"{report_id}.{JsonLinesReportWriter.extension}")
+        row_count = JsonLinesReportWriter().write(
+            spool_path, header, table_columns(report_type), rows, aggregates
+        )
         
-        # Add summary statistics
-        if applications_data:
-            scores = [float(data['score'].total_points) for data in applications_data]
-            grade_counts = {}
-            risk_counts = {}
-            
-            for data in applications_data:
-                grade = data['score'].grade
-                risk = data['score'].risk_level
-                grade_counts[grade] = grade_counts.get(grade, 0) + 1
-                risk_counts[risk] = risk_counts.get(risk, 0) + 1
-            
-            report_data['summary'] = {
-                'average_score': sum(scores) / len(scores),
-                'highest_score': max(scores),
-                'lowest_score': min(scores),
-                'grade_distribution': grade_counts,
-                'risk_distribution': risk_counts,
-                'total_loan_amount_requested': sum([
-                    float(data['application'].loan_amount_requested or 0) 
-                    for data in applications_data
-                ]),
-                'total_max_loan_amount': sum([
-                    float(data['score'].max_loan_amount) 
-                    for data in applications_data
-                ])
-            }
+        if trace is not None:
+            spool_seconds = time.perf_counter() - spool_started
+            trace.add('fetch', fetch.seconds, rows=fetch.items)
+            trace.add('transform', transform.seconds - fetch.seconds, rows=row_count)
+            trace.add('spool', spool_seconds - transform.seconds, rows=row_count, bytes=os.path.getsize(spool_path))
         
-        return report_data
+        if not row_count and stream is None:
+            os.remove(spool_path)
+            raise ValueError("No valid applications found")
+        
+        return spool_path, header, aggregates, row_count
     
-    def _generate_risk_assessment(self, applications_data: List[Dict], **kwargs) -> Dict:
-        """Generate risk assessment report"""
-        report_data = {
-            'title': 'Risk Assessment Report',
-            'generated_at': datetime.utcnow().isoformat(),
-            'total_applications': len(applications_data),
-            'risk_analysis': []
-        }
+    def _render_formats(self, formats: List[str], report_type: str, report_id: str,
+                        spool_path: str, header: Dict, aggregates: Dict,
+                        template_config: Dict[str, Any] = None, parallel: bool = True) -> Dict[str, Tuple[str, float]]:
+        """
+        Render every non-JSON format from the spool. reportlab and openpyxl
+        are CPU-bound, so several formats go to a process pool.
+        """
+        rendered = {}
+        jobs = {}
         
-        all_red_flags = []
-        risk_levels = []
-        default_probabilities = []
+        for fmt in formats:
+            if fmt == 'json':
+                # The spool already is the JSON Lines report
+                rendered[fmt] = (spool_path, 0.0)
+            else:
+                output_path = os.path.join(self._work_dir(), f"{report_id}.{REPORT_WRITERS[fmt].extension}")
+                jobs[fmt] = (fmt, report_type, spool_path, header, aggregates, output_path, template_config)
+        
+        if parallel and len(jobs) > 1 and settings.REPORT_RENDER_WORKERS > 1:
+            executor_class = ProcessPoolExecutor if settings.REPORT_RENDER_EXECUTOR == 'process' else ThreadPoolExecutor
+            with executor_class(max_workers=min(len(jobs), settings.REPORT_RENDER_WORKERS)) as executor:
+                futures = {fmt: executor.submit(render_spooled_report, *args) for fmt, args in jobs.items()}
+                for fmt, future in futures.items():
+                    rendered[fmt] = future.result()
+        else:
+            for fmt, args in jobs.items():
+                rendered[fmt] = render_spooled_report(*args)
         
-        for data in applications_data:
-            application = data['application']
-            score = data['score']
-            
-            risk_analysis = {
-                'application_id': application.application_id,
-                'borrower_name': application.borrower_info.full_name,
-                'business_name': application.business_data.business_name,
-                'risk_level': score.risk_level,
-                'default_probability': float(score.default_probability),
-                'grade': score.grade,
-                'red_flags': [
-                    {
-                        'type': flag.flag_type,
-                        'name': flag.flag_name,
-                        'description': flag.description,
-                        'severity': flag.severity,
-                        'impact': flag.impact
-                    }
-                    for flag in score.red_flags
-                ],
-                'risk_factors': self._identify_risk_factors(application, score),
-                'mitigation_strategies': self._generate_mitigation_strategies(score),
-                'monitoring_recommendations': self._generate_monitoring_recommendations(score)
-            }
-            
-            report_data['risk_analysis'].append(risk_analysis)
-            
-            # Collect data for summary
-            all_red_flags.extend(score.red_flags)
-            risk_levels.append(score.risk_level)
-            default_probabilities.append(float(score.default_probability))
-        
-        # Generate risk summary
-        report_data['risk_summary'] = self._generate_risk_summary(
-            risk_levels, default_probabilities, all_red_flags
+        return rendered
+    
+    def _store_rendered(self, report_id: str, report_type: str, fmt: str, local_path: str,
+                        row_count: int, report_summary: Dict, cache_key: str,
+                        render_seconds: float, start_time: datetime) -> Dict[str, Any]:
+        """Compress, move into storage (via the artifact cache when enabled) and describe one format"""
+        extension = REPORT_WRITERS[fmt].extension
+        file_size = os.path.getsize(local_path)
+        content_encodings = write_compressed_variants(local_path)
+        
+        if cache_key:
+            artifact = self.artifact_cache.store(
+                cache_key, report_type, fmt, local_path,
+                extension=extension,
+                row_count=row_count,
+                report_summary=report_summary,
+                generation_duration=(datetime.utcnow() - start_time).total_seconds(),
+                content_encodings=content_encodings
+            )
+            storage_key = artifact.file_path
+        else:
+            storage_key = f"{report_id}.{extension}"
+            for encoding in content_encodings:
+                suffix = ENCODING_SUFFIXES[encoding]
+                self.storage.save(local_path + suffix, storage_key + suffix)
+            self.storage.save(local_path, storage_key)
+        
+        return self._artifact_entry(
+            report_id, fmt, storage_key, file_size, content_encodings,
+            cache_key, cache_hit=False, render_seconds=render_seconds
         )
-        
-        return report_data
+    
+    def _store_profile(self, report_id: str, profiler: ReportProfiler, trace: ReportTrace) -> str:
+        """Save the captured profile under the report's id; a failure only loses the profile"""
+        try:
+            with trace.stage('profile') as entry:
+                local_path = os.path.join(self._work_dir(), f"{report_id}.{profiler.extension}")
+                entry['bytes'] = profiler.save(local_path)
+                return self.storage.save(local_path, f"{report_id}.{profiler.extension}")
+        except Exception as e:
+            logger.error(f"Error saving report profile {report_id}: {str(e)}")
+            return None
+    
+    def _artifact_entry(self, report_id: str, fmt: str, file_path: str, file_size: int,
+                        content_encodings: List[str], cache_key: str, cache_hit: bool,
+                        render_seconds: float) -> Dict[str, Any]:
+        return {
+            'format': fmt,
+            'file_path': file_path,
+            'file_size': file_size,
+            'content_encodings': content_encodings or [],
+            'cache_key': cache_key,
+            'cache_hit': cache_hit,
+            'render_seconds': round(render_seconds, 4),
+            'download_url': f"/api/reports/download/{report_id}/?file_format={fmt}"
+        }
+    
+    def _work_dir(self) -> str:
+        work_dir = os.path.join(settings.MEDIA_ROOT, 'reports', 'tmp')
+        os.makedirs(work_dir, exist_ok=True)
+        return work_dir
+    
+    def _get_applications_data(self, application_ids: List[str]) -> List[Dict]:
+        """Get application and score data"""
+        return list(iter_applications_data(application_ids, batch_size=self.batch_size))
+    
+    # In-memory variants, used by the single-application endpoints
+    def _generate_score_breakdown(self, applications_data: List[Dict], **kwargs) -> Dict:
+        """Generate score breakdown report"""
+        return self._collect('score_breakdown', applications_data, **kwargs)
+    
+    def _generate_risk_assessment(self, applications_data: List[Dict], **kwargs) -> Dict:
+        """Generate risk assessment report"""
+        return self._collect('risk_assessment', applications_data, **kwargs)
     
     def _generate_comparative_analysis(self, applications_data: List[Dict], **kwargs) -> Dict:
         """Generate comparative analysis report"""
+        return self._collect('comparative_analysis', applications_data, **kwargs)
+    
+    def _generate_portfolio_summary(self, applications_data: List[Dict], **kwargs) -> Dict:
+        """Generate portfolio summary report"""
+        return self._collect('portfolio_summary', applications_data, **kwargs)
+    
+    def _collect(self, report_type: str, applications_data: List[Dict], **kwargs) -> Dict:
+        """Materialize a report stream into the nested report_data dict"""
+        applications_data = self.fragments.attach(list(applications_data), report_type)
+        rows, aggregates = self.report_types[report_type](lambda: iter(applications_data), **kwargs)
         report_data = {
-            'title': 'Comparative Analysis Report',
+            'title': self.REPORT_TITLES[report_type],
             'generated_at': datetime.utcnow().isoformat(),
             'total_applications': len(applications_data),
-            'comparisons': []
+            self.ROWS_KEYS[report_type]: list(rows)
         }
+        report_data.update(aggregates)
+        return report_data
+    
+    # Streaming report builders: each returns (row generator, aggregates dict).
+    # The aggregates dict is filled in once the row generator is exhausted.
+    def _stream_score_breakdown(self, source: Callable[[], Iterator[Dict]], **kwargs) -> Tuple[Iterator[Dict], Dict]:
+        """Score breakdown rows with running summary statistics"""
+        aggregates = {}
+        
+        def rows():
+            scores = RunningStats()
+            grade_counts = {}
+            risk_counts = {}
+            total_requested = 0.0
+            total_max_loan = 0.0
+            
+            for data in source():
+                application = data['application']
+                score = data['score']
+                
+                scores.add(score.total_points)
+                count_into(grade_counts, score.grade)
+                count_into(risk_counts, score.risk_level)
+                total_requested += float(application.loan_amount_requested or 0)
+                total_max_loan += float(score.max_loan_amount)
+                
+                yield self._fragment_row(data, 'score_breakdown')
+            
+            if scores.count:
+                aggregates['summary'] = {
+                    'average_score': scores.mean,
+                    'highest_score': scores.max,
+                    'lowest_score': scores.min,
+                    'grade_distribution': grade_counts,
+                    'risk_distribution': risk_counts,
+                    'total_loan_amount_requested': total_requested,
+                    'total_max_loan_amount': total_max_loan
+                }
         
-        # Calculate industry benchmarks and peer comparisons
-        business_types = {}
-        for data in applications_data:
-            business_type = data['application'].business_data.business_type
-            if business_type not in business_types:
-                business_types[business_type] = []
-            business_types[business_type].append(data)
-        
-        for data in applications_data:
-            application = data['application']
-            score = data['score']
-            business_type = application.business_data.business_type
+        return rows(), aggregates
+    
+    def _stream_risk_assessment(self, source: Callable[[], Iterator[Dict]], **kwargs) -> Tuple[Iterator[Dict], Dict]:
+        """Risk assessment rows with running risk summary"""
+        aggregates = {}
+        
+        def rows():
+            risk_counts = {}
+            flag_counts = {}
+            default_probability = RunningStats()
+            total_red_flags = 0
             
-            # Get peers in same business type
-            peers = business_types.get(business_type, [])
-            peer_scores = [float(p['score'].total_points) for p in peers if p != data]
+            for data in source():
+                score = data['score']
+                
+                count_into(risk_counts, score.risk_level)
+                default_probability.add(score.default_probability)
+                for flag in score.red_flags:
+                    count_into(flag_counts, flag.flag_type)
+                total_red_flags += len(score.red_flags)
+                
+                yield self._fragment_row(data, 'risk_assessment')
+            
+            if default_probability.count:
+                total = default_probability.count
+                aggregates['risk_summary'] = {
+                    'risk_distribution': risk_counts,
+                    'average_default_probability': default_probability.mean * 100,
+                    'high_risk_percentage': (risk_counts.get('high', 0) + risk_counts.get('very_high', 0)) / total * 100,
+                    'red_flag_distribution': flag_counts,
+                    'total_red_flags': total_red_flags
+                }
+        
+        return rows(), aggregates
+    
+    def _stream_comparative_analysis(self, source: Callable[[], Iterator[Dict]], peer_scope: str = 'selection',
+                                     **kwargs) -> Tuple[Iterator[Dict], Dict]:
+        """
+        Peer comparison in one database pass. The pass collects scores
+        into the vectorized PeerComparisonEngine and spools each base row
+        to a temporary JSON Lines file; once the engine has computed every
+        row's peer statistics at once, rows are emitted from the spool, so
+        they are exactly the rows the statistics were computed over. Peers
+        are the rest of the selection, or with peer_scope='portfolio' every
+        scored application of the same business type (from the precomputed
+        peer score index).
+        """
+        aggregates = {}
+        
+        def rows():
+            engine = PeerComparisonEngine()
+            with tempfile.TemporaryFile('w+', encoding='utf-8', dir=self._work_dir()) as spool:
+                for data in source():
+                    base = self._fragment_row(data, 'comparative_analysis')
+                    engine.add(base, data['score'].calculated_at)
+                    spool.write(json.dumps(base, default=str) + '\n')
+                
+                aggregates['peer_scope'] = peer_scope
+                if not engine.row_count:
+                    aggregates['industry_insights'] = {}
+                    return
+                
+                peer_index = PeerScoreIndexService().load() if peer_scope == 'portfolio' else None
+                engine.compute(peer_index)
+                
+                spool.seek(0)
+                for line in spool:
+                    base = json.loads(line)
+                    yield self._build_comparative_row(base, engine.peer_stats(base['application_id']))
             
-            comparison = {
-                'application_id': application.application_id,
-                'borrower_name': application.borrower_info.full_name,
-                'business_name': application.business_data.business_name,
-                'business_type': business_type,
-                'score': float(score.total_points),
+            aggregates['industry_insights'] = engine.industry_insights()
+        
+        return rows(), aggregates
+    
+    def _stream_portfolio_summary(self, source: Callable[[], Iterator[Dict]], **kwargs) -> Tuple[Iterator[Dict], Dict]:
+        """
+        Compact per-application rows with running portfolio metrics and
+        monthly trends, plus the active model's view of the portfolio risk
+        (ml_risk) from one batched prediction per batch_size applications
+        """
+        aggregates = {}
+        risk_assessor = self._portfolio_risk_assessor()
+        
+        def rows():
+            portfolio = PortfolioAggregates()
+            ml_risk = {'risk_level_counts': {}, 'probability_sum': 0.0}
+            pending = []
+            
+            for data in source():
+                portfolio.add(data['application'], data['score'])
+                if risk_assessor:
+                    pending.append(data)
+                    if len(pending) >= self.batch_size:
+                        self._add_ml_risk(ml_risk, risk_assessor, pending)
+                        pending = []
+                yield self._fragment_row(data, 'portfolio_summary')
+            
+            aggregates.update(portfolio.summary())
+            if risk_assessor:
+                self._add_ml_risk(ml_risk, risk_assessor, pending)
+                ml_summary = risk_assessor.ml_risk_summary(ml_risk['risk_level_counts'], ml_risk['probability_sum'])
+                if ml_summary:
+                    aggregates['ml_risk'] = ml_summary
+        
+        return rows(), aggregates
+    
+    def _portfolio_risk_assessor(self):
+        """RiskAssessor over the active model, or None when AI predictions are off or no model is available"""
+        if not settings.CREDIT_SCORING.get('ENABLE_AI_PREDICTIONS', True):
+            return None
+        try:
+            return RiskAssessor(self._model_registry().get_predictor())
+        except (FileNotFoundError, ValueError) as e:
+            logger.warning(f"Portfolio report without ML risk: {str(e)}")
+            return None
+    
+    def _add_ml_risk(self, ml_risk: Dict, risk_assessor: RiskAssessor, batch: List[Dict]) -> None:
+        """Fold one batch of model predictions into the running ML risk totals"""
+        counts = ml_risk['risk_level_counts']
+        for prediction in risk_assessor.predict_batch(batch):
+            counts[prediction['risk_level']] = counts.get(prediction['risk_level'], 0) + 1
+            ml_risk['probability_sum'] += prediction['default_probability']
+    
+    def _model_registry(self) -> ModelRegistry:
+        return ModelRegistry(settings.CREDIT_SCORING.get('AI_MODELS_PATH'))
+    
+    def _fragment_row(self, data: Dict, report_type: str) -> Dict:
+        """Precomputed row from the attached report fragment, built on the spot without one"""
+        fragment = data.get('fragment')
+        if fragment is not None:
+            return fragment[report_type]
+        
+        builders = {
+            'score_breakdown': self._build_score_breakdown_row,
+            'risk_assessment': self._build_risk_assessment_row,
+            'comparative_analysis': self._build_comparative_base,
+            'portfolio_summary': self._build_portfolio_row
+        }
+        return builders[report_type](data['application'], data['score'])
+    
+    # Row builders (their output is cached in report fragments - bump FRAGMENT_VERSION when changing them)
+    def _build_score_breakdown_row(self, application, score) -> Dict:
+        """Detailed score breakdown for one application"""
+        app_report = {
+            'application_id': application.application_id,
+            'borrower_name': application.borrower_info.full_name,
+            'business_name': application.business_data.business_name,
+            'business_type': application.business_data.business_type,
+            'loan_amount_requested': float(application.loan_amount_requested or 0),
+            'score_details': {
+                'final_score': float(score.total_points),
                 'grade': score.grade,
-                'peer_comparison': {
-                    'business_type': business_type,
-                    'peer_count': len(peer_scores),
-                    'peer_average': sum(peer_scores) / len(peer_scores) if peer_scores else 0,
-                    'percentile_ranking': self._calculate_percentile(float(score.total_points), peer_scores),
-                    'above_average': float(score.total_points) > (sum(peer_scores) / len(peer_scores)) if peer_scores else True
-                },
-                'component_comparison': {
+                'loan_slab_adjustment': score.loan_slab_adjustment,
+                'risk_level': score.risk_level,
+                'default_probability': float(score.default_probability),
+                'max_loan_amount': float(score.max_loan_amount),
+                'component_scores': {
                     'data_points': {
                         'score': score.data_points_score,
-                        'peer_average': self._get_peer_average([p['score'].data_points_score for p in peers if p != data])
+                        'percentage': (score.data_points_score / 100) * 30,  # 30% weight
+                        'breakdown': score.data_points_breakdown
                     },
                     'credit_ratios': {
                         'score': float(score.credit_ratios_score),
-                        'peer_average': self._get_peer_average([float(p['score'].credit_ratios_score) for p in peers if p != data])
+                        'percentage': float(score.credit_ratios_score / 100) * 20,  # 20% weight
+                        'ratios': [
+                            {
+                                'name': ratio.ratio_name,
+                                'value': float(ratio.ratio_value),
+                                'score': ratio.score,
+                                'band': ratio.band,
+                                'threshold_met': ratio.threshold_met
+                            }
+                            for ratio in score.credit_ratios_breakdown
+                        ]
                     },
                     'borrower_attributes': {
                         'score': score.borrower_attributes_score,
-                        'peer_average': self._get_peer_average([p['score'].borrower_attributes_score for p in peers if p != data])
+                        'percentage': (score.borrower_attributes_score / 100) * 48,  # 48% weight
+                        'breakdown': score.borrower_attributes_breakdown
                     }
                 }
-            }
-            
-            report_data['comparisons'].append(comparison)
+            },
+            'risk_assessment': {
+                'level': score.risk_level,
+                'probability': float(score.default_probability),
+                'red_flags': self._serialize_red_flags(score)
+            },
+            'recommendations': score.recommendations,
+            'calculated_at': score.calculated_at.isoformat()
+        }
         
-        # Generate industry insights
-        report_data['industry_insights'] = self._generate_industry_insights(business_types)
+        # Add psychometric data if available
+        if score.psychometric_result:
+            app_report['score_details']['component_scores']['psychometric'] = {
+                'total_score': score.psychometric_result.total_score,
+                'adjustment_points': score.psychometric_result.adjustment_points,
+                'dimensions': {
+                    'time_discipline': score.psychometric_result.time_discipline_score,
+                    'impulse_planning': score.psychometric_result.impulse_planning_score,
+                    'honesty_responsibility': score.psychometric_result.honesty_responsibility_score,
+                    'resilience': score.psychometric_result.resilience_score,
+                    'future_orientation': score.psychometric_result.future_orientation_score
+                },
+                'test_duration': score.psychometric_result.test_duration_minutes
+            }
         
-        return report_data
+        return app_report
     
-    def _generate_portfolio_summary(self, applications_data: List[Dict], **kwargs) -> Dict:
-        """Generate portfolio summary report"""
-        report_data = {
-            'title': 'Portfolio Summary Report',
-            'generated_at': datetime.utcnow().isoformat(),
-            'total_applications': len(applications_data),
-            'portfolio_overview': {}
+    def _build_risk_assessment_row(self, application, score) -> Dict:
+        """Risk analysis for one application"""
+        return {
+            'application_id': application.application_id,
+            'borrower_name': application.borrower_info.full_name,
+            'business_name': application.business_data.business_name,
+            'risk_level': score.risk_level,
+            'default_probability': float(score.default_probability),
+            'grade': score.grade,
+            'red_flags': self._serialize_red_flags(score),
+            'risk_factors': self._identify_risk_factors(application, score),
+            'mitigation_strategies': self._generate_mitigation_strategies(score),
+            'monitoring_recommendations': self._generate_monitoring_recommendations(score)
         }
-        
-        if not applications_data:
-            return report_data
-        
-        # Calculate portfolio metrics
-        scores = [float(data['score'].total_points) for data in applications_data]
-        grades = [data['score'].grade for data in applications_data]
-        risk_levels = [data['score'].risk_level for data in applications_data]
-        loan_amounts = [float(data['application'].loan_amount_requested or 0) for data in applications_data]
-        max_loan_amounts = [float(data['score'].max_loan_amount) for data in applications_data]
-        
-        # Grade distribution
-        grade_dist = {}
-        for grade in grades:
-            grade_dist[grade] = grade_dist.get(grade, 0) + 1
-        
-        # Risk distribution
-        risk_dist = {}
-        for risk in risk_levels:
-            risk_dist[risk] = risk_dist.get(risk, 0) + 1
-        
-        # Business type distribution
-        business_types = {}
-        for data in applications_data:
-            btype = data['application'].business_data.business_type
-            business_types[btype] = business_types.get(btype, 0) + 1
-        
-        report_data['portfolio_overview'] = {
-            'total_applications': len(applications_data),
-            'average_score': sum(scores) / len(scores),
-            'score_range': {
-                'min': min(scores),
-                'max': max(scores),
-                'std_dev': self._calculate_std_dev(scores)
-            },
-            'grade_distribution': grade_dist,
-            'risk_distribution': risk_dist,
-            'business_type_distribution': business_types,
-            'loan_amounts': {
-                'total_requested': sum(loan_amounts),
-                'total_approved': sum(max_loan_amounts),
-                'average_requested': sum(loan_amounts) / len(loan_amounts),
-                'average_approved': sum(max_loan_amounts) / len(max_loan_amounts),
-                'approval_ratio': sum(max_loan_amounts) / sum(loan_amounts) if sum(loan_amounts) > 0 else 0
-            },
-            'quality_metrics': {
-                'approval_rate': len([g for g in grades if g in ['A', 'B', 'C']]) / len(grades) * 100,
-                'high_grade_rate': len([g for g in grades if g in ['A', 'B']]) / len(grades) * 100,
-                'low_risk_rate': len([r for r in risk_levels if r == 'low']) / len(risk_levels) * 100,
-                'average_default_probability': sum([float(data['score'].default_probability) for data in applications_data]) / len(applications_data) * 100
+    
+    def _build_comparative_base(self, application, score) -> Dict:
+        """Selection-independent part of a comparative row"""
+        return {
+            'application_id': application.application_id,
+            'borrower_name': application.borrower_info.full_name,
+            'business_name': application.business_data.business_name,
+            'business_type': application.business_data.business_type,
+            'score': float(score.total_points),
+            'grade': score.grade,
+            'component_scores': {
+                'data_points': score.data_points_score,
+                'credit_ratios': float(score.credit_ratios_score),
+                'borrower_attributes': score.borrower_attributes_score
             }
         }
-        
-        # Add trend analysis if dates are available
-        report_data['trends'] = self._analyze_portfolio_trends(applications_data)
-        
-        return report_data
     
-    def _generate_file(self, report_data: Dict, report_type: str, format: str, report_id: str) -> Dict:
-        """Generate report file in specified format"""
-        try:
-            # Create reports directory if not exists
-            reports_dir = 'media/reports'
-            os.makedirs(reports_dir, exist_ok=True)
-            
-            filename = f"{report_id}.{format.lower()}"
-            file_path = os.path.join(reports_dir, filename)
-            
-            if format.lower() == 'json':
-                import json
-                with open(file_path, 'w') as f:
-                    json.dump(report_data, f, indent=2, default=str)
-            
-            elif format.lower() == 'excel':
-                self._generate_excel_file(report_data, file_path, report_type)
-            
-            elif format.lower() == 'pdf':
-                self._generate_pdf_file(report_data, file_path, report_type)
-            
-            elif format.lower() == 'html':
-                self._generate_html_file(report_data, file_path, report_type)
-            
-            else:
-                raise ValueError(f"Unsupported format: {format}")
-            
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Generate download URL (this would be your actual file serving URL)
-            download_url = f"/api/reports/download/{report_id}/"
-            
-            return {
-                'file_path': file_path,
-                'download_url': download_url,
-                'file_size': file_size
+    def _build_comparative_row(self, base: Dict, peer: Dict[str, Any]) -> Dict:
+        """Peer comparison for one application against its business type"""
+        components = base['component_scores']
+        
+        return {
+            'application_id': base['application_id'],
+            'borrower_name': base['borrower_name'],
+            'business_name': base['business_name'],
+            'business_type': base['business_type'],
+            'score': base['score'],
+            'grade': base['grade'],
+            'peer_comparison': {
+                'business_type': base['business_type'],
+                'peer_count': peer['peer_count'],
+                'peer_average': peer['peer_average'],
+                'percentile_ranking': peer['percentile_ranking'],
+                'above_average': peer['above_average']
+            },
+            'component_comparison': {
+                field: {
+                    'score': components[field],
+                    'peer_average': peer['component_averages'][field]
+                }
+                for field in ['data_points', 'credit_ratios', 'borrower_attributes']
             }
-            
-        except Exception as e:
-            logger.error(f"File generation failed: {str(e)}")
-            raise
+        }
     
-    def _generate_excel_file(self, report_data: Dict, file_path: str, report_type: str):
-        """Generate Excel format report"""
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, PatternFill
-            
-            workbook = openpyxl.Workbook()
-            
-            if report_type == 'score_breakdown':
-                self._create_score_breakdown_excel(workbook, report_data)
-            elif report_type == 'risk_assessment':
-                self._create_risk_assessment_excel(workbook, report_data)
-            elif report_type == 'portfolio_summary':
-                self._create_portfolio_summary_excel(workbook, report_data)
-            
-            workbook.save(file_path)
-            
-        except ImportError:
-            logger.error("openpyxl not installed - cannot generate Excel files")
-            raise Exception("Excel generation not available")
+    def _build_portfolio_row(self, application, score) -> Dict:
+        """Compact portfolio line for one application"""
+        return {
+            'application_id': application.application_id,
+            'business_name': application.business_data.business_name,
+            'business_type': application.business_data.business_type,
+            'created_at': application.created_at.isoformat(),
+            'score': float(score.total_points),
+            'grade': score.grade,
+            'risk_level': score.risk_level,
+            'default_probability': float(score.default_probability),
+            'loan_amount_requested': float(application.loan_amount_requested or 0),
+            'max_loan_amount': float(score.max_loan_amount)
+        }
     
-    def _generate_pdf_file(self, report_data: Dict, file_path: str, report_type: str):
-        """Generate PDF format report"""
-        try:
-            from reportlab.lib.pagesizes import letter, A4
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import inch
-            from reportlab.lib import colors
-            
-            doc = SimpleDocTemplate(file_path, pagesize=A4)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Title
-            title = Paragraph(report_data.get('title', 'Credit Scoring Report'), styles['Title'])
-            story.append(title)
-            story.append(Spacer(1, 0.2*inch))
-            
-            # Generated date
-            date_para = Paragraph(f"Generated on: {report_data.get('generated_at', '')}", styles['Normal'])
-            story.append(date_para)
-            story.append(Spacer(1, 0.3*inch))
-            
-            if report_type == 'score_breakdown':
-                self._create_score_breakdown_pdf(story, report_data, styles)
-            elif report_type == 'risk_assessment':
-                self._create_risk_assessment_pdf(story, report_data, styles)
-            elif report_type == 'portfolio_summary':
-                self._create_portfolio_summary_pdf(story, report_data, styles)
-            
-            doc.build(story)
-            
-        except ImportError:
-            logger.error("reportlab not installed - cannot generate PDF files")
-            # Fallback to simple text file
-            with open(file_path.replace('.pdf', '.txt'), 'w') as f:
-                f.write(str(report_data))
-    
-    def _generate_html_file(self, report_data: Dict, file_path: str, report_type: str):
-        """Generate HTML format report"""
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{report_data.get('title', 'Credit Scoring Report')}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .header {{ text-align: center; margin-bottom: 30px; }}
-                .summary {{ background-color: #f5f5f5; padding: 15px; margin: 20px 0; }}
-                table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-                th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                th {{ background-color: #f2f2f2; }}
-                .grade-a {{ background-color: #d4edda; }}
-                .grade-b {{ background-color: #cce7ff; }}
-                .grade-c {{ background-color: #fff3cd; }}
-                .grade-r {{ background-color: #f8d7da; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>{report_data.get('title', 'Credit Scoring Report')}</h1>
-                <p>Generated on: {report_data.get('generated_at', '')}</p>
-            </div>
-        """
-        
-        if report_type == 'score_breakdown':
-            html_content += self._create_score_breakdown_html(report_data)
-        elif report_type == 'risk_assessment':
-            html_content += self._create_risk_assessment_html(report_data)
-        elif report_type == 'portfolio_summary':
-            html_content += self._create_portfolio_summary_html(report_data)
-        
-        html_content += """
-        </body>
-        </html>
-        """
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-    
-    # Helper methods for specific report formats
-    def _create_score_breakdown_html(self, report_data: Dict) -> str:
-        """Create HTML content for score breakdown report"""
-        html = ""
-        
-        if 'summary' in report_data:
-            summary = report_data['summary']
-            html += f"""
-            <div class="summary">
-                <h2>Summary</h2>
-                <p><strong>Total Applications:</strong> {report_data['total_applications']}</p>
-                <p><strong>Average Score:</strong> {summary['average_score']:.2f}</p>
-                <p><strong>Score Range:</strong> {summary['lowest_score']:.2f} - {summary['highest_score']:.2f}</p>
-            </div>
-            """
-        
-        html += "<h2>Application Details</h2>"
-        html += """
-        <table>
-            <tr>
-                <th>Application ID</th>
-                <th>Borrower Name</th>
-                <th>Business Name</th>
-                <th>Final Score</th>
-                <th>Grade</th>
-                <th>Risk Level</th>
-                <th>Max Loan Amount</th>
-            </tr>
-        """
-        
-        for app in report_data.get('applications', []):
-            grade_class = f"grade-{app['score_details']['grade'].lower()}"
-            html += f"""
-            <tr class="{grade_class}">
-                <td>{app['application_id']}</td>
-                <td>{app['borrower_name']}</td>
-                <td>{app['business_name']}</td>
-                <td>{app['score_details']['final_score']:.2f}</td>
-                <td>{app['score_details']['grade']}</td>
-                <td>{app['risk_assessment']['level']}</td>
-                <td>৳{app['score_details']['max_loan_amount']:,.2f}</td>
-            </tr>
-            """
-        
-        html += "</table>"
-        return html
+    def _serialize_red_flags(self, score) -> List[Dict]:
+        return [
+            {
+                'type': flag.flag_type,
+                'name': flag.flag_name,
+                'description': flag.description,
+                'severity': flag.severity,
+                'impact': flag.impact
+            }
+            for flag in score.red_flags
+        ]
     
     # Utility methods
     def _identify_risk_factors(self, application, score) -> List[str]:
@@ -641,90 +785,3 @@ class ReportGenerator:
         recommendations.append("Early warning system alerts")
         
         return recommendations
-    
-    def _generate_risk_summary(self, risk_levels, default_probabilities, red_flags) -> Dict:
-        """Generate risk summary statistics"""
-        risk_counts = {}
-        for risk in risk_levels:
-            risk_counts[risk] = risk_counts.get(risk, 0) + 1
-        
-        flag_counts = {}
-        for flag in red_flags:
-            flag_counts[flag.flag_type] = flag_counts.get(flag.flag_type, 0) + 1
-        
-        return {
-            'risk_distribution': risk_counts,
-            'average_default_probability': sum(default_probabilities) / len(default_probabilities) * 100,
-            'high_risk_percentage': (risk_counts.get('high', 0) + risk_counts.get('very_high', 0)) / len(risk_levels) * 100,
-            'red_flag_distribution': flag_counts,
-            'total_red_flags': len(red_flags)
-        }
-    
-    def _calculate_percentile(self, score, peer_scores) -> float:
-        """Calculate percentile ranking"""
-        if not peer_scores:
-            return 50.0
-        
-        below_count = sum(1 for s in peer_scores if s < score)
-        return (below_count / len(peer_scores)) * 100
-    
-    def _get_peer_average(self, scores) -> float:
-        """Get average of peer scores"""
-        return sum(scores) / len(scores) if scores else 0
-    
-    def _generate_industry_insights(self, business_types) -> Dict:
-        """Generate industry-level insights"""
-        insights = {}
-        
-        for business_type, data_list in business_types.items():
-            scores = [float(d['score'].total_points) for d in data_list]
-            grades = [d['score'].grade for d in data_list]
-            
-            grade_dist = {}
-            for grade in grades:
-                grade_dist[grade] = grade_dist.get(grade, 0) + 1
-            
-            insights[business_type] = {
-                'total_applications': len(data_list),
-                'average_score': sum(scores) / len(scores),
-                'grade_distribution': grade_dist,
-                'approval_rate': len([g for g in grades if g != 'R']) / len(grades) * 100
-            }
-        
-        return insights
-    
-    def _analyze_portfolio_trends(self, applications_data) -> Dict:
-        """Analyze portfolio trends over time"""
-        # Group by month
-        monthly_data = {}
-        
-        for data in applications_data:
-            created_date = data['application'].created_at
-            month_key = created_date.strftime('%Y-%m')
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = []
-            monthly_data[month_key].append(data)
-        
-        trends = []
-        for month, month_data in sorted(monthly_data.items()):
-            scores = [float(d['score'].total_points) for d in month_data]
-            grades = [d['score'].grade for d in month_data]
-            
-            trends.append({
-                'month': month,
-                'applications': len(month_data),
-                'average_score': sum(scores) / len(scores),
-                'approval_rate': len([g for g in grades if g != 'R']) / len(grades) * 100
-            })
-        
-        return trends
-    
-    def _calculate_std_dev(self, numbers) -> float:
-        """Calculate standard deviation"""
-        if len(numbers) < 2:
-            return 0
-        
-        mean = sum(numbers) / len(numbers)
-        variance = sum((x - mean) ** 2 for x in numbers) / len(numbers)
-        return variance ** 0.5
\ No newline at end of file
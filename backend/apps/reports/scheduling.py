@@ -0,0 +1,257 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Any, Iterator, Tuple
+import logging
+
+from django.utils import timezone
+
+from .models import GeneratedReport, ReportSchedule
+from .report_generator import ReportGenerator
+from .streaming import PortfolioAggregates, build_application_filters
+
+logger = logging.getLogger(__name__)
+
+def next_run_after(schedule: ReportSchedule, after: datetime = None) -> datetime:
+    """Next matching minute after `after` (UTC, naive), evaluated in CELERY_TIMEZONE"""
+    from celery.schedules import crontab
+    from credit_scoring.celery import app
+    
+    cron = crontab(
+        minute=schedule.minute,
+        hour=schedule.hour,
+        day_of_week=schedule.day_of_week,
+        day_of_month=schedule.day_of_month,
+        month_of_year=schedule.month_of_year,
+        app=app
+    )
+    now = timezone.localtime(timezone.now())
+    last_run = timezone.localtime(timezone.make_aware(after, dt_timezone.utc)) if after else now
+    next_run = now + cron.remaining_estimate(last_run)
+    # remaining_estimate is relative to its own clock reading; snap to the minute
+    next_run = (next_run + timedelta(seconds=30)).replace(second=0, microsecond=0)
+    return next_run.astimezone(dt_timezone.utc).replace(tzinfo=None)
+
+class ReportScheduleService:
+    """
+    Run recurring reports. portfolio_summary schedules keep their
+    aggregates (counts, sums, Welford stats, monthly trends) between runs
+    and only fold in applications scored since the previous run's
+    watermark, so a weekly run costs O(new scores). Other report types
+    are regenerated in full (and still benefit from the artifact cache).
+    """
+    
+    # Scores calculated in the last moments before a run may not be committed yet
+    SETTLE_SECONDS = 60
+    # Every Nth run rebuilds the state from scratch to pick up application edits
+    FULL_REBUILD_EVERY = 12
+    
+    def __init__(self, generator: ReportGenerator = None, batch_size: int = 500):
+        self.generator = generator or ReportGenerator(batch_size=batch_size)
+        self.batch_size = batch_size
+    
+    def claim_due(self, now: datetime = None) -> List[str]:
+        """
+        Ids of schedules due at `now`, each advanced to its next run with a
+        compare-and-set so overlapping beat ticks never run it twice.
+        """
+        now = now or datetime.utcnow()
+        claimed = []
+        
+        for schedule in ReportSchedule.objects(is_active=True, next_run_at=None):
+            schedule.update(set__next_run_at=next_run_after(schedule))
+        
+        for schedule in ReportSchedule.objects(is_active=True, next_run_at__lte=now):
+            next_run_at = next_run_after(schedule, max(now, schedule.next_run_at))
+            updated = ReportSchedule.objects(
+                id=schedule.id, next_run_at=schedule.next_run_at
+            ).update_one(set__next_run_at=next_run_at)
+            if updated:
+                claimed.append(str(schedule.id))
+        
+        return claimed
+    
+    def run(self, schedule: ReportSchedule) -> Dict[str, Any]:
+        """Generate one scheduled report and record it as a GeneratedReport"""
+        run_started = datetime.utcnow()
+        window_end = run_started - timedelta(seconds=self.SETTLE_SECONDS)
+        filters = schedule.selection_filters or {}
+        portfolio = None
+        stream = None
+        
+        if schedule.report_type == 'portfolio_summary':
+            portfolio, stream = self._portfolio_stream(schedule, filters, window_end)
+        
+        result = self.generator.generate_report(
+            report_type=schedule.report_type,
+            filters=filters,
+            formats=schedule.formats or ['pdf'],
+            template_id=schedule.template_id or None,
+            stream=stream
+        )
+        
+        GeneratedReport(
+            report_id=result['report_id'],
+            report_type=result['report_type'],
+            format=result['format'],
+            formats=result['formats'],
+            report_summary=result['report_summary'],
+            selection_filters=filters,
+            template_id=schedule.template_id,
+            schedule_id=str(schedule.id),
+            row_count=result['row_count'],
+            cache_key=result['cache_key'],
+            cache_hit=result['cache_hit'],
+            file_path=result['file_path'],
+            content_encodings=result['content_encodings'],
+            artifacts=result['artifacts'],
+            format_timings=result['format_timings'],
+            timing_trace=result['timing_trace'],
+            download_url=result['download_url'],
+            requested_by=schedule.created_by,
+            generated_at=result['generated_at'],
+            generation_duration=result['generation_duration'],
+            file_size=result['file_size'],
+            status='completed',
+            expires_at=result['expires_at']
+        ).save()
+        
+        updates = {
+            'set__last_run_at': run_started,
+            'set__last_report_id': result['report_id'],
+            'set__updated_at': datetime.utcnow(),
+            'unset__last_error': True,
+            'inc__run_count': 1
+        }
+        if portfolio is not None:
+            updates['set__state'] = portfolio.to_state()
+            updates['set__watermark'] = window_end
+        schedule.update(**updates)
+        
+        logger.info(f"Scheduled report {schedule.name} produced {result['report_id']}")
+        return result
+    
+    def _portfolio_stream(self, schedule: ReportSchedule, filters: Dict[str, Any],
+                          window_end: datetime) -> Tuple[PortfolioAggregates, Tuple[Iterator[Dict], Dict]]:
+        """
+        (aggregates object, (rows, aggregates dict)) for a portfolio run.
+        Rows are the applications scored in this run's window; the summary
+        covers the whole selection.
+        """
+        watermark = schedule.watermark
+        incremental = bool(
+            watermark and schedule.state
+            and (schedule.run_count or 0) % self.FULL_REBUILD_EVERY != 0
+        )
+        
+        if incremental:
+            portfolio = PortfolioAggregates(schedule.state)
+            delta = list(self._scored_pairs(filters, watermark, window_end))
+            
+            for data in delta:
+                previous = data.pop('previous_score')
+                if previous and not portfolio.remove(data['application'], previous):
+                    logger.info(f"Schedule {schedule.name}: superseded score touches min/max, rebuilding")
+                    incremental = False
+                    break
+                portfolio.add(data['application'], data['score'])
+        
+        if incremental:
+            rows = self._portfolio_rows(delta)
+        else:
+            portfolio = PortfolioAggregates()
+            rows = self._full_portfolio_rows(portfolio, filters, watermark, window_end)
+        
+        aggregates = {}
+        
+        def finalized():
+            row_count = 0
+            for row in rows:
+                row_count += 1
+                yield row
+            aggregates.update(portfolio.summary())
+            aggregates['schedule'] = {
+                'schedule_id': str(schedule.id),
+                'name': schedule.name,
+                'period_start': watermark.isoformat() if watermark else None,
+                'period_end': window_end.isoformat(),
+                'new_applications': row_count,
+                'incremental': incremental
+            }
+        
+        return portfolio, (finalized(), aggregates)
+    
+    def _full_portfolio_rows(self, portfolio: PortfolioAggregates, filters: Dict[str, Any],
+                             watermark: datetime, window_end: datetime) -> Iterator[Dict]:
+        """Rebuild the aggregates over the whole selection, yielding rows only for the window"""
+        def window():
+            for data in self._scored_pairs(filters, None, window_end):
+                portfolio.add(data['application'], data['score'])
+                if not watermark or data['score'].calculated_at > watermark:
+                    yield data
+        
+        return self._portfolio_rows(window())
+    
+    def _portfolio_rows(self, applications_data) -> Iterator[Dict]:
+        for data in self.generator.fragments.iter_with_fragments(
+            applications_data, 'portfolio_summary', batch_size=self.batch_size
+        ):
+            yield self.generator._fragment_row(data, 'portfolio_summary')
+    
+    def _scored_pairs(self, filters: Dict[str, Any], start: datetime, end: datetime) -> Iterator[Dict]:
+        """
+        {'application', 'score', 'previous_score'} for selected applications.
+        `score` is the latest score calculated by `end`; with `start`, only
+        applications scored after it are returned and `previous_score` is
+        the one already folded into the stored state.
+        """
+        from apps.credit_scoring.models import CreditApplication, CreditScore
+        
+        if start:
+            # Applications scored in the window, in order of their first new score
+            application_ids = list(dict.fromkeys(
+                doc['application'] for doc in CreditScore.objects(
+                    calculated_at__gt=start, calculated_at__lte=end
+                ).only('application').order_by('calculated_at').as_pymongo()
+            ))
+            batches = (
+                CreditApplication.objects(
+                    id__in=application_ids[i:i + self.batch_size], **build_application_filters(filters)
+                ).no_cache()
+                for i in range(0, len(application_ids), self.batch_size)
+            )
+        else:
+            batches = self._application_batches(
+                CreditApplication.objects(**build_application_filters(filters)).order_by('created_at').no_cache()
+            )
+        
+        for batch in batches:
+            applications = {application.id: application for application in batch}
+            if not applications:
+                continue
+            
+            latest = {}
+            previous = {}
+            scores = CreditScore.objects(
+                application__in=list(applications.keys()), calculated_at__lte=end
+            ).order_by('calculated_at').no_dereference().no_cache()
+            for score in scores:
+                application_id = score.application.id
+                if start and score.calculated_at <= start:
+                    previous[application_id] = score
+                latest[application_id] = score
+            
+            for application_id, application in applications.items():
+                score = latest.get(application_id)
+                if not score:
+                    continue
+                score.application = application
+                yield {'application': application, 'score': score, 'previous_score': previous.get(application_id)}
+    
+    def _application_batches(self, queryset) -> Iterator[List]:
+        batch = []
+        for application in queryset.batch_size(self.batch_size):
+            batch.append(application)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
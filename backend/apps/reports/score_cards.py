@@ -0,0 +1,340 @@
+import html
+import io
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Iterable, Tuple
+import logging
+
+from django.conf import settings
+
+from .streaming import StreamingStory, iter_applications_data
+
+logger = logging.getLogger(__name__)
+
+GRADE_COLOURS = {
+    'A': '#d4edda',
+    'B': '#cce7ff',
+    'C': '#fff3cd',
+    'R': '#f8d7da'
+}
+
+COMPONENT_LABELS = [
+    ('data_points', 'Data Points', '30%'),
+    ('credit_ratios', 'Credit Ratios', '20%'),
+    ('borrower_attributes', 'Borrower Attributes', '48%')
+]
+
+# Cards per pool task: large enough to amortise pickling, small enough to keep the ZIP streaming
+CARDS_PER_TASK = 25
+
+_card_styles = None
+
+def card_styles() -> Dict[str, Any]:
+    """
+    Paragraph and table styles for score cards, built once per process.
+    Pool workers keep them (and reportlab's font metrics) for every card
+    they render instead of rebuilding the stylesheet per document.
+    """
+    global _card_styles
+    if _card_styles is not None:
+        return _card_styles
+    
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+        from reportlab.platypus import TableStyle
+    except ImportError:
+        logger.error("reportlab not installed - cannot generate score cards")
+        raise Exception("PDF generation not available")
+    
+    sample = getSampleStyleSheet()
+    grid = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f2f2f2')),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP')
+    ]
+    
+    _card_styles = {
+        'title': sample['Title'],
+        'subtitle': ParagraphStyle('CardSubtitle', parent=sample['Heading2'], spaceAfter=2),
+        'meta': ParagraphStyle('CardMeta', parent=sample['Normal'], fontSize=8, textColor=colors.grey),
+        'heading': ParagraphStyle('CardHeading', parent=sample['Heading3'], spaceBefore=10),
+        'body': ParagraphStyle('CardBody', parent=sample['Normal'], fontSize=8, leading=10),
+        'grid': TableStyle(grid),
+        # One headline style per grade, coloured like the HTML report rows
+        'headline': {
+            grade: TableStyle(grid + [
+                ('FONTSIZE', (0, 1), (-1, 1), 14),
+                ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor(colour))
+            ])
+            for grade, colour in list(GRADE_COLOURS.items()) + [('', '#ffffff')]
+        }
+    }
+    return _card_styles
+
+def _format_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+def _escape(value) -> str:
+    return html.escape(_format_value(value))
+
+def card_title(row: Dict[str, Any]) -> str:
+    return f"{row['application_id']} - {row['borrower_name']}"
+
+def build_card_flowables(row: Dict[str, Any], generated_at: str) -> List:
+    """Flowables of one score card, from a score_breakdown report row"""
+    from reportlab.platypus import Paragraph, Spacer, Table
+    
+    styles = card_styles()
+    details = row['score_details']
+    components = details['component_scores']
+    risk = row['risk_assessment']
+    
+    story = [
+        Paragraph('Credit Score Card', styles['title']),
+        Paragraph(f"{_escape(row['borrower_name'])} - {_escape(row['business_name'])}", styles['subtitle']),
+        Paragraph(
+            f"Application {_escape(row['application_id'])} | {_escape(row.get('business_type'))} | "
+            f"Generated on: {_escape(generated_at)}",
+            styles['meta']
+        ),
+        Spacer(1, 12),
+        Table([
+            ['Final Score', 'Grade', 'Risk Level', 'Default Probability'],
+            [
+                _format_value(details['final_score']), details['grade'], risk['level'],
+                f"{float(details['default_probability'] or 0):.2%}"
+            ]
+        ], style=styles['headline'].get(details['grade'], styles['headline']['']), hAlign='LEFT'),
+        Spacer(1, 8),
+        Table([
+            ['Requested Amount', 'Max Loan Amount', 'Loan Slab Adjustment'],
+            [
+                _format_value(row.get('loan_amount_requested')), _format_value(details['max_loan_amount']),
+                _format_value(details.get('loan_slab_adjustment'))
+            ]
+        ], style=styles['grid'], hAlign='LEFT'),
+        Paragraph('Score Components', styles['heading']),
+        Table([['Component', 'Weight', 'Score', 'Weighted Points']] + [
+            [label, weight, _format_value(components[key]['score']), _format_value(components[key]['percentage'])]
+            for key, label, weight in COMPONENT_LABELS
+        ], style=styles['grid'], hAlign='LEFT')
+    ]
+    
+    ratios = components['credit_ratios'].get('ratios') or []
+    if ratios:
+        story.append(Paragraph('Credit Ratios', styles['heading']))
+        story.append(Table([['Ratio', 'Value', 'Band', 'Score', 'Threshold Met']] + [
+            [ratio['name'], _format_value(ratio['value']), ratio['band'], _format_value(ratio['score']),
+             'Yes' if ratio['threshold_met'] else 'No']
+            for ratio in ratios
+        ], style=styles['grid'], hAlign='LEFT'))
+    
+    psychometric = components.get('psychometric')
+    if psychometric:
+        story.append(Paragraph('Psychometric Assessment', styles['heading']))
+        story.append(Paragraph(
+            f"Total score {_escape(psychometric['total_score'])}, "
+            f"adjustment {_escape(psychometric['adjustment_points'])} points",
+            styles['body']
+        ))
+    
+    if risk['red_flags']:
+        story.append(Paragraph('Red Flags', styles['heading']))
+        story.append(Table([['Flag', 'Type', 'Severity', 'Description']] + [
+            [
+                Paragraph(_escape(flag['name']), styles['body']), flag['type'], _format_value(flag['severity']),
+                Paragraph(_escape(flag['description']), styles['body'])
+            ]
+            for flag in risk['red_flags']
+        ], colWidths=[110, 40, 50, 260], style=styles['grid'], hAlign='LEFT'))
+    
+    if row.get('recommendations'):
+        story.append(Paragraph('Recommendations', styles['heading']))
+        for recommendation in row['recommendations']:
+            story.append(Paragraph(f"&bull; {_escape(recommendation)}", styles['body']))
+    
+    return story
+
+def render_score_card(row: Dict[str, Any], generated_at: str) -> bytes:
+    """One single-application score card PDF"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Score Card {card_title(row)}")
+    doc.build(build_card_flowables(row, generated_at))
+    return buffer.getvalue()
+
+def render_score_card_chunk(rows: List[Dict[str, Any]], generated_at: str) -> List[Tuple[str, bytes]]:
+    """(application_id, pdf bytes) for a chunk of rows. Module level so it can run in a pool worker"""
+    return [(row['application_id'], render_score_card(row, generated_at)) for row in rows]
+
+def _card_bookmark(key: str, title: str):
+    """Zero-size flowable adding an outline entry for the page it lands on"""
+    from reportlab.platypus import Flowable
+    
+    class CardBookmark(Flowable):
+        def wrap(self, available_width, available_height):
+            return 0, 0
+        
+        def draw(self):
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(title, key, level=0)
+            self.canv.showOutline()
+    
+    return CardBookmark()
+
+class _ZipStream:
+    """Write-only, unseekable sink for zipfile; the bytes written so far are drained by the caller"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+class ScoreCardBatchService:
+    """
+    Bulk per-application score cards. Rows come from the report fragments
+    (the score_breakdown row of each application's latest score), cards
+    are rendered CARDS_PER_TASK at a time in a process pool, and the
+    result is either a ZIP streamed while cards complete or one merged
+    PDF with a bookmark per card.
+    `stats` passed to the output methods is filled with card count,
+    seconds and cards_per_second once the output is finished.
+    """
+    
+    def __init__(self, generator=None, batch_size: int = 500, workers: int = None):
+        if generator is None:
+            from .report_generator import ReportGenerator
+            generator = ReportGenerator(batch_size=batch_size)
+        self.generator = generator
+        self.batch_size = batch_size
+        self.workers = settings.REPORT_RENDER_WORKERS if workers is None else workers
+    
+    def iter_rows(self, application_ids: List[str] = None, filters: Dict[str, Any] = None) -> Iterator[Dict]:
+        """score_breakdown rows of the selection, one per application"""
+        applications_data = self.generator.fragments.iter_with_fragments(
+            iter_applications_data(application_ids, filters, batch_size=self.batch_size),
+            'score_breakdown',
+            batch_size=self.batch_size
+        )
+        for data in applications_data:
+            yield self.generator._fragment_row(data, 'score_breakdown')
+    
+    def iter_cards(self, rows: Iterable[Dict], generated_at: str = None) -> Iterator[Tuple[str, bytes]]:
+        """(application_id, pdf bytes) in selection order, rendered in the pool"""
+        generated_at = generated_at or datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
+        chunks = self._chunks(rows)
+        
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield from render_score_card_chunk(chunk, generated_at)
+            return
+        
+        executor_class = ProcessPoolExecutor if settings.REPORT_RENDER_EXECUTOR == 'process' else ThreadPoolExecutor
+        with executor_class(max_workers=self.workers) as executor:
+            # Bounded number of chunks in flight keeps memory flat for any selection size
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(render_score_card_chunk, chunk, generated_at))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    def stream_zip(self, rows: Iterable[Dict], stats: Dict[str, Any] = None) -> Iterator[bytes]:
+        """
+        ZIP archive bytes, yielded as each card is added. Entries are stored
+        uncompressed: reportlab already compresses page streams.
+        """
+        stats = stats if stats is not None else {}
+        started = time.perf_counter()
+        sink = _ZipStream()
+        names = set()
+        
+        with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            for application_id, pdf in self.iter_cards(rows):
+                name = self._entry_name(application_id, names)
+                archive.writestr(name, pdf)
+                yield sink.drain()
+        
+        yield sink.drain()
+        self._finish_stats(stats, len(names), started)
+    
+    def write_merged_pdf(self, rows: Iterable[Dict], file_path: str, stats: Dict[str, Any] = None) -> int:
+        """
+        All cards in one PDF, each starting on a new page with an outline
+        bookmark. A single document cannot be split across workers (and
+        pypdf is not a dependency), so this renders in-process; it skips
+        the per-document setup that dominates small cards.
+        """
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import PageBreak, SimpleDocTemplate
+        
+        stats = stats if stats is not None else {}
+        started = time.perf_counter()
+        generated_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
+        counter = {'cards': 0}
+        
+        def flowables():
+            for row in rows:
+                if counter['cards']:
+                    yield PageBreak()
+                counter['cards'] += 1
+                yield _card_bookmark(f"card-{counter['cards']}", card_title(row))
+                yield from build_card_flowables(row, generated_at)
+        
+        doc = SimpleDocTemplate(file_path, pagesize=A4, title='Credit Score Cards')
+        doc.build(StreamingStory(flowables()))
+        
+        self._finish_stats(stats, counter['cards'], started)
+        return counter['cards']
+    
+    def _chunks(self, rows: Iterable[Dict]) -> Iterator[List[Dict]]:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CARDS_PER_TASK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _entry_name(self, application_id: str, names: set) -> str:
+        base = os.path.basename(str(application_id)) or 'card'
+        name = f"{base}.pdf"
+        suffix = 1
+        while name in names:
+            suffix += 1
+            name = f"{base}-{suffix}.pdf"
+        names.add(name)
+        return name
+    
+    def _finish_stats(self, stats: Dict[str, Any], cards: int, started: float) -> None:
+        seconds = time.perf_counter() - started
+        stats.update({
+            'cards': cards,
+            'seconds': round(seconds, 4),
+            'cards_per_second': round(cards / seconds, 2) if seconds > 0 else 0.0
+        })
+        logger.info(f"Rendered {cards} score cards in {seconds:.2f}s ({stats['cards_per_second']} cards/s)")
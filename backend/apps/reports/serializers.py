@@ -7,16 +7,62 @@ class ReportGenerationRequestSerializer(serializers.Serializer):
     )
     application_ids = serializers.ListField(
         child=serializers.CharField(),
-        min_length=1,
+        required=False,
         max_length=100
     )
+    # Select applications by filter instead of by id (e.g. a whole portfolio)
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    business_type = serializers.CharField(required=False)
     format = serializers.ChoiceField(
         choices=['pdf', 'excel', 'html', 'json'],
         default='pdf'
     )
+    # Render several formats from one data pass; overrides format when given
+    formats = serializers.ListField(
+        child=serializers.ChoiceField(choices=['pdf', 'excel', 'html', 'json']),
+        required=False,
+        min_length=1,
+        max_length=4
+    )
     include_charts = serializers.BooleanField(default=True)
     include_recommendations = serializers.BooleanField(default=True)
     template_id = serializers.CharField(required=False, allow_blank=True)
+    # Comparative analysis: compare against the selection or the whole scored portfolio
+    peer_scope = serializers.ChoiceField(choices=['selection', 'portfolio'], default='selection')
+    # Opt-in profile capture, stored next to the report (see apps.reports.tracing)
+    profile = serializers.ChoiceField(choices=['cprofile', 'pyinstrument'], required=False)
+    
+    def validate(self, data):
+        """Require either application ids or at least one selection filter"""
+        filters = [data.get('date_from'), data.get('date_to'), data.get('business_type')]
+        if not data.get('application_ids') and not any(filters):
+            raise serializers.ValidationError(
+                "Provide application_ids or a date_from/date_to/business_type filter"
+            )
+        return data
+
+class ScoreCardBatchRequestSerializer(serializers.Serializer):
+    """Serializer for bulk score card requests"""
+    application_ids = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        max_length=10000
+    )
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    business_type = serializers.CharField(required=False)
+    # zip: one PDF per application; pdf: one merged PDF with a bookmark per card
+    output = serializers.ChoiceField(choices=['zip', 'pdf'], default='zip')
+    
+    def validate(self, data):
+        """Require either application ids or at least one selection filter"""
+        filters = [data.get('date_from'), data.get('date_to'), data.get('business_type')]
+        if not data.get('application_ids') and not any(filters):
+            raise serializers.ValidationError(
+                "Provide application_ids or a date_from/date_to/business_type filter"
+            )
+        return data
 
 class ScoreBreakdownReportSerializer(serializers.Serializer):
     """Serializer for score breakdown report data"""
@@ -44,3 +90,43 @@ class ReportListSerializer(serializers.Serializer):
     expires_at = serializers.DateTimeField()
     file_size = serializers.IntegerField()
     download_url = serializers.CharField()
+
+class ReportScheduleSerializer(serializers.Serializer):
+    """Serializer for creating recurring report schedules"""
+    name = serializers.CharField(max_length=100)
+    report_type = serializers.ChoiceField(
+        choices=['score_breakdown', 'risk_assessment', 'comparative_analysis', 'portfolio_summary']
+    )
+    formats = serializers.ListField(
+        child=serializers.ChoiceField(choices=['pdf', 'excel', 'html', 'json']),
+        min_length=1,
+        max_length=4,
+        default=['pdf']
+    )
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    business_type = serializers.CharField(required=False)
+    template_id = serializers.CharField(required=False, allow_blank=True)
+    
+    # Crontab fields, e.g. minute=0 hour=8 day_of_week=mon for Monday 08:00
+    minute = serializers.CharField(default='0')
+    hour = serializers.CharField(default='8')
+    day_of_week = serializers.CharField(default='mon')
+    day_of_month = serializers.CharField(default='*')
+    month_of_year = serializers.CharField(default='*')
+    
+    def validate(self, data):
+        """Reject crontab expressions celery cannot parse"""
+        from celery.schedules import crontab
+        
+        try:
+            crontab(
+                minute=data['minute'],
+                hour=data['hour'],
+                day_of_week=data['day_of_week'],
+                day_of_month=data['day_of_month'],
+                month_of_year=data['month_of_year']
+            )
+        except Exception as e:
+            raise serializers.ValidationError(f"Invalid schedule: {str(e)}")
+        return data
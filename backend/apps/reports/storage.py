@@ -0,0 +1,183 @@
+import gzip
+import os
+import shutil
+from typing import List, Iterator, BinaryIO
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Formats that are already compressed containers gain nothing from gzip/zstd
+COMPRESSIBLE_EXTENSIONS = ['jsonl', 'html', 'json', 'txt', 'csv']
+
+# Content-Encoding -> storage key suffix, in server preference order
+ENCODING_SUFFIXES = {
+    'zstd': '.zst',
+    'gzip': '.gz'
+}
+
+class ReportStorage:
+    """
+    Where rendered report files live. Keys are relative names such as
+    "artifacts/<hash>.pdf"; precompressed variants use the same key plus
+    an encoding suffix.
+    """
+    
+    def save(self, local_path: str, key: str) -> str:
+        """Move a locally rendered file into storage under key"""
+        raise NotImplementedError
+    
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+    
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+    
+    def open(self, key: str) -> BinaryIO:
+        """File-like object for the whole file"""
+        raise NotImplementedError
+    
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive) of the stored file"""
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+    
+    def delete_with_variants(self, key: str, encodings: List[str] = None) -> None:
+        self.delete(key)
+        for encoding in encodings or []:
+            self.delete(key + ENCODING_SUFFIXES[encoding])
+
+class LocalReportStorage(ReportStorage):
+    """Files under MEDIA_ROOT/reports (absolute keys from older records also work)"""
+    
+    def __init__(self, root: str = None):
+        self.root = root or os.path.join(settings.MEDIA_ROOT, 'reports')
+    
+    def path(self, key: str) -> str:
+        # os.path.join ignores root for absolute keys written before storage keys existed
+        return os.path.join(self.root, key)
+    
+    def save(self, local_path: str, key: str) -> str:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Atomic rename, so concurrent writers of the same key never expose a partial file
+        os.replace(local_path, target)
+        return key
+    
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+    
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+    
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), 'rb')
+    
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        with open(self.path(key), 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+class S3ReportStorage(ReportStorage):
+    """S3-compatible object storage (AWS S3, or MinIO via REPORT_STORAGE_ENDPOINT_URL)"""
+    
+    def __init__(self, bucket: str = None, prefix: str = 'reports/'):
+        try:
+            import boto3
+        except ImportError:
+            logger.error("boto3 not installed - S3 report storage unavailable")
+            raise Exception("S3 report storage not available")
+        
+        self.bucket = bucket or settings.REPORT_STORAGE_BUCKET
+        self.prefix = prefix
+        self.client = boto3.client(
+            's3',
+            endpoint_url=settings.REPORT_STORAGE_ENDPOINT_URL or None,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
+            region_name=settings.AWS_S3_REGION_NAME
+        )
+    
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key.lstrip('/')
+    
+    def save(self, local_path: str, key: str) -> str:
+        self.client.upload_file(local_path, self.bucket, self._object_key(key))
+        os.remove(local_path)
+        return key
+    
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError:
+            return False
+    
+    def size(self, key: str) -> int:
+        head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        return head['ContentLength']
+    
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+    
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Range=f"bytes={start}-{end}"
+        )
+        yield from response['Body'].iter_chunks(chunk_size)
+    
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+def get_report_storage() -> ReportStorage:
+    """Storage backend selected by settings.REPORT_STORAGE_BACKEND"""
+    if settings.REPORT_STORAGE_BACKEND == 's3':
+        return S3ReportStorage()
+    return LocalReportStorage()
+
+def write_compressed_variants(local_path: str) -> List[str]:
+    """
+    Write .gz (and .zst when zstandard is installed) next to a rendered
+    file. Returns the content encodings that were produced.
+    """
+    extension = os.path.splitext(local_path)[1].lstrip('.').lower()
+    if extension not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    
+    encodings = []
+    
+    with open(local_path, 'rb') as source, gzip.open(local_path + '.gz', 'wb', compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    encodings.append('gzip')
+    
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+    
+    if zstandard:
+        compressor = zstandard.ZstdCompressor(level=10)
+        with open(local_path, 'rb') as source, open(local_path + '.zst', 'wb') as target:
+            compressor.copy_stream(source, target)
+        encodings.append('zstd')
+    
+    return encodings
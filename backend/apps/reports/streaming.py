@@ -0,0 +1,303 @@
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RunningStats:
+    """Single-pass count/sum/min/max/mean/std (Welford) for report aggregates"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+        self._m2 = 0.0
+    
+    def add(self, value: float) -> None:
+        value = float(value)
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+    
+    def remove(self, value: float, keep_extremes: bool = True) -> bool:
+        """
+        Take a previously added value back out. Returns False when the value
+        was the current min or max, which cannot be restored without the
+        other values; the stats must then be rebuilt from scratch. With
+        keep_extremes=False min/max are left as (possibly stale) bounds.
+        """
+        value = float(value)
+        if self.count <= 1:
+            return False
+        if keep_extremes and (value <= self.min or value >= self.max):
+            return False
+        self.count -= 1
+        self.total -= value
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self._m2 -= delta * (value - self.mean)
+        return True
+    
+    @property
+    def std_dev(self) -> float:
+        """Population standard deviation"""
+        if self.count < 2:
+            return 0
+        return (self._m2 / self.count) ** 0.5
+    
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'count': self.count, 'total': self.total, 'mean': self.mean,
+            'min': self.min, 'max': self.max, 'm2': self._m2
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RunningStats':
+        stats = cls()
+        if state:
+            stats.count = state['count']
+            stats.total = state['total']
+            stats.mean = state['mean']
+            stats.min = state['min']
+            stats.max = state['max']
+            stats._m2 = state['m2']
+        return stats
+
+def count_into(counts: Dict[str, int], key, amount: int = 1) -> None:
+    counts[key] = counts.get(key, 0) + amount
+    if not counts[key]:
+        del counts[key]
+
+class PortfolioAggregates:
+    """
+    Running portfolio metrics and monthly trends. The state is plain
+    data, so scheduled reports can store it and later fold in only the
+    applications scored since their previous run.
+    """
+    
+    STATS = ['scores', 'requested', 'approved_amounts', 'default_probability']
+    
+    def __init__(self, state: Dict[str, Any] = None):
+        state = state or {}
+        for name in self.STATS:
+            setattr(self, name, RunningStats.from_state(state.get(name)))
+        self.grade_distribution = dict(state.get('grade_distribution', {}))
+        self.risk_distribution = dict(state.get('risk_distribution', {}))
+        self.business_types = dict(state.get('business_type_distribution', {}))
+        self.monthly = {month: dict(values) for month, values in state.get('monthly', {}).items()}
+    
+    def add(self, application, score) -> None:
+        self.scores.add(score.total_points)
+        self.requested.add(application.loan_amount_requested or 0)
+        self.approved_amounts.add(score.max_loan_amount)
+        self.default_probability.add(score.default_probability)
+        self._count(application, score, 1)
+    
+    def remove(self, application, score) -> bool:
+        """Undo add() for a superseded score; False means a full rebuild is needed"""
+        # Only the score range is reported, the other stats never expose min/max
+        if not self.scores.remove(score.total_points):
+            return False
+        self.requested.remove(application.loan_amount_requested or 0, keep_extremes=False)
+        self.approved_amounts.remove(score.max_loan_amount, keep_extremes=False)
+        self.default_probability.remove(score.default_probability, keep_extremes=False)
+        self._count(application, score, -1)
+        return True
+    
+    def _count(self, application, score, amount: int) -> None:
+        count_into(self.grade_distribution, score.grade, amount)
+        count_into(self.risk_distribution, score.risk_level, amount)
+        count_into(self.business_types, application.business_data.business_type, amount)
+        
+        month_key = application.created_at.strftime('%Y-%m')
+        month = self.monthly.setdefault(month_key, {'applications': 0, 'score_sum': 0.0, 'approved': 0})
+        month['applications'] += amount
+        month['score_sum'] += amount * float(score.total_points)
+        month['approved'] += amount if score.grade != 'R' else 0
+        if not month['applications']:
+            del self.monthly[month_key]
+    
+    def to_state(self) -> Dict[str, Any]:
+        state = {name: getattr(self, name).to_state() for name in self.STATS}
+        state.update({
+            'grade_distribution': self.grade_distribution,
+            'risk_distribution': self.risk_distribution,
+            'business_type_distribution': self.business_types,
+            'monthly': self.monthly
+        })
+        return state
+    
+    def summary(self) -> Dict[str, Any]:
+        """portfolio_overview and trends, or nothing for an empty portfolio"""
+        if not self.scores.count:
+            return {}
+        
+        total = self.scores.count
+        grade_dist = self.grade_distribution
+        risk_dist = self.risk_distribution
+        requested = self.requested
+        approved_amounts = self.approved_amounts
+        
+        return {
+            'portfolio_overview': {
+                'total_applications': total,
+                'average_score': self.scores.mean,
+                'score_range': {
+                    'min': self.scores.min,
+                    'max': self.scores.max,
+                    'std_dev': self.scores.std_dev
+                },
+                'grade_distribution': grade_dist,
+                'risk_distribution': risk_dist,
+                'business_type_distribution': self.business_types,
+                'loan_amounts': {
+                    'total_requested': requested.total,
+                    'total_approved': approved_amounts.total,
+                    'average_requested': requested.mean,
+                    'average_approved': approved_amounts.mean,
+                    'approval_ratio': approved_amounts.total / requested.total if requested.total > 0 else 0
+                },
+                'quality_metrics': {
+                    'approval_rate': sum(grade_dist.get(g, 0) for g in ['A', 'B', 'C']) / total * 100,
+                    'high_grade_rate': sum(grade_dist.get(g, 0) for g in ['A', 'B']) / total * 100,
+                    'low_risk_rate': risk_dist.get('low', 0) / total * 100,
+                    'average_default_probability': self.default_probability.mean * 100
+                }
+            },
+            'trends': [
+                {
+                    'month': month,
+                    'applications': values['applications'],
+                    'average_score': values['score_sum'] / values['applications'],
+                    'approval_rate': values['approved'] / values['applications'] * 100
+                }
+                for month, values in sorted(self.monthly.items())
+            ]
+        }
+
+def iter_applications_data(application_ids: List[str] = None, filters: Dict[str, Any] = None,
+                           batch_size: int = 500) -> Iterator[Dict]:
+    """
+    Yield {'application', 'score'} pairs in batches of batch_size.
+    Applications come either from an explicit id list (request order kept)
+    or from selection filters; only one batch is held in memory at a time.
+    Each application is paired with its most recent score.
+    """
+    from apps.credit_scoring.models import CreditApplication
+    
+    if application_ids:
+        for start in range(0, len(application_ids), batch_size):
+            chunk = application_ids[start:start + batch_size]
+            applications = {
+                app.application_id: app
+                for app in CreditApplication.objects(application_id__in=chunk).no_cache()
+            }
+            
+            for app_id in chunk:
+                if app_id not in applications:
+                    logger.warning(f"Application {app_id} not found")
+            
+            yield from _pair_with_scores(
+                [applications[app_id] for app_id in chunk if app_id in applications]
+            )
+        return
+    
+    queryset = CreditApplication.objects(**build_application_filters(filters or {}))
+    batch = []
+    for application in queryset.order_by('created_at').no_cache().batch_size(batch_size):
+        batch.append(application)
+        if len(batch) >= batch_size:
+            yield from _pair_with_scores(batch)
+            batch = []
+    
+    if batch:
+        yield from _pair_with_scores(batch)
+
+def _pair_with_scores(applications: List) -> Iterator[Dict]:
+    """Fetch the latest score for every application of a batch in one query"""
+    from apps.credit_scoring.models import CreditScore
+    
+    if not applications:
+        return
+    
+    latest_scores = {}
+    scores = CreditScore.objects(
+        application__in=[app.id for app in applications]
+    ).order_by('calculated_at').no_dereference().no_cache()
+    
+    for score in scores:
+        # Ordered by calculated_at, so the most recent score wins
+        latest_scores[score.application.id] = score
+    
+    for application in applications:
+        score = latest_scores.get(application.id)
+        if not score:
+            logger.warning(f"Score not found for application {application.application_id}")
+            continue
+        
+        score.application = application
+        yield {'application': application, 'score': score}
+
+def build_application_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate report selection filters into CreditApplication query kwargs"""
+    query = {}
+    if filters.get('date_from'):
+        query['created_at__gte'] = _as_datetime(filters['date_from'])
+    if filters.get('date_to'):
+        query['created_at__lte'] = _as_datetime(filters['date_to'])
+    if filters.get('business_type'):
+        query['business_data__business_type'] = filters['business_type']
+    if filters.get('status'):
+        query['status'] = filters['status']
+    return query
+
+def _as_datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+class StreamingStory(list):
+    """
+    Flowable list for reportlab that is filled lazily from a generator.
+    BaseDocTemplate.build consumes flowables from the front and checks
+    len() before each one, so topping the buffer up there keeps only a
+    handful of flowables alive instead of the whole document.
+    """
+    
+    LOW_WATER_MARK = 8
+    
+    def __init__(self, flowables: Iterator):
+        super().__init__()
+        self._source = iter(flowables)
+        self._exhausted = False
+    
+    def __len__(self):
+        while not self._exhausted and super().__len__() < self.LOW_WATER_MARK:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+        return super().__len__()
+
+def flatten_summary(data: Any, prefix: str = '') -> List[tuple]:
+    """Flatten nested summary dicts/lists into (label, value) pairs for tabular output"""
+    items = []
+    
+    if isinstance(data, dict):
+        for key, value in data.items():
+            label = f"{prefix}.{key}" if prefix else str(key)
+            items.extend(flatten_summary(value, label))
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            key = value.get('month', index) if isinstance(value, dict) else index
+            items.extend(flatten_summary(value, f"{prefix}[{key}]"))
+    else:
+        items.append((prefix.replace('_', ' '), data))
+    
+    return items
@@ -0,0 +1,65 @@
+from datetime import datetime
+import logging
+
+from celery import shared_task
+
+from .artifact_cache import ReportArtifactCache
+from .models import ReportSchedule
+from .peer_comparison import PeerScoreIndexService
+from .scheduling import ReportScheduleService
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def evict_report_artifacts():
+    """Trim the shared report artifact cache by age and total size"""
+    try:
+        return ReportArtifactCache().evict()
+    except Exception as e:
+        logger.error(f"Report artifact eviction failed: {str(e)}")
+        raise
+
+@shared_task
+def rebuild_peer_score_index():
+    """Refresh the portfolio-wide sorted peer score index used by comparative reports"""
+    try:
+        return PeerScoreIndexService().rebuild()
+    except Exception as e:
+        logger.error(f"Peer score index rebuild failed: {str(e)}")
+        raise
+
+@shared_task
+def run_due_report_schedules():
+    """Dispatch every report schedule whose next run time has passed"""
+    try:
+        claimed = ReportScheduleService().claim_due()
+        for schedule_id in claimed:
+            run_report_schedule.delay(schedule_id)
+        return {'dispatched': len(claimed)}
+    except Exception as e:
+        logger.error(f"Report schedule dispatch failed: {str(e)}")
+        raise
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def run_report_schedule(self, schedule_id):
+    """
+    Generate one scheduled report. claim_due has already moved the
+    schedule to its next slot, so a failed run is retried here (every
+    5 minutes, 3 times) rather than waiting for that slot; the error is
+    kept on the schedule as last_error until a run succeeds.
+    """
+    try:
+        schedule = ReportSchedule.objects(id=schedule_id, is_active=True).first()
+        if not schedule:
+            logger.warning(f"Report schedule {schedule_id} not found or inactive")
+            return None
+        
+        result = ReportScheduleService().run(schedule)
+        return {'report_id': result['report_id'], 'row_count': result['row_count']}
+    except Exception as e:
+        logger.error(f"Scheduled report {schedule_id} failed: {str(e)}")
+        ReportSchedule.objects(id=schedule_id).update_one(
+            set__last_error=str(e),
+            set__updated_at=datetime.utcnow()
+        )
+        raise self.retry(exc=e)
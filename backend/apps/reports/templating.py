@@ -0,0 +1,139 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterator, Callable, TextIO
+import logging
+
+from django.template import Context, Engine
+
+logger = logging.getLogger(__name__)
+
+# The default HTML layout, shared by HtmlReportWriter's plain-string fast
+# path and DEFAULT_HTML_TEMPLATE below. Slots are str.format fields; the
+# writer fills them with escaped values, the template with template tags.
+HTML_STYLE = """    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .header { text-align: center; margin-bottom: 30px; }
+        .summary { background-color: #f5f5f5; padding: 15px; margin: 20px 0; }
+        table { border-collapse: collapse; width: 100%; margin: 20px 0; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f2f2f2; }
+        .grade-a { background-color: #d4edda; }
+        .grade-b { background-color: #cce7ff; }
+        .grade-c { background-color: #fff3cd; }
+        .grade-r { background-color: #f8d7da; }
+    </style>
+"""
+
+HTML_HEADER_LAYOUT = """<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+{style}</head>
+<body>
+    <div class="header">
+        <h1>{title}</h1>
+        <p>Generated on: {generated_at}</p>
+    </div>
+    <h2>Application Details</h2>
+    <table>
+        <tr>{column_cells}</tr>
+"""
+HTML_COLUMN_CELL = '<th>{}</th>'
+HTML_ROW_LAYOUT = '        <tr class="grade-{grade}">{cells}</tr>\n'
+HTML_CELL = '<td>{}</td>'
+HTML_FOOTER_LAYOUT = """    </table>
+    <div class="summary">
+        <h2>Summary</h2>
+        <p><strong>Total Applications:</strong> {total_applications}</p>
+{summary_items}    </div>
+</body>
+</html>
+"""
+HTML_SUMMARY_ITEM = '        <p><strong>{label}:</strong> {value}</p>\n'
+
+# A ReportTemplate's template_config['html'] overrides any of these parts;
+# "rows" is rendered once per chunk of rows rather than once per row.
+DEFAULT_HTML_TEMPLATE = {
+    'header': HTML_HEADER_LAYOUT.format(
+        title='{{ title }}',
+        generated_at='{{ generated_at }}',
+        style=HTML_STYLE,
+        column_cells='{% for column in columns %}' + HTML_COLUMN_CELL.format('{{ column }}') + '{% endfor %}'
+    ),
+    'rows': '{% for row in rows %}' + HTML_ROW_LAYOUT.format(
+        grade='{{ row.grade }}',
+        cells='{% for cell in row.cells %}' + HTML_CELL.format('{{ cell }}') + '{% endfor %}'
+    ) + '{% endfor %}',
+    'footer': HTML_FOOTER_LAYOUT.format(
+        total_applications='{{ total_applications }}',
+        summary_items='{% for label, value in summary_items %}'
+                      + HTML_SUMMARY_ITEM.format(label='{{ label }}', value='{{ value }}') + '{% endfor %}'
+    ),
+    'chunk_size': 500
+}
+
+class CompiledHtmlTemplate:
+    """Header/rows/footer templates compiled once and rendered chunk by chunk"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        engine = Engine(autoescape=True)
+        self.header = engine.from_string(config['header'])
+        self.rows = engine.from_string(config['rows'])
+        self.footer = engine.from_string(config['footer'])
+        self.chunk_size = int(config.get('chunk_size') or DEFAULT_HTML_TEMPLATE['chunk_size'])
+    
+    def render_to(self, output: TextIO, header: Dict[str, Any], columns: List[str],
+                  rows: Iterator[Dict[str, Any]], footer: Callable[[int], Dict[str, Any]]) -> int:
+        """
+        Stream the document into output. Each row context carries `cells`
+        (formatted column values), `grade` and the raw row as `data`.
+        `footer` is called with the row count once all rows are consumed,
+        since the summary is only complete at that point.
+        """
+        output.write(self.header.render(Context({**header, 'columns': columns})))
+        
+        row_count = 0
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            row_count += 1
+            if len(chunk) >= self.chunk_size:
+                output.write(self.rows.render(Context({'rows': chunk})))
+                chunk = []
+        
+        if chunk:
+            output.write(self.rows.render(Context({'rows': chunk})))
+        
+        output.write(self.footer.render(Context({
+            **header, **footer(row_count), 'columns': columns, 'total_applications': row_count
+        })))
+        return row_count
+
+# Bounded LRU: one entry per distinct template content, edits add new keys
+_compiled_templates = OrderedDict()
+_compiled_lock = threading.Lock()
+COMPILED_TEMPLATE_CACHE_SIZE = 64
+
+def get_compiled_html_template(template_config: Dict[str, Any] = None) -> CompiledHtmlTemplate:
+    """
+    Compiled template for a ReportTemplate.template_config (or the default).
+    Cached per process by content hash, so an edited template compiles
+    once on first use and unchanged ones are never recompiled; the least
+    recently used entries are dropped past COMPILED_TEMPLATE_CACHE_SIZE.
+    """
+    config = dict(DEFAULT_HTML_TEMPLATE)
+    config.update((template_config or {}).get('html') or {})
+    
+    cache_key = hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+    with _compiled_lock:
+        compiled = _compiled_templates.get(cache_key)
+        if compiled is None:
+            compiled = CompiledHtmlTemplate(config)
+            _compiled_templates[cache_key] = compiled
+            while len(_compiled_templates) > COMPILED_TEMPLATE_CACHE_SIZE:
+                _compiled_templates.popitem(last=False)
+        else:
+            _compiled_templates.move_to_end(cache_key)
+        return compiled
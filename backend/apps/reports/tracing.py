@@ -0,0 +1,104 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterable, Iterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EXTENSIONS = {
+    'cprofile': 'prof',  # pstats dump: python -m pstats, snakeviz
+    'pyinstrument': 'profile.html'
+}
+
+class ReportTrace:
+    """Ordered timing stages of one report generation, stored on GeneratedReport.timing_trace"""
+    
+    def __init__(self):
+        self.stages = []
+        self._started = time.perf_counter()
+    
+    def add(self, stage: str, seconds: float, **details) -> Dict[str, Any]:
+        entry = {'stage': stage, 'seconds': round(seconds, 4), **details}
+        self.stages.append(entry)
+        return entry
+    
+    @contextmanager
+    def stage(self, stage: str, **details):
+        """Time a block; the yielded dict can be filled with rows/bytes inside it"""
+        started = time.perf_counter()
+        entry = dict(details)
+        try:
+            yield entry
+        finally:
+            self.add(stage, time.perf_counter() - started, **entry)
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        return self.stages + [{'stage': 'total', 'seconds': round(time.perf_counter() - self._started, 4)}]
+
+class StageTimer:
+    """
+    Accumulates the time spent producing items of wrapped iterators.
+    Nested wrappers let a single streaming pass be split into stages,
+    e.g. Mongo fetch time inside row assembly time inside spool time.
+    """
+    
+    def __init__(self):
+        self.seconds = 0.0
+        self.items = 0
+    
+    def wrap(self, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.seconds += time.perf_counter() - started
+                return
+            self.seconds += time.perf_counter() - started
+            self.items += 1
+            yield item
+
+class ReportProfiler:
+    """Opt-in profiler around one report generation (cProfile, or pyinstrument when installed)"""
+    
+    def __init__(self, mode: str):
+        if mode not in PROFILE_EXTENSIONS:
+            raise ValueError(f"Unsupported profile mode: {mode}")
+        
+        self.mode = mode
+        self.extension = PROFILE_EXTENSIONS[mode]
+        
+        if mode == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.error("pyinstrument not installed - cannot profile report generation")
+                raise Exception("pyinstrument profiling not available")
+            self._profiler = Profiler()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+    
+    def start(self) -> None:
+        if self.mode == 'pyinstrument':
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+    
+    def stop(self) -> None:
+        if self.mode == 'pyinstrument':
+            if self._profiler.is_running:
+                self._profiler.stop()
+        else:
+            self._profiler.disable()
+    
+    def save(self, local_path: str) -> int:
+        """Write the captured profile and return its size in bytes"""
+        if self.mode == 'pyinstrument':
+            with open(local_path, 'w', encoding='utf-8') as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(local_path)
+        return os.path.getsize(local_path)
@@ -1,13 +1,17 @@
 from django.urls import path
 from .views import (
-    ReportGenerationView, ReportListView, ReportDownloadView,
-    ScoreBreakdownView, RiskAssessmentView
+    ReportGenerationView, ReportListView, ReportDownloadView, ReportProfileView, ScoreCardBatchView,
+    ScoreBreakdownView, RiskAssessmentView, ReportScheduleListView, ReportScheduleDetailView
 )
 
 urlpatterns = [
     path('generate/', ReportGenerationView.as_view(), name='report_generate'),
     path('', ReportListView.as_view(), name='report_list'),
     path('download/<str:report_id>/', ReportDownloadView.as_view(), name='report_download'),
+    path('profile/<str:report_id>/', ReportProfileView.as_view(), name='report_profile'),
+    path('score-cards/', ScoreCardBatchView.as_view(), name='score_cards'),
     path('score-breakdown/<str:application_id>/', ScoreBreakdownView.as_view(), name='score_breakdown'),
     path('risk-assessment/<str:application_id>/', RiskAssessmentView.as_view(), name='risk_assessment'),
+    path('schedules/', ReportScheduleListView.as_view(), name='report_schedules'),
+    path('schedules/<str:schedule_id>/', ReportScheduleDetailView.as_view(), name='report_schedule_detail'),
 ]
\ No newline at end of file
@@ -3,14 +3,21 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from datetime import datetime, timedelta
+import itertools
 import os
 import logging
 
-from .models import GeneratedReport, ReportTemplate
-from .serializers import ReportGenerationRequestSerializer, ReportListSerializer
+from .models import GeneratedReport, ReportSchedule, ReportTemplate
+from .serializers import (
+    ReportGenerationRequestSerializer, ReportListSerializer, ReportScheduleSerializer,
+    ScoreCardBatchRequestSerializer
+)
+from .scheduling import next_run_after
 from .report_generator import ReportGenerator
+from .score_cards import ScoreCardBatchService
+from .storage import ENCODING_SUFFIXES, get_report_storage
 from apps.common.mixins import ResponseMixin, AuditMixin
 from apps.common.permissions import CanViewReports, IsAnalystOrAbove
 from apps.common.utils import paginate_queryset
@@ -42,19 +49,29 @@ class ReportGenerationView(APIView, ResponseMixin, AuditMixin):
             
             # Extract request data
             report_type = serializer.validated_data['report_type']
-            application_ids = serializer.validated_data['application_ids']
             format_type = serializer.validated_data.get('format', 'pdf')
+            formats = serializer.validated_data.get('formats') or [format_type]
             include_charts = serializer.validated_data.get('include_charts', True)
             include_recommendations = serializer.validated_data.get('include_recommendations', True)
+            selection_filters = {
+                key: serializer.validated_data[key]
+                for key in ['date_from', 'date_to', 'business_type']
+                if serializer.validated_data.get(key)
+            }
+            application_ids = serializer.validated_data.get('application_ids', [])
             
             # Generate report
             generator = ReportGenerator()
             result = generator.generate_report(
                 report_type=report_type,
                 application_ids=application_ids,
-                format=format_type,
+                filters=selection_filters,
+                formats=formats,
+                template_id=serializer.validated_data.get('template_id') or None,
                 include_charts=include_charts,
-                include_recommendations=include_recommendations
+                include_recommendations=include_recommendations,
+                peer_scope=serializer.validated_data.get('peer_scope', 'selection'),
+                profile=serializer.validated_data.get('profile')
             )
             
             # Save report record
@@ -63,8 +80,19 @@ class ReportGenerationView(APIView, ResponseMixin, AuditMixin):
                 report_type=result['report_type'],
                 application_ids=application_ids,
                 format=result['format'],
-                report_data=result['report_data'],
+                formats=result['formats'],
+                report_summary=result['report_summary'],
+                selection_filters=selection_filters,
+                template_id=serializer.validated_data.get('template_id') or None,
+                row_count=result['row_count'],
+                cache_key=result['cache_key'],
+                cache_hit=result['cache_hit'],
                 file_path=result['file_path'],
+                content_encodings=result['content_encodings'],
+                artifacts=result['artifacts'],
+                format_timings=result['format_timings'],
+                timing_trace=result['timing_trace'],
+                profile_path=result['profile_path'],
                 download_url=result['download_url'],
                 requested_by=str(user.id),
                 generated_at=result['generated_at'],
@@ -82,8 +110,8 @@ class ReportGenerationView(APIView, ResponseMixin, AuditMixin):
                 resource=result['report_id'],
                 details={
                     'report_type': report_type,
-                    'format': format_type,
-                    'application_count': len(application_ids)
+                    'formats': result['formats'],
+                    'application_count': result['row_count']
                 },
                 request=request
             )
@@ -96,6 +124,19 @@ class ReportGenerationView(APIView, ResponseMixin, AuditMixin):
                     'status': result['status'],
                     'download_url': result['download_url'],
                     'file_size': result['file_size'],
+                    'cache_hit': result['cache_hit'],
+                    'artifacts': [
+                        {
+                            'format': artifact['format'],
+                            'file_size': artifact['file_size'],
+                            'cache_hit': artifact['cache_hit'],
+                            'download_url': artifact['download_url']
+                        }
+                        for artifact in result['artifacts']
+                    ],
+                    'format_timings': result['format_timings'],
+                    'timing_trace': result['timing_trace'],
+                    'profile_url': f"/api/reports/profile/{result['report_id']}/" if result['profile_path'] else None,
                     'expires_at': result['expires_at'].isoformat()
                 },
                 message="Report generated successfully",
@@ -172,7 +213,131 @@ class ReportListView(APIView, ResponseMixin):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class ReportDownloadView(APIView):
+class ReportScheduleListView(APIView, ResponseMixin, AuditMixin):
+    """List and create recurring report schedules"""
+    permission_classes = [IsAuthenticated, IsAnalystOrAbove]
+    
+    def get(self, request):
+        """Active schedules: the user's own, or everyone's for an admin or manager"""
+        try:
+            user_id = request.user.get('user_id')
+            query_params = {'is_active': True}
+            user = User.objects(id=user_id).first()
+            if not user or user.role not in ['admin', 'manager']:
+                query_params['created_by'] = str(user_id)
+            
+            schedules = ReportSchedule.objects(**query_params).order_by('next_run_at')
+            return self.success_response(data=[self._serialize(schedule) for schedule in schedules])
+            
+        except Exception as e:
+            logger.error(f"Error fetching report schedules: {str(e)}")
+            return self.error_response(
+                message="Failed to fetch report schedules",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    def post(self, request):
+        """Create a schedule; the beat task picks it up at its next matching time"""
+        try:
+            serializer = ReportScheduleSerializer(data=request.data)
+            if not serializer.is_valid():
+                return self.validation_error_response(serializer)
+            
+            data = serializer.validated_data
+            user_id = request.user.get('user_id')
+            
+            schedule = ReportSchedule(
+                name=data['name'],
+                report_type=data['report_type'],
+                formats=data['formats'],
+                selection_filters={
+                    key: data[key].isoformat() if hasattr(data[key], 'isoformat') else data[key]
+                    for key in ['date_from', 'date_to', 'business_type']
+                    if data.get(key)
+                },
+                template_id=data.get('template_id') or None,
+                minute=data['minute'],
+                hour=data['hour'],
+                day_of_week=data['day_of_week'],
+                day_of_month=data['day_of_month'],
+                month_of_year=data['month_of_year'],
+                created_by=str(user_id)
+            )
+            schedule.next_run_at = next_run_after(schedule)
+            schedule.save()
+            
+            self.log_user_activity(
+                user=User.objects(id=user_id).first(),
+                action='create_report_schedule',
+                resource=str(schedule.id),
+                details={'report_type': schedule.report_type, 'name': schedule.name},
+                request=request
+            )
+            
+            return self.success_response(
+                data=self._serialize(schedule),
+                message="Report schedule created",
+                status_code=status.HTTP_201_CREATED
+            )
+            
+        except Exception as e:
+            logger.error(f"Error creating report schedule: {str(e)}")
+            return self.error_response(
+                message="Failed to create report schedule",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    def _serialize(self, schedule: ReportSchedule) -> dict:
+        return {
+            'id': str(schedule.id),
+            'name': schedule.name,
+            'report_type': schedule.report_type,
+            'formats': schedule.formats,
+            'selection_filters': schedule.selection_filters,
+            'cron': ' '.join([
+                schedule.minute, schedule.hour, schedule.day_of_month,
+                schedule.month_of_year, schedule.day_of_week
+            ]),
+            'next_run_at': schedule.next_run_at,
+            'last_run_at': schedule.last_run_at,
+            'last_report_id': schedule.last_report_id,
+            'last_error': schedule.last_error,
+            'run_count': schedule.run_count
+        }
+
+class ReportScheduleDetailView(APIView, ResponseMixin):
+    """Deactivate a report schedule"""
+    permission_classes = [IsAuthenticated, IsAnalystOrAbove]
+    
+    def delete(self, request, schedule_id):
+        """Stop future runs; reports already generated are kept"""
+        try:
+            # Only the creator, or an admin or manager, may deactivate a schedule
+            user_id = request.user.get('user_id')
+            query_params = {'id': schedule_id, 'is_active': True, 'created_by': str(user_id)}
+            user = User.objects(id=user_id).first()
+            if user and user.role in ['admin', 'manager']:
+                del query_params['created_by']
+            
+            updated = ReportSchedule.objects(**query_params).update_one(
+                set__is_active=False,
+                set__updated_at=datetime.utcnow()
+            )
+            if not updated:
+                return self.error_response(
+                    message="Report schedule not found",
+                    status_code=status.HTTP_404_NOT_FOUND
+                )
+            return self.success_response(message="Report schedule deactivated")
+            
+        except Exception as e:
+            logger.error(f"Error deactivating report schedule: {str(e)}")
+            return self.error_response(
+                message="Failed to deactivate report schedule",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class ReportDownloadView(APIView, AuditMixin):
     """Download generated reports"""
     permission_classes = [IsAuthenticated, CanViewReports]
     
@@ -206,33 +371,285 @@ class ReportDownloadView(APIView):
                     status=status.HTTP_410_GONE
                 )
             
+            artifact = self._select_artifact(report, request.GET.get('file_format'))
+            if not artifact:
+                return Response(
+                    {'error': 'Format not available for this report'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            storage = get_report_storage()
+            encoding = self._select_encoding(request, artifact['content_encodings'])
+            storage_key = artifact['file_path'] + ENCODING_SUFFIXES[encoding] if encoding else artifact['file_path']
+            
             # Check if file exists
-            if not os.path.exists(report.file_path):
+            if not storage.exists(storage_key):
                 return Response(
                     {'error': 'Report file not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Log download activity
-            user = User.objects(id=user_id).first()
-            if user:
-                self.log_user_activity(
-                    user=user,
-                    action='download_report',
-                    resource=report_id,
-                    request=request
+            file_size = storage.size(storage_key)
+            etag = self._build_etag(report, artifact, encoding, file_size)
+            
+            if etag in self._parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                response['Vary'] = 'Accept-Encoding'
+                return response
+            
+            byte_range = None
+            range_header = request.META.get('HTTP_RANGE')
+            if_range = request.META.get('HTTP_IF_RANGE')
+            # A stale If-Range means the client's partial copy is outdated: send the whole file
+            if range_header and (not if_range or if_range == etag):
+                byte_range = self._parse_range(range_header, file_size)
+                if byte_range == 'unsatisfiable':
+                    response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                    response['Content-Range'] = f"bytes */{file_size}"
+                    return response
+            
+            # Log download activity (first request of a download only, not every resumed range)
+            if not byte_range or byte_range[0] == 0:
+                user = User.objects(id=user_id).first()
+                if user:
+                    self.log_user_activity(
+                        user=user,
+                        action='download_report',
+                        resource=report_id,
+                        request=request
+                    )
+            
+            if byte_range:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    storage.iter_range(storage_key, start, end),
+                    status=status.HTTP_206_PARTIAL_CONTENT,
+                    content_type=self._content_type(artifact['file_path'])
+                )
+                response['Content-Range'] = f"bytes {start}-{end}/{file_size}"
+                response['Content-Length'] = str(end - start + 1)
+            else:
+                response = FileResponse(
+                    storage.open(storage_key),
+                    content_type=self._content_type(artifact['file_path'])
+                )
+                response['Content-Length'] = str(file_size)
+            
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['ETag'] = etag
+            response['Vary'] = 'Accept-Encoding'
+            response['Accept-Ranges'] = 'bytes'
+            response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+            # Cached artifacts are named by content hash, so name the download after the report
+            extension = os.path.splitext(artifact['file_path'])[1]
+            response['Content-Disposition'] = f'attachment; filename="{report.report_id}{extension}"'
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error downloading report: {str(e)}")
+            return Response(
+                {'error': 'Download failed'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    CONTENT_TYPES = {
+        '.pdf': 'application/pdf',
+        '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        '.html': 'text/html; charset=utf-8',
+        '.jsonl': 'application/x-ndjson',
+        '.json': 'application/json'
+    }
+    
+    def _select_artifact(self, report, requested_format: str = None):
+        """The rendered file for ?file_format=, defaulting to the report's primary format"""
+        if report.artifacts:
+            for artifact in report.artifacts:
+                if not requested_format or artifact['format'] == requested_format:
+                    return artifact
+            return None
+        
+        # Reports generated before multi-format rendering have a single file
+        if requested_format and requested_format != report.format:
+            return None
+        return {
+            'format': report.format,
+            'file_path': report.file_path,
+            'content_encodings': report.content_encodings or [],
+            'cache_key': report.cache_key
+        }
+    
+    def _content_type(self, file_path: str) -> str:
+        extension = os.path.splitext(file_path)[1].lower()
+        return self.CONTENT_TYPES.get(extension, 'application/octet-stream')
+    
+    def _select_encoding(self, request, available: list):
+        """Pick the best precompressed variant the client accepts (zstd over gzip)"""
+        accepted = {}
+        for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            pieces = part.strip().split(';')
+            name = pieces[0].strip().lower()
+            quality = 1.0
+            for param in pieces[1:]:
+                param = param.strip()
+                if param.startswith('q='):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            if name:
+                accepted[name] = quality
+        
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding
+        return None
+    
+    def _build_etag(self, report, artifact: dict, encoding, file_size: int) -> str:
+        """Strong validator per stored representation"""
+        identity = artifact['cache_key'][:32] if artifact.get('cache_key') else f"{report.report_id}-{artifact['format']}"
+        return f'"{identity}-{encoding or "identity"}-{file_size}"'
+    
+    def _parse_etags(self, header: str) -> list:
+        if header.strip() == '*':
+            return ['*']
+        return [tag.strip().replace('W/', '', 1) for tag in header.split(',') if tag.strip()]
+    
+    def _parse_range(self, header: str, file_size: int):
+        """
+        Parse a single "bytes=" range into inclusive (start, end).
+        Returns None to ignore the header (multi-range or malformed) and
+        'unsatisfiable' when the range lies outside the file.
+        """
+        if not header.startswith('bytes=') or ',' in header:
+            return None
+        
+        start_text, _, end_text = header[len('bytes='):].strip().partition('-')
+        try:
+            if not start_text:
+                # Suffix range: the last N bytes
+                length = int(end_text)
+                if length <= 0:
+                    return 'unsatisfiable'
+                return max(file_size - length, 0), file_size - 1
+            
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+        except ValueError:
+            return None
+        
+        if start >= file_size or end < start:
+            return 'unsatisfiable'
+        return start, min(end, file_size - 1)
+
+class ScoreCardBatchView(APIView, ResponseMixin, AuditMixin):
+    """Bulk per-application score cards as a streamed ZIP or one merged PDF"""
+    permission_classes = [IsAuthenticated, CanViewReports]
+    
+    def post(self, request):
+        """Render score cards for the selected applications"""
+        try:
+            serializer = ScoreCardBatchRequestSerializer(data=request.data)
+            if not serializer.is_valid():
+                return self.validation_error_response(serializer)
+            
+            user = User.objects(id=request.user.get('user_id')).first()
+            if not user:
+                return self.error_response(
+                    message="User not found",
+                    status_code=status.HTTP_401_UNAUTHORIZED
+                )
+            
+            selection_filters = {
+                key: serializer.validated_data[key]
+                for key in ['date_from', 'date_to', 'business_type']
+                if serializer.validated_data.get(key)
+            }
+            output = serializer.validated_data['output']
+            service = ScoreCardBatchService()
+            
+            rows = service.iter_rows(serializer.validated_data.get('application_ids', []), selection_filters)
+            first = next(rows, None)
+            if first is None:
+                return self.error_response(
+                    message="No valid applications found",
+                    status_code=status.HTTP_404_NOT_FOUND
                 )
+            rows = itertools.chain([first], rows)
             
-            # Return file
+            self.log_user_activity(
+                user=user,
+                action='generate_score_cards',
+                resource='score_cards',
+                details={'output': output, 'filters': {k: str(v) for k, v in selection_filters.items()}},
+                request=request
+            )
+            
+            filename = f"score-cards-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+            
+            if output == 'zip':
+                # Cards are zipped and sent while the pool renders the rest
+                response = StreamingHttpResponse(service.stream_zip(rows), content_type='application/zip')
+            else:
+                file_path = os.path.join(service.generator._work_dir(), f"{filename}.pdf")
+                stats = {}
+                service.write_merged_pdf(rows, file_path, stats)
+                file_handle = open(file_path, 'rb')
+                os.remove(file_path)  # Unlinked now, freed when the response closes the handle
+                response = FileResponse(file_handle, content_type='application/pdf')
+                response['Content-Length'] = str(os.fstat(file_handle.fileno()).st_size)
+                response['X-Cards-Per-Second'] = str(stats['cards_per_second'])
+            
+            extension = 'zip' if output == 'zip' else 'pdf'
+            response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+            return response
+            
+        except Exception as e:
+            logger.error(f"Score card generation failed: {str(e)}")
+            return self.error_response(
+                message=f"Score card generation failed: {str(e)}",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class ReportProfileView(APIView):
+    """Download the profile captured for a report generated with `profile`"""
+    permission_classes = [IsAuthenticated, IsAnalystOrAbove]
+    
+    def get(self, request, report_id):
+        """Download profile file (.prof for pstats/snakeviz, .profile.html for pyinstrument)"""
+        try:
+            report = GeneratedReport.objects(report_id=report_id).first()
+            storage = get_report_storage()
+            
+            if not report or not report.profile_path or not storage.exists(report.profile_path):
+                return Response(
+                    {'error': 'Profile not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            # Check if user can access this report
+            user_id = request.user.get('user_id')
+            if report.requested_by != str(user_id):
+                # Check if user is admin or manager
+                user = User.objects(id=user_id).first()
+                if not user or user.role not in ['admin', 'manager']:
+                    return Response(
+                        {'error': 'Access denied'},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
+            
+            is_html = report.profile_path.endswith('.html')
             response = FileResponse(
-                open(report.file_path, 'rb'),
-                content_type='application/octet-stream'
+                storage.open(report.profile_path),
+                content_type='text/html; charset=utf-8' if is_html else 'application/octet-stream'
             )
-            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(report.file_path)}"'
+            response['Content-Length'] = str(storage.size(report.profile_path))
+            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(report.profile_path)}"'
             return response
             
         except Exception as e:
-            logger.error(f"Error downloading report: {str(e)}")
+            logger.error(f"Error downloading report profile: {str(e)}")
             return Response(
                 {'error': 'Download failed'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -0,0 +1,97 @@
+"""
+Batched prediction throughput benchmark.
+
+Trains the three CreditScoringModelTrainer model types on N synthetic
+applications and scores batches of 1, 100 and 10,000 rows three ways:
+  legacy    - per application: pandas preprocessing, predict_proba, then predict
+  per-row   - per application: predict_default_probability (compiled transform, one model call)
+  batch     - predict_batch: one feature matrix, one predict_proba call
+
+Batch probabilities and classes are checked against the legacy path first.
+Legacy is measured on a sample of at most 200 rows per size.
+
+Usage (from the backend directory):
+    python benchmarks/batch_prediction_throughput.py --applications 5000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from ai_models.inference.predictor import CreditScoringPredictor
+from ai_models.training.data_preprocessor import CreditDataPreprocessor
+from feature_transform_latency import make_prediction_records, make_training_data
+
+BATCH_SIZES = [1, 100, 10000]
+LEGACY_SAMPLE = 200
+
+def legacy_predict(predictor, application_data):
+    """predict_default_probability before batching: two model calls per application"""
+    processed_data = predictor.preprocessor.preprocess_prediction_dataframe(application_data)
+    prediction_proba = predictor.model.predict_proba(processed_data)
+    prediction = predictor.model.predict(processed_data)[0]
+    return float(prediction_proba[0][1]), bool(prediction)
+
+def rows_per_second(func, rows):
+    started = time.perf_counter()
+    func(rows)
+    return len(rows) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=5000)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    
+    training_data = make_training_data(args.applications)
+    preprocessor = CreditDataPreprocessor()
+    X, y = preprocessor.preprocess_training_data(training_data)
+    base_records = make_prediction_records(preprocessor, training_data, 500)
+    records = [dict(base_records[i % len(base_records)]) for i in range(max(BATCH_SIZES))]
+    
+    models = {
+        'random_forest': RandomForestClassifier(n_estimators=100, max_depth=10, min_samples_split=5,
+                                                min_samples_leaf=2, random_state=42),
+        'gradient_boosting': GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, max_depth=6,
+                                                        random_state=42),
+        'logistic_regression': LogisticRegression(random_state=42, max_iter=1000)
+    }
+    
+    for model_name, model in models.items():
+        model.fit(X, y)
+        predictor = CreditScoringPredictor()
+        predictor.model = model
+        predictor.preprocessor = preprocessor
+        
+        sample = records[:LEGACY_SAMPLE]
+        expected = [legacy_predict(predictor, dict(record)) for record in sample]
+        actual = predictor.predict_batch(sample)
+        probabilities_match = np.allclose(
+            [p for p, _ in expected], [r['default_probability'] for r in actual], rtol=0, atol=1e-12
+        )
+        classes_match = [c for _, c in expected] == [r['predicted_default'] for r in actual]
+        if not (probabilities_match and classes_match):
+            sys.exit(f"{model_name}: batch predictions differ from the legacy path")
+        
+        print(f"{model_name} (parity ok)")
+        for size in BATCH_SIZES:
+            rows = records[:size]
+            legacy = rows_per_second(
+                lambda batch: [legacy_predict(predictor, dict(record)) for record in batch], rows[:LEGACY_SAMPLE]
+            )
+            per_row = rows_per_second(
+                lambda batch: [predictor.predict_default_probability(record) for record in batch], rows
+            )
+            batch = rows_per_second(predictor.predict_batch, rows)
+            print(f"  {size:>6} rows  legacy {legacy:10,.0f}/s  per-row {per_row:10,.0f}/s  batch {batch:10,.0f}/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Feature pipeline parity and throughput benchmark.
+
+Fits CreditDataPreprocessor on N synthetic scored applications (about
+30% without a psychometric result) and checks that the fitted
+CompiledFeatureTransform produces identical features (exact float
+equality) in every way it can be called:
+  train/serve  - raw training records transformed for prediction equal
+                 the training matrix (missing values take the stored
+                 training medians/modes, not the batch's)
+  batch size   - one row at a time, in batches of 7 and 1000, and all
+                 at once
+  columns      - transform_columns on column arrays equals transform_batch
+  reference    - preprocess_prediction_dataframe (pandas) on regular
+                 records and on edge cases (None, NaN, absent keys,
+                 unseen categories, zero denominators)
+  --rows       - the records tiled to --rows rows (default one million)
+                 and transformed at once; sampled rows are checked
+                 against single-row transforms
+
+Then reports throughput at several batch sizes.
+
+Usage (from the backend directory):
+    python benchmarks/feature_pipeline_parity.py --applications 5000 --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_models.training.data_preprocessor import CreditDataPreprocessor
+from benchmarks.feature_transform_latency import make_training_data, edge_cases, outcome
+
+def check(name, expected, actual):
+    if expected.shape != actual.shape or not np.array_equal(expected, actual, equal_nan=True):
+        sys.exit(f"parity check failed: {name}")
+    print(f"  {name:<62} identical ({actual.shape[0]:,} rows)")
+
+def missing_value_cases(record):
+    """Records with values missing the ways prediction input can lack them"""
+    cases = []
+    for changes in [
+        {'monthly_income': None, 'residency_status': None},
+        {'psychometric_total': float('nan'), 'seller_type': float('nan')},
+        {'years_of_residency': None, 'years_of_operation': None},
+        {'total_monthly_installments': None, 'existing_loan_count': None}
+    ]:
+        case = dict(record)
+        case.update(changes)
+        cases.append(case)
+    for keys in [('psychometric_total', 'resilience'), ('guarantor_category', 'grade'), ('last_month_sales',)]:
+        case = dict(record)
+        for key in keys:
+            case.pop(key, None)
+        cases.append(case)
+    return cases
+
+def tile_columns(records, columns, rows):
+    """Column arrays of `rows` rows cycling through the records (None where a record lacks a key)"""
+    tiled = {}
+    for column in columns:
+        values = np.array([record.get(column) for record in records], dtype=object)
+        tiled[column] = np.resize(values, rows)
+    return tiled
+
+def throughput(func, rows, repeat=3):
+    best = min(_timed(func) for _ in range(repeat))
+    return rows / best
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=5000)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    # Edge cases deliberately divide by zero and take roots of negatives
+    warnings.simplefilter('ignore')
+    np.seterr(all='ignore')
+    
+    training_data = make_training_data(args.applications)
+    preprocessor = CreditDataPreprocessor()
+    X_train, _ = preprocessor.preprocess_training_data(training_data)
+    compiled = preprocessor.compiled_transform
+    if compiled is None:
+        sys.exit("preprocessor did not compile a transform")
+    
+    # Training records as prediction input: no target, psychometric keys absent where there was no test
+    records = [
+        preprocessor.build_feature_record(data['application'], data['score'])
+        for data in training_data
+    ]
+    missing = sum(1 for record in records if 'psychometric_total' not in record)
+    print(f"{len(records):,} records, {missing:,} without psychometric features, {compiled.width} features")
+    
+    print("parity:")
+    batch = compiled.transform_batch(records)
+    check("train/serve: transform_batch == training matrix", X_train, batch)
+    check("batch size: one row at a time == all at once", batch,
+          np.vstack([compiled.transform(record) for record in records]))
+    for size in (7, 1000):
+        check(f"batch size: batches of {size} == all at once", batch,
+              np.vstack([compiled.transform_batch(records[i:i + size]) for i in range(0, len(records), size)]))
+    check("columns: transform_columns == transform_batch", batch,
+          compiled.transform_columns(tile_columns(records, compiled.row_columns, len(records))))
+    check("predict path: preprocess_prediction_batch == transform_batch", batch,
+          preprocessor.preprocess_prediction_batch(records))
+    
+    checked = records[:100] + [
+        case for record in records[:20] for case in edge_cases(record) + missing_value_cases(record)
+    ]
+    rejected = 0
+    for record in checked:
+        expected = outcome(preprocessor.preprocess_prediction_dataframe, record)
+        actual = outcome(compiled.transform, record)
+        if isinstance(expected, Exception) or isinstance(actual, Exception):
+            # Inputs the pandas path rejects (e.g. infinite ratios) must be rejected too
+            if type(expected) is not type(actual):
+                sys.exit(f"parity check failed for {record}: {expected!r} vs {actual!r}")
+            rejected += 1
+        elif not np.array_equal(expected, actual, equal_nan=True):
+            sys.exit(f"parity check failed: reference on {record}")
+    print(f"  {'reference: pandas path on regular and edge-case records':<62} "
+          f"identical ({len(checked):,} rows, {rejected} rejected by both)")
+    
+    if np.isnan(compiled.transform_batch([case for record in records[:20] for case in missing_value_cases(record)])).any():
+        sys.exit("parity check failed: missing values were not filled")
+    
+    columns = tile_columns(records, compiled.row_columns, args.rows)
+    started = time.perf_counter()
+    large = compiled.transform_columns(columns, args.rows)
+    large_seconds = time.perf_counter() - started
+    sample = np.random.default_rng(0).choice(args.rows, size=min(args.rows, 2000), replace=False)
+    check(f"--rows: sampled rows of {args.rows:,} == single-row transforms", large[sample],
+          np.vstack([compiled.transform(records[i % len(records)]) for i in sample]))
+    
+    print("throughput:")
+    for size in (1, 100, 10000):
+        chunk = (records * (size // len(records) + 1))[:size]
+        rows_per_second = throughput(lambda: compiled.transform_batch(chunk), size)
+        print(f"  transform_batch    {size:>9,} rows  {rows_per_second:12,.0f} rows/s  "
+              f"({1e6 / rows_per_second:8.2f} us/row)")
+    print(f"  transform_columns  {args.rows:>9,} rows  {args.rows / large_seconds:12,.0f} rows/s  "
+          f"({1e6 * large_seconds / args.rows:8.2f} us/row)")
+    sample_records = records[:200]
+    rows_per_second = throughput(
+        lambda: [preprocessor.preprocess_prediction_dataframe(dict(record)) for record in sample_records],
+        len(sample_records), repeat=1
+    )
+    print(f"  pandas reference   {len(sample_records):>9,} rows  {rows_per_second:12,.0f} rows/s  "
+          f"({1e6 / rows_per_second:8.2f} us/row)")
+
+if __name__ == '__main__':
+    main()
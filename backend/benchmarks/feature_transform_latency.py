@@ -0,0 +1,176 @@
+"""
+Single-application feature transform benchmark.
+
+Fits CreditDataPreprocessor on N synthetic scored applications, then
+preprocesses prediction records two ways:
+  pandas    - preprocess_prediction_dataframe (one-row DataFrame per call)
+  compiled  - CompiledFeatureTransform (dict lookups + NumPy arrays)
+
+Outputs must be identical (exact float equality, NaN positions included)
+on regular records and on edge cases (unseen and missing categories,
+zero denominators); the script checks that first.
+
+Usage (from the backend directory):
+    python benchmarks/feature_transform_latency.py --applications 5000 --calls 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import warnings
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_models.training.data_preprocessor import CreditDataPreprocessor
+
+BUSINESS_TYPES = ['grocery_shop', 'tailoring', 'pharmacy', 'electronics', 'restaurant']
+GRADES = ['A', 'B', 'C', 'R']
+RISK_LEVELS = {'A': 'low', 'B': 'medium', 'C': 'high', 'R': 'very_high'}
+
+def make_training_data(count: int, seed: int = 11):
+    """Synthetic {'application', 'score'} pairs with the attributes _convert_to_dataframe reads"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(count):
+        grade = rng.choices(GRADES, weights=[3, 4, 2, 1])[0]
+        sales = rng.uniform(20000, 400000)
+        loans = [
+            SimpleNamespace(outstanding_loan=rng.uniform(5000, 200000), monthly_installment=rng.uniform(500, 20000))
+            for _ in range(rng.randint(0, 5))
+        ]
+        application = SimpleNamespace(
+            borrower_info=SimpleNamespace(
+                years_of_residency=rng.randint(0, 30),
+                residency_status=rng.choice(['permanent', 'temporary', 'rented']),
+                guarantor_category=rng.choice(['low', 'medium', 'high', None])
+            ),
+            business_data=SimpleNamespace(
+                business_type=rng.choice(BUSINESS_TYPES),
+                years_of_operation=rng.randint(0, 25),
+                seller_type=rng.choice(['retailer', 'wholesaler', None]),
+                average_daily_sales=sales / 30,
+                last_month_sales=sales,
+                inventory_value_present=rng.uniform(0, 1000000),
+                total_expense_last_month=sales * rng.uniform(0.3, 0.95),
+                rent_advance=rng.uniform(0, 100000)
+            ),
+            financial_data=SimpleNamespace(
+                monthly_income=rng.uniform(10000, 150000),
+                existing_loans=loans,
+                bank_transaction_volume_1y=rng.uniform(0, 5000000)
+            )
+        )
+        psychometric = SimpleNamespace(
+            total_score=rng.uniform(0, 100),
+            time_discipline_score=rng.uniform(0, 20),
+            impulse_planning_score=rng.uniform(0, 20),
+            honesty_responsibility_score=rng.uniform(0, 20),
+            resilience_score=rng.uniform(0, 20),
+            future_orientation_score=rng.uniform(0, 20)
+        ) if rng.random() < 0.7 else None
+        score = SimpleNamespace(
+            data_points_score=rng.randint(0, 100),
+            credit_ratios_score=rng.uniform(0, 100),
+            borrower_attributes_score=rng.randint(0, 100),
+            total_points=rng.uniform(20, 95),
+            grade=grade,
+            risk_level=RISK_LEVELS[grade],
+            psychometric_result=psychometric
+        )
+        data.append({'application': application, 'score': score})
+    return data
+
+def make_prediction_records(preprocessor: CreditDataPreprocessor, training_data, count: int):
+    """Prediction dicts shaped like the training records (target removed, psychometric always present)"""
+    records = []
+    for data in training_data[:count]:
+        record = preprocessor._convert_to_dataframe([data]).iloc[0].to_dict()
+        record.pop(preprocessor.target_column)
+        for key in ['psychometric_total', 'time_discipline', 'impulse_planning',
+                    'honesty_responsibility', 'resilience', 'future_orientation']:
+            record.setdefault(key, 10.0)
+        records.append(record)
+    return records
+
+def edge_cases(record):
+    """Variants the compiled path must handle exactly like pandas"""
+    cases = []
+    for changes in [
+        {'business_type': 'spaceship', 'seller_type': 'drone'},  # unseen categories
+        {'guarantor_category': None, 'residency_status': None},  # missing categories
+        {'monthly_income': -1, 'total_monthly_installments': 0.0},  # 0/0
+        {'monthly_income': -1.0, 'total_monthly_installments': 250.0},  # x/0
+        {'years_of_operation': -2},  # sqrt of a negative
+        {'existing_loan_count': 7, 'bank_transaction_volume': float('nan')}
+    ]:
+        case = dict(record)
+        case.update(changes)
+        cases.append(case)
+    without_grade = dict(record)
+    without_grade.pop('grade')
+    cases.append(without_grade)
+    return cases
+
+def outcome(func, record):
+    try:
+        return func(dict(record))
+    except Exception as e:
+        return e
+
+def timed(func, records, calls):
+    timings = []
+    for i in range(calls):
+        record = records[i % len(records)]
+        started = time.perf_counter()
+        func(record)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=5000)
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+    # Edge cases deliberately divide by zero and take roots of negatives
+    warnings.simplefilter('ignore')
+    np.seterr(all='ignore')
+    
+    training_data = make_training_data(args.applications)
+    preprocessor = CreditDataPreprocessor()
+    preprocessor.preprocess_training_data(training_data)
+    compiled = preprocessor.compiled_transform
+    if compiled is None:
+        sys.exit("preprocessor did not compile a transform")
+    
+    records = make_prediction_records(preprocessor, training_data, 200)
+    checked = records + [case for record in records[:20] for case in edge_cases(record)]
+    rejected = 0
+    for record in checked:
+        expected = outcome(preprocessor.preprocess_prediction_dataframe, record)
+        actual = outcome(compiled.transform, record)
+        if isinstance(expected, Exception) or isinstance(actual, Exception):
+            # Inputs the pandas path rejects (e.g. infinite ratios) must be rejected too
+            if type(expected) is not type(actual):
+                sys.exit(f"parity check failed for {record}: {expected!r} vs {actual!r}")
+            rejected += 1
+        elif expected.dtype != actual.dtype or not np.array_equal(expected, actual, equal_nan=True):
+            sys.exit(f"parity check failed for {record}")
+    print(f"parity: {len(checked)} records identical, {rejected} rejected by both ({compiled.width} features)")
+    
+    for name, func in [
+        ('pandas', lambda record: preprocessor.preprocess_prediction_dataframe(dict(record))),
+        ('compiled', preprocessor.preprocess_prediction_data)
+    ]:
+        timings = timed(func, records, args.calls)
+        p50 = timings[len(timings) // 2] * 1e6
+        p99 = timings[int(len(timings) * 0.99)] * 1e6
+        print(f"{name:<9} mean {statistics.fmean(timings) * 1e6:9.1f} us  p50 {p50:9.1f} us  p99 {p99:9.1f} us")
+
+if __name__ == '__main__':
+    main()
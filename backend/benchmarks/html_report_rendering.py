@@ -0,0 +1,150 @@
+"""
+HTML report rendering benchmark.
+
+Renders a score breakdown report for N synthetic applications three ways:
+  legacy    - whole document built by string concatenation, then written
+  fstring   - per-row f-strings written straight to the file (default layout)
+  template  - compiled ReportTemplate layout rendered in chunks to the file
+
+The last two must produce identical files; the script checks that first.
+
+Usage (from the backend directory):
+    python benchmarks/html_report_rendering.py --applications 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_scoring.settings')
+
+import django
+
+django.setup()
+
+from apps.reports.templating import get_compiled_html_template
+from apps.reports.writers import HtmlReportWriter, table_columns
+
+GRADES = ['A', 'B', 'C', 'R']
+RISK_LEVELS = {'A': 'low', 'B': 'medium', 'C': 'high', 'R': 'very_high'}
+
+def make_rows(count: int, seed: int = 7):
+    """Synthetic score_breakdown rows shaped like ReportGenerator._build_score_breakdown_row"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        grade = rng.choice(GRADES)
+        rows.append({
+            'application_id': f"APP-{i:07d}",
+            'borrower_name': f"Borrower {i} & Sons",
+            'business_name': f"Shop <{i % 977}>",
+            'score_details': {
+                'final_score': round(rng.uniform(300, 850), 2),
+                'grade': grade,
+                'max_loan_amount': round(rng.uniform(10000, 500000), 2)
+            },
+            'risk_assessment': {'level': RISK_LEVELS[grade]}
+        })
+    return rows
+
+def make_summary(rows):
+    scores = [row['score_details']['final_score'] for row in rows]
+    return {
+        'average_score': sum(scores) / len(scores),
+        'lowest_score': min(scores),
+        'highest_score': max(scores),
+        'grade_distribution': {grade: sum(1 for r in rows if r['score_details']['grade'] == grade) for grade in GRADES}
+    }
+
+def render_legacy(file_path, header, rows, summary):
+    """The original in-memory concatenation from _create_score_breakdown_html"""
+    content = f"<!DOCTYPE html><html><head><title>{header['title']}</title></head><body>"
+    content += f"""
+            <div class="summary">
+                <h2>Summary</h2>
+                <p><strong>Total Applications:</strong> {len(rows)}</p>
+                <p><strong>Average Score:</strong> {summary['average_score']:.2f}</p>
+                <p><strong>Score Range:</strong> {summary['lowest_score']:.2f} - {summary['highest_score']:.2f}</p>
+            </div>
+            """
+    content += "<h2>Application Details</h2><table>"
+    for app in rows:
+        grade_class = f"grade-{app['score_details']['grade'].lower()}"
+        content += f"""
+            <tr class="{grade_class}">
+                <td>{app['application_id']}</td>
+                <td>{app['borrower_name']}</td>
+                <td>{app['business_name']}</td>
+                <td>{app['score_details']['final_score']:.2f}</td>
+                <td>{app['score_details']['grade']}</td>
+                <td>{app['risk_assessment']['level']}</td>
+                <td>{app['score_details']['max_loan_amount']:,.2f}</td>
+            </tr>
+            """
+    content += "</table></body></html>"
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return len(rows)
+
+def render_fstring(file_path, header, rows, summary):
+    """HtmlReportWriter's built-in f-string layout"""
+    return HtmlReportWriter().write(file_path, header, table_columns('score_breakdown'), iter(rows), summary)
+
+def render_template(file_path, header, rows, summary):
+    """Same layout as a compiled ReportTemplate (what a template_id selects)"""
+    writer = HtmlReportWriter({'html': {}})
+    return writer.write(file_path, header, table_columns('score_breakdown'), iter(rows), summary)
+
+def measure(name, func, file_path, header, rows, summary, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        row_count = func(file_path, header, rows, summary)
+        timings.append(time.perf_counter() - started)
+    
+    # Separate pass: tracemalloc slows allocation-heavy code down considerably
+    tracemalloc.start()
+    func(file_path, header, rows, summary)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    
+    best = min(timings)
+    print(
+        f"{name:<10} {best:8.3f}s  {row_count / best:10,.0f} rows/s  "
+        f"peak {peak / 1024 / 1024:7.1f} MB  file {os.path.getsize(file_path) / 1024 / 1024:6.1f} MB"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    rows = make_rows(args.applications)
+    summary = make_summary(rows)
+    header = {'title': 'Credit Score Breakdown Report', 'generated_at': '2024-01-01T00:00:00'}
+    
+    started = time.perf_counter()
+    get_compiled_html_template()
+    print(f"template compile (first use): {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(f"{args.applications:,} applications, best of {args.repeat}")
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        fstring_path = os.path.join(work_dir, 'parity_fstring.html')
+        template_path = os.path.join(work_dir, 'parity_template.html')
+        render_fstring(fstring_path, header, rows[:1000], make_summary(rows[:1000]))
+        render_template(template_path, header, rows[:1000], make_summary(rows[:1000]))
+        with open(fstring_path, encoding='utf-8') as a, open(template_path, encoding='utf-8') as b:
+            if a.read() != b.read():
+                sys.exit("parity check failed: template output differs from the built-in layout")
+        print("parity: template output identical to built-in layout")
+        
+        for name, func in [('legacy', render_legacy), ('fstring', render_fstring), ('template', render_template)]:
+            measure(name, func, os.path.join(work_dir, f"{name}.html"), header, rows, summary, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Model training wall-clock benchmark.
+
+Trains the CreditScoringModelTrainer candidates on N synthetic
+applications (default 1,000,000) three ways:
+  legacy    - preprocess, then fit one model after another with default
+              n_jobs, dumping the full preprocessor into all four files
+  serial    - train_models(parallel=False): preprocessed once into the
+              .npy dataset cache, preprocessor saved once by ID
+  parallel  - train_models(): as serial, candidates fitted concurrently
+              in a process pool with per-model n_jobs
+
+Each run writes to its own temporary model directory. The timing split
+(preprocess / dataset cache / fit) and the size of the model files and
+of the dataset cache are reported.
+Fitted models are compared across the runs (same metrics).
+
+Usage (from the backend directory):
+    python benchmarks/parallel_training.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.model_selection import train_test_split
+
+from ai_models.training.data_preprocessor import CreditDataPreprocessor
+from ai_models.training.model_trainer import CreditScoringModelTrainer, evaluate_model
+from feature_transform_latency import make_training_data
+
+def legacy_train(training_data, model_dir):
+    """train_models before the dataset cache and process pool"""
+    started = time.perf_counter()
+    preprocessor = CreditDataPreprocessor()
+    X, y = preprocessor.preprocess_training_data(training_data)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    preprocessed = time.perf_counter()
+    
+    # Same candidates, with the n_jobs defaults of the original configuration
+    models = CreditScoringModelTrainer(model_dir)._candidate_models(workers=1)
+    models['random_forest'].set_params(n_jobs=None)
+    
+    results = {}
+    for model_name, model in models.items():
+        model.fit(X_train, y_train)
+        performance = evaluate_model(model, X_test, y_test)
+        joblib.dump({
+            'model': model,
+            'preprocessor': preprocessor,
+            'performance': performance,
+            'feature_columns': preprocessor.feature_columns,
+            'training_date': datetime.now().isoformat()
+        }, os.path.join(model_dir, f"{model_name}.joblib"))
+        results[model_name] = performance
+    
+    best_model_name = max(results, key=lambda name: results[name]['accuracy'])
+    joblib.dump({
+        'model': models[best_model_name],
+        'preprocessor': preprocessor,
+        'performance': results[best_model_name],
+        'feature_columns': preprocessor.feature_columns,
+        'training_date': datetime.now().isoformat(),
+        'model_type': best_model_name
+    }, os.path.join(model_dir, 'best_model.joblib'))
+    
+    finished = time.perf_counter()
+    return results, {
+        'preprocess': preprocessed - started,
+        'fit': finished - preprocessed,
+        'total': finished - started
+    }
+
+def directory_size(path, exclude=()):
+    """Megabytes under path, skipping subdirectories named in exclude"""
+    total = 0
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if d not in exclude]
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+    return total / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    
+    started = time.perf_counter()
+    training_data = make_training_data(args.rows)
+    print(f"{args.rows:,} synthetic applications generated in {time.perf_counter() - started:.1f}s, "
+          f"{os.cpu_count()} cores")
+    
+    performances = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in ['legacy', 'serial', 'parallel']:
+            model_dir = os.path.join(work_dir, name)
+            os.makedirs(model_dir)
+            if name == 'legacy':
+                performances[name], timings = legacy_train(training_data, model_dir)
+            else:
+                result = CreditScoringModelTrainer(model_dir).train_models(
+                    training_data, parallel=(name == 'parallel')
+                )
+                performances[name] = {
+                    model_name: item['performance'] for model_name, item in result['training_results'].items()
+                }
+                timings = result['timings']
+            
+            split = '  '.join(f"{step} {seconds:8.1f}s" for step, seconds in timings.items())
+            models_mb = directory_size(model_dir, exclude=[CreditScoringModelTrainer.DATASET_DIR])
+            dataset_mb = directory_size(model_dir) - models_mb
+            print(f"{name:<9} {split}  model files {models_mb:7.1f} MB  dataset cache {dataset_mb:7.1f} MB")
+    
+    for name in ['serial', 'parallel']:
+        if performances[name] != performances['legacy']:
+            print(f"warning: {name} metrics differ from legacy")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Portable model export benchmark.
+
+Trains the candidate models on N synthetic scored applications, exports
+each with ai_models.training.model_exporter and compares:
+  cold start  - a fresh process importing the inference code, loading
+                the model and scoring one application:
+                  joblib    CreditScoringPredictor (joblib.load of the
+                            sklearn model and preprocessor)
+                  portable  PortableCreditModel (manifest + memory
+                            mapped .npy arrays, NumPy only)
+  per row     - predict_batch([record]) latency, p50/p99
+  batch       - predict_proba on a --batch row feature matrix
+
+Probabilities must agree within 1e-12 on the training records and on
+random feature rows; the script checks that first.
+
+Usage (from the backend directory):
+    python benchmarks/portable_model_export.py --applications 5000 --calls 2000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def cold_start(mode, path, record, results):
+    """Import, load and score one record in a fresh process"""
+    started = time.perf_counter()
+    if mode == 'joblib':
+        from ai_models.inference.predictor import CreditScoringPredictor
+        model = CreditScoringPredictor(path)
+    else:
+        from ai_models.inference.portable_model import PortableCreditModel
+        model = PortableCreditModel(path)
+    loaded = time.perf_counter()
+    model.predict_batch([record])
+    results.put({
+        'load_seconds': loaded - started,
+        'first_prediction_seconds': time.perf_counter() - started,
+        'peak_rss_mb': peak_rss_mb(),
+        'sklearn_imported': 'sklearn' in sys.modules
+    })
+
+def peak_rss_mb():
+    # ru_maxrss survives the fork + exec of a spawned process; VmHWM starts again
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def timed(func, records, calls):
+    timings = []
+    for i in range(calls):
+        record = records[i % len(records)]
+        started = time.perf_counter()
+        func([record])
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=5000)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=10000)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    
+    from benchmarks.feature_transform_latency import make_training_data, make_prediction_records
+    from ai_models.inference.portable_model import PortableCreditModel
+    from ai_models.inference.predictor import CreditScoringPredictor
+    from ai_models.training.model_exporter import export_model
+    from ai_models.training.model_trainer import CreditScoringModelTrainer
+    
+    context = multiprocessing.get_context('spawn')
+    training_data = make_training_data(args.applications)
+    with tempfile.TemporaryDirectory() as model_dir:
+        trained = CreditScoringModelTrainer(model_dir).train_models(training_data)
+        
+        for model_name, result in trained['training_results'].items():
+            export_dir = os.path.join(model_dir, 'exports', model_name)
+            started = time.perf_counter()
+            export_model(result['model_path'], export_dir)
+            export_seconds = time.perf_counter() - started
+            export_bytes = sum(entry.stat().st_size for entry in os.scandir(export_dir))
+            
+            predictor = CreditScoringPredictor(result['model_path'])
+            portable = PortableCreditModel(export_dir)
+            records = [
+                predictor.preprocessor.fill_missing_features(record)
+                for record in make_prediction_records(predictor.preprocessor, training_data, 500)
+            ]
+            
+            X = predictor.preprocessor.preprocess_prediction_batch(records)
+            random_X = np.random.default_rng(0).normal(scale=3.0, size=(args.batch, X.shape[1]))
+            difference = max(
+                np.abs(predictor.model.predict_proba(features) - portable.predict_proba(features)).max()
+                for features in (X, random_X)
+            )
+            if difference > 1e-12:
+                sys.exit(f"{model_name}: probabilities differ by {difference:.3g}")
+            
+            print(f"\n{model_name}: exported in {export_seconds * 1000:.0f} ms, "
+                  f"{export_bytes / 1024:.0f} KB vs {os.path.getsize(result['model_path']) / 1024:.0f} KB joblib, "
+                  f"max |probability difference| {difference:.3g}")
+            
+            for mode, path, model, predict_proba in [
+                ('joblib', result['model_path'], predictor, predictor.model.predict_proba),
+                ('portable', export_dir, portable, portable.predict_proba)
+            ]:
+                results = context.Queue()
+                process = context.Process(target=cold_start, args=(mode, path, records[0], results))
+                process.start()
+                report = results.get()
+                process.join()
+                
+                timings = timed(model.predict_batch, records, args.calls)
+                p50 = timings[len(timings) // 2] * 1e6
+                p99 = timings[int(len(timings) * 0.99)] * 1e6
+                started = time.perf_counter()
+                predict_proba(random_X)
+                batch_seconds = time.perf_counter() - started
+                
+                print(f"  {mode:<9} cold start {report['first_prediction_seconds'] * 1000:7.1f} ms "
+                      f"(load {report['load_seconds'] * 1000:7.1f} ms, RSS {report['peak_rss_mb']:6.1f} MB, "
+                      f"sklearn {'imported' if report['sklearn_imported'] else 'not imported'})  "
+                      f"row p50 {p50:8.1f} us  p99 {p99:8.1f} us  "
+                      f"batch {args.batch / batch_seconds:10,.0f} rows/s  (mean {statistics.fmean(timings) * 1e6:.1f} us)")
+
+if __name__ == '__main__':
+    main()
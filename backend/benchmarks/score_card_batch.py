@@ -0,0 +1,130 @@
+"""
+Batch score card benchmark.
+
+Renders N synthetic single-application score cards four ways:
+  uncached  - one worker, stylesheet rebuilt for every card (per-request cost)
+  serial    - one worker, styles cached per process
+  pool      - streamed ZIP, cards rendered in the process pool
+  merged    - one PDF with a bookmark per card
+
+Usage (from the backend directory):
+    python benchmarks/score_card_batch.py --applications 2000 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_scoring.settings')
+
+import django
+
+django.setup()
+
+from apps.reports import score_cards
+from apps.reports.score_cards import ScoreCardBatchService, render_score_card
+
+GRADES = ['A', 'B', 'C', 'R']
+RISK_LEVELS = {'A': 'low', 'B': 'medium', 'C': 'high', 'R': 'very_high'}
+
+def make_rows(count: int, seed: int = 7):
+    """Synthetic score_breakdown rows shaped like ReportGenerator._build_score_breakdown_row"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        grade = rng.choice(GRADES)
+        rows.append({
+            'application_id': f"APP-{i:07d}",
+            'borrower_name': f"Borrower {i} & Sons",
+            'business_name': f"Shop <{i % 977}>",
+            'business_type': rng.choice(['grocery_shop', 'tailoring', 'pharmacy']),
+            'loan_amount_requested': round(rng.uniform(10000, 500000), 2),
+            'score_details': {
+                'final_score': round(rng.uniform(20, 95), 2),
+                'grade': grade,
+                'loan_slab_adjustment': 'none',
+                'risk_level': RISK_LEVELS[grade],
+                'default_probability': rng.uniform(0.01, 0.4),
+                'max_loan_amount': round(rng.uniform(10000, 500000), 2),
+                'component_scores': {
+                    'data_points': {'score': rng.randint(0, 100), 'percentage': rng.uniform(0, 30)},
+                    'credit_ratios': {
+                        'score': rng.uniform(0, 100),
+                        'percentage': rng.uniform(0, 20),
+                        'ratios': [
+                            {'name': name, 'value': rng.uniform(0, 3), 'score': rng.randint(0, 10),
+                             'band': rng.choice(['low', 'medium', 'high']), 'threshold_met': rng.random() > 0.3}
+                            for name in ['current_ratio', 'debt_to_income', 'inventory_turnover']
+                        ]
+                    },
+                    'borrower_attributes': {'score': rng.randint(0, 100), 'percentage': rng.uniform(0, 48)}
+                }
+            },
+            'risk_assessment': {
+                'level': RISK_LEVELS[grade],
+                'probability': rng.uniform(0.01, 0.4),
+                'red_flags': [
+                    {'type': 'soft', 'name': 'Irregular cash flow', 'severity': 'medium',
+                     'description': 'Monthly revenue varies by more than 40% across the last six months', 'impact': -5}
+                ] if grade in ('C', 'R') else []
+            },
+            'recommendations': ['Verify supplier invoices', 'Review repayment schedule quarterly']
+        })
+    return rows
+
+def render_uncached(rows, work_dir):
+    for row in rows:
+        score_cards._card_styles = None
+        render_score_card(row, '2024-01-01 00:00 UTC')
+    return len(rows), None
+
+def render_serial(rows, work_dir):
+    for row in rows:
+        render_score_card(row, '2024-01-01 00:00 UTC')
+    return len(rows), None
+
+def render_pool(rows, work_dir, workers):
+    path = os.path.join(work_dir, 'cards.zip')
+    with open(path, 'wb') as f:
+        for data in ScoreCardBatchService(workers=workers).stream_zip(iter(rows)):
+            f.write(data)
+    with zipfile.ZipFile(path) as archive:
+        if archive.testzip() is not None or len(archive.namelist()) != len(rows):
+            sys.exit("ZIP check failed")
+    return len(rows), path
+
+def render_merged(rows, work_dir):
+    path = os.path.join(work_dir, 'cards.pdf')
+    return ScoreCardBatchService(workers=1).write_merged_pdf(iter(rows), path), path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+    
+    rows = make_rows(args.applications)
+    # Uncached and serial runs are per card, so a slice is enough to measure them
+    sample = rows[:min(len(rows), 300)]
+    print(f"{args.applications:,} cards ({len(sample)} for the single-worker runs), {args.workers} workers")
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        runs = [
+            ('uncached', lambda: render_uncached(sample, work_dir)),
+            ('serial', lambda: render_serial(sample, work_dir)),
+            ('pool', lambda: render_pool(rows, work_dir, args.workers)),
+            ('merged', lambda: render_merged(rows, work_dir))
+        ]
+        for name, run in runs:
+            started = time.perf_counter()
+            cards, path = run()
+            seconds = time.perf_counter() - started
+            size = f"file {os.path.getsize(path) / 1024 / 1024:6.1f} MB" if path else ''
+            print(f"{name:<9} {seconds:8.2f}s  {cards / seconds:8,.1f} cards/s  {size}")
+
+if __name__ == '__main__':
+    main()
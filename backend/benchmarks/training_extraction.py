@@ -0,0 +1,202 @@
+"""
+Training data extraction benchmark.
+
+Builds the preprocessed training matrix from the configured MongoDB two
+ways, each in a fresh process so peak RSS is measured separately:
+  documents  - CreditScore.objects.select_related() hydrated into
+               mongoengine documents, then preprocess_training_data
+               (pandas DataFrame)
+  streaming  - MongoTrainingDataExtractor over --workers aggregation
+               cursors into one preallocated buffer, then
+               preprocess_extracted in place
+
+Both matrices are compared (same columns, X within 1e-9, same y).
+--seed N first inserts N synthetic applications with their scores, so
+point MONGODB_URI/MONGODB_NAME at a scratch database.
+
+Usage (from the backend directory):
+    MONGODB_NAME=credit_scoring_benchmark python benchmarks/training_extraction.py --seed 200000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_scoring.settings')
+
+import django
+
+django.setup()
+
+from bson import ObjectId
+
+from apps.credit_scoring.models import CreditApplication, CreditScore
+from ai_models.training.data_extractor import MongoTrainingDataExtractor
+from ai_models.training.data_preprocessor import CreditDataPreprocessor
+
+GRADES = ['A', 'B', 'C', 'R']
+RISK_LEVELS = {'A': 'low', 'B': 'medium', 'C': 'high', 'R': 'very_high'}
+BUSINESS_TYPES = ['grocery_shop', 'pharmacy', 'tailoring', 'electronics', 'restaurant']
+
+def money(rng, low, high):
+    # DecimalField stores floats rounded to two places
+    return round(rng.uniform(low, high), 2)
+
+def seed(count: int, batch_size: int = 10000, seed: int = 17):
+    """Insert count raw application/score pairs shaped as mongoengine saves them"""
+    rng = random.Random(seed)
+    applications = CreditApplication._get_collection()
+    scores = CreditScore._get_collection()
+    prefix = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    
+    for start in range(0, count, batch_size):
+        application_docs, score_docs = [], []
+        for i in range(start, min(count, start + batch_size)):
+            application_id = ObjectId()
+            sales = money(rng, 20000, 400000)
+            application = {
+                '_id': application_id,
+                'application_id': f"BENCH-{prefix}-{i:07d}",
+                'borrower_info': {
+                    'full_name': f"Borrower {i}",
+                    'years_of_residency': rng.randint(0, 30),
+                    'residency_status': rng.choice(['permanent', 'temporary', 'rented']),
+                    'guarantor_category': rng.choice(['low', 'medium', 'high', None])
+                },
+                'business_data': {
+                    'business_name': f"Shop {i}",
+                    'business_type': rng.choice(BUSINESS_TYPES),
+                    'years_of_operation': rng.randint(0, 25),
+                    'seller_type': rng.choice(['retailer', 'wholesaler', None]),
+                    'average_daily_sales': round(sales / 30, 2),
+                    'last_month_sales': sales,
+                    'inventory_value_present': money(rng, 0, 1000000),
+                    'total_expense_last_month': round(sales * rng.uniform(0.3, 0.95), 2),
+                    'rent_advance': money(rng, 0, 100000)
+                },
+                'financial_data': {
+                    'monthly_income': money(rng, 10000, 150000),
+                    'bank_transaction_volume_1y': money(rng, 0, 5000000)
+                },
+                'status': 'completed',
+                'created_at': datetime.utcnow()
+            }
+            loans = [
+                {'fi_name': 'Lender', 'outstanding_loan': money(rng, 5000, 200000),
+                 'monthly_installment': money(rng, 500, 20000), 'overdue_amount': 0.0}
+                for _ in range(rng.randint(0, 5))
+            ]
+            if loans:
+                application['financial_data']['existing_loans'] = loans
+            # Unset optional fields are not stored at all
+            for section in ('borrower_info', 'business_data'):
+                application[section] = {key: value for key, value in application[section].items() if value is not None}
+            
+            grade = rng.choices(GRADES, weights=[3, 4, 2, 1])[0]
+            score = {
+                'application': application_id,
+                'data_points_score': rng.randint(0, 100),
+                'credit_ratios_score': money(rng, 0, 100),
+                'borrower_attributes_score': rng.randint(0, 100),
+                'total_points': money(rng, 20, 95),
+                'grade': grade,
+                'risk_level': RISK_LEVELS[grade],
+                'default_probability': round(rng.uniform(0.01, 0.4), 2),
+                'calculated_at': datetime.utcnow(),
+                'version': '1.0'
+            }
+            if rng.random() < 0.7:
+                score['psychometric_result'] = {
+                    'time_discipline_score': rng.randint(0, 20),
+                    'impulse_planning_score': rng.randint(0, 20),
+                    'honesty_responsibility_score': rng.randint(0, 20),
+                    'resilience_score': rng.randint(0, 20),
+                    'future_orientation_score': rng.randint(0, 20),
+                    'total_score': rng.randint(0, 100)
+                }
+            application_docs.append(application)
+            score_docs.append(score)
+        
+        applications.insert_many(application_docs, ordered=False)
+        scores.insert_many(score_docs, ordered=False)
+
+def build_documents(workers):
+    training_data = [
+        {'application': score.application, 'score': score}
+        for score in CreditScore.objects.order_by('id').select_related()
+    ]
+    preprocessor = CreditDataPreprocessor()
+    X, y = preprocessor.preprocess_training_data(training_data)
+    return preprocessor, X, y
+
+def build_streaming(workers):
+    extracted = MongoTrainingDataExtractor.for_credit_scores(workers=workers).extract()
+    preprocessor = CreditDataPreprocessor()
+    X, y = preprocessor.preprocess_extracted(extracted)
+    return preprocessor, X, y
+
+def run(name, workers, out_dir, results):
+    """One mode in a fresh process: time it, record peak RSS and save X/y for the comparison"""
+    started = time.perf_counter()
+    preprocessor, X, y = {'documents': build_documents, 'streaming': build_streaming}[name](workers)
+    seconds = time.perf_counter() - started
+    
+    np.save(os.path.join(out_dir, f"{name}_X.npy"), X)
+    np.save(os.path.join(out_dir, f"{name}_y.npy"), y)
+    results.put({
+        'name': name,
+        'seconds': seconds,
+        'rows': len(y),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'feature_columns': preprocessor.feature_columns
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    
+    if args.seed:
+        started = time.perf_counter()
+        seed(args.seed)
+        print(f"{args.seed:,} applications and scores inserted in {time.perf_counter() - started:.1f}s")
+    print(f"{CreditScore.objects.count():,} scores, {args.workers} extraction workers")
+    
+    context = multiprocessing.get_context('spawn')
+    reports = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name in ['documents', 'streaming']:
+            results = context.Queue()
+            process = context.Process(target=run, args=(name, args.workers, out_dir, results))
+            process.start()
+            report = results.get()
+            process.join()
+            reports[name] = report
+            print(f"{name:<10} {report['seconds']:8.1f}s  {report['rows'] / report['seconds']:10,.0f} rows/s  "
+                  f"peak RSS {report['peak_rss_mb']:8.1f} MB")
+        
+        if reports['documents']['feature_columns'] != reports['streaming']['feature_columns']:
+            print(f"warning: feature columns differ: {json.dumps(reports['documents']['feature_columns'])} "
+                  f"vs {json.dumps(reports['streaming']['feature_columns'])}")
+            return
+        X_documents = np.load(os.path.join(out_dir, 'documents_X.npy'))
+        X_streaming = np.load(os.path.join(out_dir, 'streaming_X.npy'))
+        same_y = np.array_equal(np.load(os.path.join(out_dir, 'documents_y.npy')),
+                                np.load(os.path.join(out_dir, 'streaming_y.npy')))
+        difference = np.abs(X_documents - X_streaming).max() if X_documents.shape == X_streaming.shape else np.inf
+        print(f"max |X difference| {difference:.3g}, y {'identical' if same_y else 'DIFFERENT'}")
+        if difference > 1e-9 or not same_y:
+            print("warning: streaming matrix differs from the documents path")
+
+if __name__ == '__main__':
+    main()
@@ -161,6 +161,22 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Columnar (Parquet) analytics snapshots for offline queries
+ANALYTICS_SNAPSHOT_DIR = config('ANALYTICS_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'analytics_snapshots'))
+
+# Shared report artifact cache (see apps.reports.artifact_cache)
+REPORT_CACHE_MAX_BYTES = config('REPORT_CACHE_MAX_BYTES', default=2 * 1024 ** 3, cast=int)
+REPORT_CACHE_MAX_AGE_DAYS = config('REPORT_CACHE_MAX_AGE_DAYS', default=7, cast=int)
+
+# Report file storage: 'local' (MEDIA_ROOT/reports) or 's3' (endpoint URL set for MinIO)
+REPORT_STORAGE_BACKEND = config('REPORT_STORAGE_BACKEND', default='local')
+REPORT_STORAGE_BUCKET = config('REPORT_STORAGE_BUCKET', default='credit-scoring-reports')
+REPORT_STORAGE_ENDPOINT_URL = config('REPORT_STORAGE_ENDPOINT_URL', default='')
+
+# Multi-format report rendering pool ('process' for CPU-bound renderers, or 'thread')
+REPORT_RENDER_EXECUTOR = config('REPORT_RENDER_EXECUTOR', default='process')
+REPORT_RENDER_WORKERS = config('REPORT_RENDER_WORKERS', default=4, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -172,6 +188,35 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+from celery.schedules import crontab
+
+CELERY_BEAT_SCHEDULE = {
+    'evaluate-model-performance': {
+        'task': 'apps.analytics.tasks.evaluate_model_performance',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'export-analytics-snapshot': {
+        'task': 'apps.analytics.tasks.export_analytics_snapshot',
+        'schedule': crontab(minute=15),
+    },
+    'evict-report-artifacts': {
+        'task': 'apps.reports.tasks.evict_report_artifacts',
+        'schedule': crontab(minute=45),
+    },
+    'rebuild-peer-score-index': {
+        'task': 'apps.reports.tasks.rebuild_peer_score_index',
+        'schedule': crontab(minute=30),
+    },
+    'retrain-active-model': {
+        'task': 'apps.credit_scoring.tasks.retrain_active_model',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'run-report-schedules': {
+        'task': 'apps.reports.tasks.run_due_report_schedules',
+        'schedule': crontab(),
+    },
+}
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -233,6 +278,15 @@ CREDIT_SCORING = {
     },
     'AI_MODELS_PATH': config('ML_MODEL_PATH', default='./ai_models/models/saved_models/'),
     'ENABLE_AI_PREDICTIONS': config('ENABLE_AI_PREDICTIONS', default=True, cast=bool),
+    # Latency budget for the ML stage of a scoring request; past it the score is rules-only
+    'AI_PREDICTION_TIMEOUT_MS': config('AI_PREDICTION_TIMEOUT_MS', default=50, cast=int),
+    'AI_PREDICTION_WORKERS': config('AI_PREDICTION_WORKERS', default=2, cast=int),
+    'AI_PREDICTION_CACHE_SIZE': config('AI_PREDICTION_CACHE_SIZE', default=10000, cast=int),
+    # Incremental retraining: new labelled rows needed per run, old rows kept as a sample,
+    # and the ensemble size past which the oldest trees are replaced
+    'AI_RETRAIN_MIN_NEW_ROWS': config('AI_RETRAIN_MIN_NEW_ROWS', default=500, cast=int),
+    'AI_RETRAIN_RESERVOIR_SIZE': config('AI_RETRAIN_RESERVOIR_SIZE', default=50000, cast=int),
+    'AI_RETRAIN_MAX_ESTIMATORS': config('AI_RETRAIN_MAX_ESTIMATORS', default=200, cast=int),
 }
 
 # External Services
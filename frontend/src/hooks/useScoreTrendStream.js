@@ -0,0 +1,34 @@
+import { useEffect, useState } from 'react';
+import { useSelector } from 'react-redux';
+// Streams are served by the ASGI service, which may live on its own host
+const STREAM_BASE_URL = process.env.REACT_APP_STREAM_BASE_URL || process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000/api/';
+const mergeBuckets = (current, changed) => {
+    const byMinute = new Map(current.map((bucket) => [bucket.minute, bucket]));
+    changed.forEach((bucket) => byMinute.set(bucket.minute, bucket));
+    return Array.from(byMinute.values()).sort((a, b) => a.minute.localeCompare(b.minute));
+};
+// Per-minute score trends pushed by the server: one snapshot, then deltas
+export const useScoreTrendStream = () => {
+    const token = useSelector((state) => state.auth.token);
+    const [buckets, setBuckets] = useState([]);
+    const [connected, setConnected] = useState(false);
+    useEffect(() => {
+        if (!token)
+            return;
+        // EventSource cannot set headers, so the token goes in the query string
+        const source = new EventSource(`${STREAM_BASE_URL}analytics/stream/score-trends/?token=${encodeURIComponent(token)}`);
+        source.addEventListener('snapshot', (event) => {
+            const data = JSON.parse(event.data);
+            setBuckets(data.buckets);
+            setConnected(true);
+        });
+        source.addEventListener('delta', (event) => {
+            const data = JSON.parse(event.data);
+            setBuckets((current) => mergeBuckets(current, data.buckets));
+        });
+        // The browser reconnects on its own and the server resends a snapshot
+        source.onerror = () => setConnected(false);
+        return () => source.close();
+    }, [token]);
+    return { buckets, connected };
+};
@@ -49,6 +49,7 @@ import {
 import { useGetDashboardStatsQuery } from '../../store/api/scoringApi';
 import { useGetAnalyticsQuery } from '../../store/api/analyticsApi';
 import { useGetPerformanceMetricsQuery } from '../../store/api/analyticsApi';
+import { useScoreTrendStream } from '../../hooks/useScoreTrendStream';
 
 const Dashboard: React.FC = () => {
   const [dateRange, setDateRange] = useState('6m');
@@ -61,6 +62,7 @@ const Dashboard: React.FC = () => {
     date_to: new Date().toISOString(),
   });
   const { data: performanceMetrics } = useGetPerformanceMetricsQuery({ period: dateRange });
+  const { buckets: liveBuckets, connected: liveConnected } = useScoreTrendStream();
 
   // Mock data for demonstration (replace with real data from API)
   const mockStats = {
@@ -96,6 +98,11 @@ const Dashboard: React.FC = () => {
     percentage: ((count as number) / stats.total_applications) * 100,
   }));
 
+  const liveTrends = liveBuckets.map((bucket) => ({
+    ...bucket,
+    time: new Date(`${bucket.minute}Z`).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
+  }));
+
   const COLORS = {
     A: '#10B981', // Green
     B: '#3B82F6', // Blue  
@@ -218,6 +225,34 @@ const Dashboard: React.FC = () => {
           </CardContent>
         </Card>
       </div>
+      {/* Live Score Trends (pushed by the server) */}
+      <Card>
+        <CardHeader className="flex items-center justify-between">
+          <CardTitle>Live Score Trends</CardTitle>
+          <span className={`text-sm ${liveConnected ? 'text-green-600' : 'text-gray-600'}`}>
+            {liveConnected ? 'Live' : 'Reconnecting...'}
+          </span>
+        </CardHeader>
+        <CardContent>
+          {liveTrends.length ? (
+            <ResponsiveContainer width="100%" height={250}>
+              <LineChart data={liveTrends} margin={{ top: 20, right: 30, left: 0, bottom: 0 }}>
+                <CartesianGrid strokeDasharray="3 3" />
+                <XAxis dataKey="time" />
+                <YAxis yAxisId="left" orientation="left" stroke="#8884d8" />
+                <YAxis yAxisId="right" orientation="right" stroke="#82ca9d" />
+                <Tooltip />
+                <Legend />
+                <Line yAxisId="left" type="monotone" dataKey="count" stroke="#8884d8" name="Scores" />
+                <Line yAxisId="right" type="monotone" dataKey="avg_score" stroke="#82ca9d" name="Avg. Score" />
+                <Line yAxisId="right" type="monotone" dataKey="approval_rate" stroke="#ffc658" name="Approval Rate (%)" />
+              </LineChart>
+            </ResponsiveContainer>
+          ) : (
+            <div className="text-center text-gray-600">No scores in the last 3 hours.</div>
+          )}
+        </CardContent>
+      </Card>
       {/* Charts Section */}
       <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
         <Card className="lg:col-span-2">